@@ -0,0 +1,81 @@
+"""
+Model-free forecasting helpers used when no trained LSTM is loaded
+"""
+
+import numpy as np
+
+WINDOW = 60     # Days of history the forecast looks at
+MA_WINDOW = 30  # Days averaged for each predicted step
+
+
+def calculate_trend(data: np.ndarray) -> float:
+    """
+    Calculate trend slope using linear regression
+    
+    Also accepts a 2-D array and returns one slope per row.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    n = data.shape[-1]
+    x = np.arange(n)
+
+    # Calculate slope using least squares
+    x_centered = x - np.mean(x)
+    denominator = np.sum(x_centered ** 2)
+    if denominator == 0:
+        return np.zeros(data.shape[:-1]) if data.ndim > 1 else 0
+
+    numerator = (data - np.mean(data, axis=-1, keepdims=True)) @ x_centered
+    return numerator / denominator
+
+
+def simple_prediction(data: np.ndarray, days: int, seed=None) -> np.ndarray:
+    """
+    Simple prediction using moving average with trend
+    This is a placeholder until LSTM model is trained
+    
+    Passing a `seed` makes the noise (and so the result) reproducible.
+    """
+    # Use last 60 days for prediction
+    last_data = np.asarray(data, dtype=np.float64).reshape(-1)[-WINDOW:]
+    return simple_prediction_batch(last_data[None, :], days, seed)[0]
+
+
+def simple_prediction_batch(windows: np.ndarray, days: int, seed=None) -> np.ndarray:
+    """
+    simple_prediction for many series at once: [batch, window] -> [batch, days]
+
+    Each step averages the last 30 values (history plus earlier predictions).
+    The values live in one preallocated buffer and the 30-day sums are updated
+    in O(1) per step for the whole batch, instead of re-averaging a freshly
+    appended window per series.
+
+    `seed` seeds the noise of the whole batch; a sequence of seeds gives each
+    row its own, so a row matches simple_prediction with that row's seed.
+    """
+    windows = np.asarray(windows, dtype=np.float64)
+    batch = windows.shape[0]
+    ma_window = min(MA_WINDOW, windows.shape[1])
+
+    # Calculate trend from recent data
+    trend = calculate_trend(windows)
+
+    buffer = np.empty((batch, ma_window + days))
+    buffer[:, :ma_window] = windows[:, -ma_window:]
+    running_sum = buffer[:, :ma_window].sum(axis=1)
+
+    # Add some realistic noise (none on the first step)
+    if seed is not None and np.ndim(seed) == 1:
+        noise = np.stack([np.random.default_rng(row_seed).normal(0, 0.002, days) for row_seed in seed])
+    else:
+        noise = np.random.default_rng(seed).normal(0, 0.002, (batch, days))
+    noise[:, 0] = 0
+
+    for i in range(days):
+        # Moving average with trend adjustment
+        next_pred = running_sum / ma_window + trend * (i + 1) * 0.01
+        next_pred = np.maximum(0.01, next_pred + noise[:, i])  # Ensure positive
+
+        buffer[:, ma_window + i] = next_pred
+        running_sum += next_pred - buffer[:, i]
+
+    return buffer[:, ma_window:].copy()
@@ -0,0 +1,298 @@
+"""
+LSTM inference service with a preloaded model and request micro-batching
+
+The model written by ml_model/train_model.py is loaded once at startup and
+warmed with a dummy forward pass. Concurrent forecast requests are gathered
+for a few milliseconds and run together as one [batch, SEQUENCE_LENGTH, 1]
+forward pass: a single pass for direct multi-horizon models, one pass per
+forecast day for recursive (next-day) models.
+
+When the model has been exported to .npz (ml_model/export_model.py), it runs
+on a pure-NumPy forward pass and TensorFlow is never imported.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_MODEL_PATH = os.path.join(BACKEND_DIR, "..", "ml_model", "saved_models", "lstm_model.h5")
+
+# Configuration
+MODEL_PATH = os.getenv("MODEL_PATH", DEFAULT_MODEL_PATH)
+BATCH_WINDOW_MS = float(os.getenv("INFERENCE_BATCH_WINDOW_MS", "5"))
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "64"))
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "auto")  # "auto" (NumPy export if present), "numpy" or "keras"
+SEQUENCE_LENGTH = 60
+
+
+class InferenceEngine:
+    """Owns the loaded Keras model and batches concurrent forecast requests"""
+
+    def __init__(self, model_path=MODEL_PATH):
+        self.model_path = os.path.abspath(model_path)
+        self.model = None
+        self._forward = None
+        self.scaler = None
+        self.metadata = {}
+        self.sequence_length = SEQUENCE_LENGTH
+        self.forecast_mode = "recursive"
+        self.horizon = 1
+        self.backend = None
+        self.batches = 0
+        self.batched_requests = 0
+        self._queue = None
+        self._worker = None
+        self._retired = False
+        # A single thread keeps model calls serialized and off the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+    @property
+    def ready(self):
+        return self.model is not None
+
+    @property
+    def version(self):
+        """Model version used in cache and coalescing keys"""
+        if not self.ready:
+            return "simple-v1"
+        return self.metadata.get("version") or self.metadata.get("training_date", "lstm")
+
+    def load(self):
+        """Load model, scaler and metadata from disk and warm the model (blocking)"""
+        numpy_path = os.path.splitext(self.model_path)[0] + ".npz"
+        use_numpy = INFERENCE_BACKEND == "numpy" or (INFERENCE_BACKEND == "auto" and os.path.exists(numpy_path))
+        artifact = numpy_path if use_numpy else self.model_path
+        if not os.path.exists(artifact):
+            logger.warning("No model at %s, falling back to simple prediction", artifact)
+            return False
+
+        model_dir = os.path.dirname(self.model_path)
+        metadata_path = os.path.join(model_dir, "metadata.json")
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                self.metadata = json.load(f)
+        self.sequence_length = int(self.metadata.get("sequence_length", SEQUENCE_LENGTH))
+        # Models trained before direct mode existed have no forecast_mode and predict one day
+        self.forecast_mode = self.metadata.get("forecast_mode", "recursive")
+        self.horizon = int(self.metadata.get("horizon", 1))
+
+        scaler_path = os.path.join(model_dir, "scaler.pkl")
+        if os.path.exists(scaler_path):
+            import joblib
+            self.scaler = joblib.load(scaler_path)
+
+        if use_numpy:
+            from app.models.numpy_lstm import NumpyLSTMModel
+
+            model = NumpyLSTMModel.load(numpy_path)
+            forward = model
+        else:
+            model, forward = self._load_keras()
+            if model is None:
+                return False
+
+        # Warm up: the first call traces the graph (Keras) and allocates buffers
+        forward(np.zeros((1, self.sequence_length, 1), dtype=np.float32))
+        self._forward = forward
+        self.model = model
+        self.backend = "numpy" if use_numpy else "keras"
+        logger.info("Loaded model %s (version %s, %s backend)", artifact, self.version, self.backend)
+        return True
+
+    def _load_keras(self):
+        # CPU-only inference; keep TensorFlow from probing for GPUs
+        os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+        os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+        try:
+            import tensorflow as tf
+            from tensorflow import keras
+        except ImportError:
+            logger.warning("TensorFlow is not installed, falling back to simple prediction")
+            return None, None
+
+        model = keras.models.load_model(self.model_path, compile=False)
+
+        # Compile the forward pass into a graph once; eager LSTM calls are slow
+        graph = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec([None, self.sequence_length, 1], tf.float32)],
+        )
+        return model, lambda x: graph(x).numpy()
+
+    async def start(self):
+        """Load the model off the event loop and start the batching worker"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.load)
+        if self.ready:
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._batch_loop())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    def retire(self):
+        """
+        Stop batching once the queued requests are served (e.g. on eviction)
+
+        Callers still holding a reference to a retired engine are served
+        directly, without the queue.
+        """
+        if self._retired:
+            return
+        self._retired = True
+        if self._queue is not None:
+            self._queue.put_nowait(None)
+        else:
+            self._executor.shutdown(wait=False)
+
+    def weight_bytes(self):
+        """Memory held by the model's weights"""
+        if not self.ready:
+            return 0
+        return int(sum(np.prod(w.shape) * np.dtype(w.dtype).itemsize for w in self.model.weights))
+
+    async def _run_model(self, fn, *args):
+        # A retired engine's thread is gone; stragglers use the loop's default executor
+        executor = None if self._retired else self._executor
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+    def scale(self, closes, symbol=None):
+        """
+        Scale a close-price series into the model's input range
+
+        The saved scaler is only meaningful for the symbol it was fit on;
+        other symbols are min-max scaled on their own history.
+        Returns (scaled, inverse) where inverse maps scaled values back to prices.
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        if self.scaler is not None and symbol and symbol.upper() == str(self.metadata.get("symbol", "")).upper():
+            scaled = self.scaler.transform(closes.reshape(-1, 1)).ravel()
+            return scaled, lambda v: self.scaler.inverse_transform(np.reshape(v, (-1, 1))).ravel()
+
+        low, high = closes.min(), closes.max()
+        span = (high - low) or 1.0
+        return (closes - low) / span, lambda v: np.asarray(v) * span + low
+
+    async def forecast(self, closes, days, symbol=None):
+        """Forecast `days` prices from a close-price history"""
+        scaled, inverse = self.scale(closes, symbol)
+        window = scaled[-self.sequence_length:].astype(np.float32)
+        if self._retired or self._queue is None:
+            return inverse((await self._run_model(self.predict_batch, [window], [days]))[0])
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((window, days, future))
+        return inverse(await future)
+
+    async def forecast_many(self, series, days, symbols=None):
+        """
+        Forecast a whole list of close-price histories in one batched model call
+
+        Used when the caller already holds a batch (e.g. a watchlist), so there
+        is nothing to gain from waiting in the micro-batching queue.
+        """
+        symbols = symbols or [None] * len(series)
+        scaled = [self.scale(closes, symbol) for closes, symbol in zip(series, symbols)]
+        windows = [values[-self.sequence_length:].astype(np.float32) for values, _ in scaled]
+
+        results = await self._run_model(self.predict_batch, windows, [days] * len(windows))
+        self.batches += 1
+        self.batched_requests += len(windows)
+        return [inverse(result) for (_, inverse), result in zip(scaled, results)]
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        retiring = False
+        while not retiring:
+            batch = [await self._queue.get()]
+
+            # Collect whatever else arrives within the batching window
+            deadline = loop.time() + BATCH_WINDOW_MS / 1000
+            while len(batch) < MAX_BATCH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # None is the retire() sentinel; everything queued before it is still served
+            retiring = any(item is None for item in batch)
+            batch = [item for item in batch if item is not None]
+            if not batch:
+                break
+
+            windows = [item[0] for item in batch]
+            days = [item[1] for item in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.predict_batch, windows, days)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.batched_requests += len(batch)
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+        self._worker = None
+        self._executor.shutdown(wait=False)
+
+    def predict_batch(self, windows, days):
+        """
+        Multi-step forecast for a batch of scaled windows (blocking)
+
+        Direct models emit `horizon` days per forward pass, so a request within
+        the horizon needs exactly one pass; recursive models emit one day per
+        pass. Either way one pass covers every request in the batch, and the
+        input buffer is shifted in place instead of being reallocated.
+        """
+        x = np.stack(windows).astype(np.float32)[:, :, None]
+        total = max(days)
+        out = np.empty((len(windows), total), dtype=np.float32)
+
+        # Days produced per forward pass, as declared by the model metadata
+        width = self.horizon if self.forecast_mode == "direct" else 1
+
+        done = 0
+        while done < total:
+            pred = np.asarray(self._forward(x)).reshape(len(windows), -1)
+            step = min(width, total - done, self.sequence_length)
+            out[:, done:done + step] = pred[:, :step]
+            done += step
+
+            # Feed the predictions back in when the horizon is exhausted
+            if done < total:
+                x[:, :-step, 0] = x[:, step:, 0]
+                x[:, -step:, 0] = pred[:, :step]
+
+        return [out[i, :d] for i, d in enumerate(days)]
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "version": self.version,
+            "backend": self.backend,
+            "forecast_mode": self.forecast_mode,
+            "horizon": self.horizon,
+            "batches": self.batches,
+            "batched_requests": self.batched_requests,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+# Shared by all routers in this process
+inference_engine = InferenceEngine()
@@ -0,0 +1,108 @@
+"""
+Pure-NumPy forward pass for the exported LSTM models
+
+ml_model/export_model.py writes a Keras model's weights to an .npz file
+together with a small JSON layer spec. Running the forward pass here keeps
+TensorFlow out of the API process, which saves seconds of cold start and
+hundreds of MB of RSS per worker for what is a few small matrix products.
+Supported layers are the ones train_model.py builds: LSTM, Dense, Dropout
+(a no-op at inference), RepeatVector, TimeDistributed(Dense) and Reshape.
+"""
+
+import json
+
+import numpy as np
+
+SPEC_KEY = "__spec__"
+
+
+def _sigmoid(x):
+    # Split by sign so large inputs never overflow exp()
+    out = np.empty_like(x)
+    positive = x >= 0
+    out[positive] = 1.0 / (1.0 + np.exp(-x[positive]))
+    exp_x = np.exp(x[~positive])
+    out[~positive] = exp_x / (1.0 + exp_x)
+    return out
+
+
+def _hard_sigmoid(x):
+    return np.clip(x / 6.0 + 0.5, 0.0, 1.0)
+
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    None: lambda x: x,
+    "tanh": np.tanh,
+    "sigmoid": _sigmoid,
+    "hard_sigmoid": _hard_sigmoid,
+    "relu": lambda x: np.maximum(x, 0.0),
+}
+
+
+class NumpyLSTMModel:
+    """Sequential model evaluated with NumPy; call it on a [batch, steps, features] array"""
+
+    def __init__(self, spec, arrays):
+        self.spec = spec
+        self.layers = []
+        for i, layer in enumerate(spec["layers"]):
+            weights = [np.ascontiguousarray(arrays[f"{i}/{name}"], dtype=np.float32) for name in layer.get("weights", [])]
+            self.layers.append((layer, weights))
+        self.weights = [w for _, weights in self.layers for w in weights]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            spec = json.loads(str(data[SPEC_KEY]))
+            arrays = {key: data[key] for key in data.files if key != SPEC_KEY}
+        return cls(spec, arrays)
+
+    @property
+    def input_shape(self):
+        return tuple(self.spec["input_shape"])
+
+    def __call__(self, x):
+        x = np.asarray(x, dtype=np.float32)
+        for layer, weights in self.layers:
+            kind = layer["type"]
+            if kind == "lstm":
+                x = self._lstm(x, layer, *weights)
+            elif kind == "dense":
+                kernel, bias = weights if len(weights) == 2 else (weights[0], 0.0)
+                x = ACTIVATIONS[layer["activation"]](x @ kernel + bias)
+            elif kind == "repeat":
+                x = np.repeat(x[:, None, :], layer["n"], axis=1)
+            elif kind == "reshape":
+                x = x.reshape((x.shape[0], *layer["target_shape"]))
+            else:
+                raise ValueError(f"Unsupported layer type: {kind}")
+        return x
+
+    @staticmethod
+    def _lstm(x, layer, kernel, recurrent_kernel, bias=None):
+        """Keras LSTM semantics: gates ordered (input, forget, cell, output)"""
+        batch, steps, _ = x.shape
+        units = layer["units"]
+        activation = ACTIVATIONS[layer["activation"]]
+        recurrent_activation = ACTIVATIONS[layer["recurrent_activation"]]
+
+        # Input projections for every time step in one matrix product
+        projected = x @ kernel
+        if bias is not None:
+            projected += bias
+
+        h = np.zeros((batch, units), dtype=np.float32)
+        c = np.zeros((batch, units), dtype=np.float32)
+        outputs = np.empty((batch, steps, units), dtype=np.float32) if layer["return_sequences"] else None
+        for t in range(steps):
+            z = projected[:, t] + h @ recurrent_kernel
+            i = recurrent_activation(z[:, :units])
+            f = recurrent_activation(z[:, units:2 * units])
+            g = activation(z[:, 2 * units:3 * units])
+            o = recurrent_activation(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * activation(c)
+            if outputs is not None:
+                outputs[:, t] = h
+        return outputs if outputs is not None else h
@@ -0,0 +1,241 @@
+"""
+Versioned model registry with lazily loaded, memory-bounded models
+
+Layout on disk (each artifact directory is what train_model.py writes):
+
+    registry/
+        CURRENT                     name of the served version
+        versions/<version>/         pooled model: lstm_model.h5/.npz, scaler.pkl, metadata.json
+        versions/<version>/symbols/<SYMBOL>/   optional per-symbol models
+
+A symbol is served by its own model when the current version has one,
+otherwise by the version's pooled model. Models are loaded on first use and
+kept in an LRU bounded by an estimated memory budget. Activating a version
+replaces CURRENT atomically (os.replace); every worker process notices the
+new pointer within a second and retires the models of the old version.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from app.models.inference import BACKEND_DIR, InferenceEngine
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(BACKEND_DIR, "..", "ml_model", "registry"))
+MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "512"))
+MODEL_OVERHEAD_MB = float(os.getenv("MODEL_OVERHEAD_MB", "8"))  # Graph, buffers and Keras objects per model
+POINTER_CHECK_SECONDS = 1.0
+
+MODEL_FILE = "lstm_model.h5"
+NUMPY_MODEL_FILE = "lstm_model.npz"  # TensorFlow-free export, preferred when present
+
+
+def has_model(path):
+    return any(os.path.exists(os.path.join(path, name)) for name in (MODEL_FILE, NUMPY_MODEL_FILE))
+
+
+def check_version_name(version):
+    """Reject version names that could point outside versions/ (separators, "..", hidden names)"""
+    if (
+        not version
+        or os.sep in version
+        or (os.altsep and os.altsep in version)
+        or ".." in version
+        or version.startswith(".")
+    ):
+        raise ValueError(f"Invalid model version: {version!r}")
+
+
+def published_versions(root):
+    """Versions published under `root`, oldest first"""
+    versions_dir = os.path.join(root, "versions")
+    if not os.path.isdir(versions_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(versions_dir)
+        if not name.startswith(".") and os.path.isdir(os.path.join(versions_dir, name))
+    )
+
+
+def publish(source_dir, root=MODEL_REGISTRY_DIR, version=None, activate=False):
+    """
+    Copy a training output directory into the registry as a new version
+
+    The copy is assembled in a temporary directory and renamed into place, so
+    a half-written version is never visible. Returns the version name.
+    """
+    versions_dir = os.path.join(root, "versions")
+    os.makedirs(versions_dir, exist_ok=True)
+    version = version or datetime.now().strftime("%Y%m%d-%H%M%S")
+    check_version_name(version)
+    target = os.path.join(versions_dir, version)
+    if os.path.exists(target):
+        raise ValueError(f"Version already exists: {version}")
+
+    staging = tempfile.mkdtemp(prefix=f".{version}-", dir=versions_dir)
+    shutil.copytree(source_dir, staging, dirs_exist_ok=True,
+                    ignore=shutil.ignore_patterns("progress.json", "best_model.h5", "*.keras", "*.png"))
+
+    # Stamp the version into every metadata.json so responses and caches can key on it
+    for dirpath, _, filenames in os.walk(staging):
+        if "metadata.json" in filenames:
+            path = os.path.join(dirpath, "metadata.json")
+            with open(path) as f:
+                metadata = json.load(f)
+            metadata["version"] = version
+            with open(path, "w") as f:
+                json.dump(metadata, f, indent=2)
+
+    os.rename(staging, target)
+    if activate:
+        set_current(root, version)
+    return version
+
+
+def set_current(root, version):
+    """Point CURRENT at `version` atomically (a published version only)"""
+    check_version_name(version)
+    if version not in published_versions(root):
+        raise ValueError(f"Unknown model version: {version}")
+    tmp_path = os.path.join(root, f".CURRENT.{os.getpid()}")
+    with open(tmp_path, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, os.path.join(root, "CURRENT"))
+
+
+class ModelRegistry:
+    """Resolves symbols to model artifacts and keeps loaded models in an LRU"""
+
+    def __init__(self, root=MODEL_REGISTRY_DIR, memory_budget_mb=MEMORY_BUDGET_MB):
+        self.root = os.path.abspath(root)
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self._loaded = OrderedDict()  # artifact dir -> (engine, estimated bytes)
+        self._loading = {}            # artifact dir -> task, so concurrent first uses share one load
+        self._current = None
+        self._checked_at = 0.0
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    @property
+    def versions_dir(self):
+        return os.path.join(self.root, "versions")
+
+    def versions(self):
+        """Published versions, oldest first"""
+        return published_versions(self.root)
+
+    def current_version(self):
+        """Served version (re-read at most once per POINTER_CHECK_SECONDS), or None"""
+        now = time.monotonic()
+        if now - self._checked_at >= POINTER_CHECK_SECONDS:
+            self._checked_at = now
+            try:
+                with open(os.path.join(self.root, "CURRENT")) as f:
+                    current = f.read().strip() or None
+            except FileNotFoundError:
+                current = None
+            if current != self._current:
+                if self._current is not None:
+                    logger.info("Model version changed: %s -> %s", self._current, current)
+                self._current = current
+                self._retire_stale()
+        return self._current
+
+    def activate(self, version):
+        """Serve `version` from now on, in this process and every other worker"""
+        set_current(self.root, version)
+        self._checked_at = 0.0
+        return self.current_version()
+
+    def resolve(self, symbol=None):
+        """Artifact directory serving `symbol` in the current version, or None"""
+        version = self.current_version()
+        if version is None:
+            return None
+        version_dir = os.path.join(self.versions_dir, version)
+        if symbol:
+            symbol_dir = os.path.join(version_dir, "symbols", symbol.upper())
+            if has_model(symbol_dir):
+                return symbol_dir
+        return version_dir if has_model(version_dir) else None
+
+    async def engine_for(self, symbol=None):
+        """Loaded engine for `symbol`, loading (and evicting) as needed; None if no model applies"""
+        path = self.resolve(symbol)
+        if path is None:
+            return None
+
+        entry = self._loaded.get(path)
+        if entry is not None:
+            self._loaded.move_to_end(path)
+            self.hits += 1
+            return entry[0]
+
+        task = self._loading.get(path)
+        if task is None:
+            task = asyncio.ensure_future(self._load(path))
+            self._loading[path] = task
+            task.add_done_callback(lambda _: self._loading.pop(path, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, path):
+        engine = InferenceEngine(os.path.join(path, MODEL_FILE))
+        await engine.start()
+        if not engine.ready:
+            return None
+
+        size = engine.weight_bytes() + int(MODEL_OVERHEAD_MB * 1024 * 1024)
+        self._loaded[path] = (engine, size)
+        self.loads += 1
+        logger.info("Loaded %s (%.1f MB estimated)", path, size / 1024 / 1024)
+        self._evict()
+        return engine
+
+    def _evict(self):
+        # Least recently used first; the newest model always stays
+        while len(self._loaded) > 1 and self.loaded_bytes() > self.memory_budget:
+            path, (engine, _) = self._loaded.popitem(last=False)
+            engine.retire()
+            self.evictions += 1
+            logger.info("Evicted %s", path)
+
+    def _retire_stale(self):
+        prefix = os.path.join(self.versions_dir, self._current or "") + os.sep
+        for path in [p for p in self._loaded if not (p + os.sep).startswith(prefix)]:
+            engine, _ = self._loaded.pop(path)
+            engine.retire()
+
+    def loaded_bytes(self):
+        return sum(size for _, size in self._loaded.values())
+
+    async def close(self):
+        for engine, _ in self._loaded.values():
+            engine.retire()
+        self._loaded.clear()
+
+    def stats(self):
+        return {
+            "root": self.root,
+            "current": self.current_version(),
+            "versions": self.versions(),
+            "loaded": [os.path.relpath(path, self.versions_dir) for path in self._loaded],
+            "loaded_mb": round(self.loaded_bytes() / 1024 / 1024, 1),
+            "memory_budget_mb": round(self.memory_budget / 1024 / 1024, 1),
+            "loads": self.loads,
+            "hits": self.hits,
+            "evictions": self.evictions,
+        }
+
+
+# Shared by all routers in this process
+model_registry = ModelRegistry()
@@ -0,0 +1,78 @@
+"""
+Monte Carlo forecast paths and per-day confidence bands
+
+Paths are simulated around a central forecast (LSTM or simple) as log-normal
+deviations with the daily volatility of recent history. All paths are drawn
+in one [days, paths] array operation from a seeded Generator, so a request
+with the same seed always gets the same bands, and 10k paths take a few
+milliseconds instead of a Python loop per path.
+"""
+
+import numpy as np
+
+MAX_PATHS = 20000
+VOLATILITY_LOOKBACK = 252  # Trading days of log returns behind the volatility estimate
+
+# Band name -> quantile, as emitted in API payloads
+QUANTILES = {
+    "p2_5": 0.025,
+    "p5": 0.05,
+    "p25": 0.25,
+    "p50": 0.5,
+    "p75": 0.75,
+    "p95": 0.95,
+    "p97_5": 0.975,
+}
+
+
+def daily_volatility(closes, lookback=VOLATILITY_LOOKBACK) -> float:
+    """Sample standard deviation of the last `lookback` daily log returns"""
+    closes = np.asarray(closes, dtype=np.float64)[-(lookback + 1):]
+    closes = closes[np.isfinite(closes) & (closes > 0)]
+    if len(closes) < 3:
+        return 0.0
+    return float(np.std(np.diff(np.log(closes)), ddof=1))
+
+
+def simulate_paths(central, sigma: float, paths: int, seed=None) -> np.ndarray:
+    """
+    Simulate `paths` price paths around a central forecast
+
+    Each path is central * exp(W_t - sigma^2 t / 2) with W a Gaussian random
+    walk of daily step `sigma`; the correction term keeps the mean of every
+    day on the central forecast.
+
+    Returns:
+        float32 array of shape [paths, days] (a transposed view of the
+        day-major buffer the simulation runs in)
+    """
+    central = np.asarray(central, dtype=np.float32).ravel()
+    days = len(central)
+    rng = np.random.default_rng(seed)
+
+    # Day-major, so the cumulative sum and the per-day sort run over contiguous rows
+    walk = rng.standard_normal((days, paths), dtype=np.float32)
+    walk *= np.float32(sigma)
+    np.cumsum(walk, axis=0, out=walk)
+    walk -= (np.float32(0.5 * sigma * sigma) * np.arange(1, days + 1, dtype=np.float32))[:, None]
+    np.exp(walk, out=walk)
+    walk *= central[:, None]
+    return walk.T
+
+
+def quantile_bands(paths: np.ndarray, quantiles: dict = QUANTILES) -> dict:
+    """
+    Per-day quantiles of simulated paths: {name: float64 array of length days}
+
+    Uses the same linear interpolation as np.quantile, but sorts each day's
+    values once in a contiguous buffer instead of a strided axis.
+    """
+    by_day = np.sort(np.ascontiguousarray(paths.T), axis=1)
+    last = by_day.shape[1] - 1
+    positions = np.array(list(quantiles.values())) * last
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, last)
+    weight = positions - lower
+
+    values = by_day[:, lower] * (1 - weight) + by_day[:, upper] * weight
+    return {name: values[:, i].astype(np.float64) for i, name in enumerate(quantiles)}
@@ -0,0 +1,198 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+import asyncio
+import contextlib
+import json
+import os
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from app.models.forecast import simple_prediction
+from app.routes.predict import HISTORY_PERIOD, engine_for, forecast_dates_after, prediction_metrics, prediction_seed
+from app.routes.stock import STOCK_INDICATORS
+from app.utils.executors import io_pool
+from app.utils.history_store import MARKET_OPEN, MARKET_TZ, frame_keys
+from app.utils.indicator_state import IndicatorState
+from app.utils.live_quotes import QuoteHub, Subscriber
+from app.utils.serialization import dumps
+from app.utils.shared_store import get_shared_history
+
+router = APIRouter()
+
+# Configuration
+LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "5"))                # While the market is open
+LIVE_CLOSED_POLL_SECONDS = float(os.getenv("LIVE_CLOSED_POLL_SECONDS", "300"))
+LIVE_IDLE_SECONDS = float(os.getenv("LIVE_IDLE_SECONDS", "30"))                # Feed kept after its last subscriber leaves
+LIVE_FORECAST_SECONDS = float(os.getenv("LIVE_FORECAST_SECONDS", "60"))        # Minimum time between forecast updates
+LIVE_FORECAST_DAYS = int(os.getenv("LIVE_FORECAST_DAYS", "30"))
+LIVE_SEND_TIMEOUT = float(os.getenv("LIVE_SEND_TIMEOUT_SECONDS", "10"))        # A client not reading for this long is dropped
+MAX_LIVE_SYMBOLS = int(os.getenv("MAX_LIVE_SYMBOLS", "50"))                    # Per connection
+LIVE_ACTIONS = ("subscribe", "unsubscribe")
+
+class LiveState:
+    """What a symbol's feed keeps between quotes"""
+
+    def __init__(self, last_key: str, closes: np.ndarray, indicators: IndicatorState):
+        self.last_key = last_key
+        self.closes = closes
+        self.indicators = indicators
+        self.forecast = None
+        self.forecast_at = 0.0
+
+def session_key(last_key: str, now=None) -> str:
+    """Daily bar a live quote belongs to: today's once the session has opened, else the last stored one"""
+    now = now or datetime.now(MARKET_TZ)
+    if now.weekday() < 5 and now.time() >= MARKET_OPEN:
+        return max(now.date().isoformat(), last_key)
+    return last_key
+
+async def load_live_state(symbol: str) -> LiveState:
+    """Start a feed from the stored history (the prediction route's 2y, so forecasts match it)"""
+    hist = await io_pool.run(get_shared_history().get_history, symbol, HISTORY_PERIOD)
+    if hist.empty:
+        raise LookupError(f"No data found for symbol: {symbol}")
+    
+    keys = frame_keys(hist.index)
+    closes = hist["Close"].to_numpy(dtype=np.float64, copy=True)
+    return LiveState(str(keys[-1]), closes, IndicatorState.from_history(keys, closes))
+
+async def apply_quote(symbol: str, state: LiveState, quote: dict):
+    """
+    Fold a polled quote into the symbol's state and build the update message
+    
+    The quote revises today's bar (or opens it on the first quote of a
+    session), so indicators move in O(1) through the streaming state. The
+    forecast is refreshed at most every LIVE_FORECAST_SECONDS, and on every
+    new bar. Returns None when the price has not moved.
+    """
+    price = float(quote["price"])
+    key = session_key(state.last_key)
+    new_bar = key != state.last_key
+    if not new_bar and price == state.closes[-1] and state.forecast is not None:
+        return None
+    
+    if new_bar:
+        state.closes = np.append(state.closes, price)
+        state.last_key = key
+    else:
+        state.closes[-1] = price
+    indicators = state.indicators.update(key, price)
+    
+    if new_bar or state.forecast is None or time.monotonic() - state.forecast_at >= LIVE_FORECAST_SECONDS:
+        state.forecast = await live_forecast(symbol, state)
+        state.forecast_at = time.monotonic()
+    
+    previous_close = float(state.closes[-2]) if len(state.closes) > 1 else price
+    return dumps({
+        "type": "quote",
+        "symbol": symbol,
+        "time": datetime.now(MARKET_TZ).isoformat(timespec="seconds"),
+        "bar": key,
+        "price": price,
+        "change": price - previous_close,
+        "change_percent": (price / previous_close - 1) * 100,
+        "day_high": quote.get("day_high"),
+        "day_low": quote.get("day_low"),
+        "volume": quote.get("volume"),
+        "indicators": {name: indicators[name] for name in STOCK_INDICATORS},
+        "forecast": state.forecast,
+    }).decode()
+
+async def live_forecast(symbol: str, state: LiveState) -> dict:
+    """Forecast from the live closes with the model serving `symbol`, or the simple fallback"""
+    days = LIVE_FORECAST_DAYS
+    engine = await engine_for(symbol)
+    if engine is not None:
+        predictions = np.asarray(await engine.forecast(state.closes, days, symbol), dtype=np.float64).ravel()
+    else:
+        # The prediction route's fallback: scale to the history's range, forecast, scale back
+        # (seeded from the same last bar, so an unchanged history gives the route's forecast)
+        low, high = state.closes.min(), state.closes.max()
+        scale = (high - low) or 1.0
+        scaled = simple_prediction((state.closes - low) / scale, days, prediction_seed(symbol, state.last_key))
+        predictions = scaled * scale + low
+    
+    return {
+        "days": days,
+        "predictions": predictions.tolist(),
+        "forecast_dates": forecast_dates_after(pd.Timestamp(state.last_key), days),
+        "metrics": prediction_metrics(float(state.closes[-1]), predictions),
+        "updated_at": datetime.now(MARKET_TZ).isoformat(timespec="seconds"),
+    }
+
+live_hub = QuoteHub(
+    load_live_state,
+    apply_quote,
+    interval=LIVE_POLL_SECONDS,
+    closed_interval=LIVE_CLOSED_POLL_SECONDS,
+    idle_seconds=LIVE_IDLE_SECONDS,
+)
+
+@router.get("/")
+async def live_status():
+    """
+    Live feeds with their subscriber and poll counts
+    """
+    return live_hub.stats()
+
+@router.websocket("/ws")
+async def live_quotes(websocket: WebSocket):
+    """
+    Live quotes with indicators and forecasts for the symbols a client subscribes to
+    
+    Clients send {"action": "subscribe" | "unsubscribe", "symbols": [...]}
+    and receive a "quote" message per price update of each subscribed
+    symbol (the latest one right away when the symbol already has a feed).
+    Every symbol is polled upstream once however many clients follow it.
+    A client reading slower than updates arrive only gets the latest update
+    per symbol; one that stops reading for LIVE_SEND_TIMEOUT is disconnected.
+    """
+    await websocket.accept()
+    subscriber = Subscriber()
+    receiver = asyncio.ensure_future(receive_commands(websocket, subscriber))
+    sender = asyncio.ensure_future(subscriber.pump(websocket.send_text, LIVE_SEND_TIMEOUT))
+    try:
+        done, _ = await asyncio.wait((receiver, sender), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        live_hub.disconnect(subscriber)
+        receiver.cancel()
+        sender.cancel()
+    
+    if sender in done and sender.exception() is None:
+        # The client stopped reading; the close may never be read either
+        with contextlib.suppress(Exception):
+            await asyncio.wait_for(websocket.close(code=1013, reason="Client too slow"), 1)
+
+async def receive_commands(websocket: WebSocket, subscriber: Subscriber):
+    """Apply subscribe/unsubscribe commands until the client disconnects"""
+    while True:
+        try:
+            text = await websocket.receive_text()
+        except WebSocketDisconnect:
+            return
+        try:
+            reply = handle_command(subscriber, json.loads(text))
+        except (ValueError, TypeError) as e:
+            reply = {"type": "error", "error": str(e)}
+        subscriber.send(dumps(reply).decode())
+
+def handle_command(subscriber: Subscriber, command) -> dict:
+    """Apply one client command; returns the reply"""
+    if not isinstance(command, dict) or command.get("action") not in LIVE_ACTIONS:
+        raise ValueError(f"action must be one of: {', '.join(LIVE_ACTIONS)}")
+    symbols = command.get("symbols")
+    if not isinstance(symbols, list) or not all(isinstance(symbol, str) and symbol.strip() for symbol in symbols):
+        raise ValueError("symbols must be a list of ticker symbols")
+    symbols = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols))
+    
+    if command["action"] == "subscribe":
+        if len(subscriber.symbols | set(symbols)) > MAX_LIVE_SYMBOLS:
+            raise ValueError(f"At most {MAX_LIVE_SYMBOLS} symbols per connection")
+        for symbol in symbols:
+            live_hub.subscribe(subscriber, symbol)
+    else:
+        for symbol in symbols:
+            live_hub.unsubscribe(subscriber, symbol)
+    
+    return {"type": f"{command['action']}d", "symbols": sorted(subscriber.symbols)}
@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Header, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+import hmac
+import os
+
+from app.models.registry import model_registry
+
+router = APIRouter()
+
+# Configuration
+MODEL_ADMIN_TOKEN = os.getenv("MODEL_ADMIN_TOKEN", "")  # X-Admin-Token of the admin routes (unset = admin routes disabled)
+
+class ActivateRequest(BaseModel):
+    version: str
+
+def require_admin(x_admin_token: Optional[str]):
+    """Refuse an admin request unless MODEL_ADMIN_TOKEN is configured and matches"""
+    if not MODEL_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin routes are disabled: set MODEL_ADMIN_TOKEN")
+    if not hmac.compare_digest((x_admin_token or "").encode(), MODEL_ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@router.get("/")
+async def list_models():
+    """
+    Published model versions, the served version and the models loaded in this worker
+    """
+    return model_registry.stats()
+
+@router.post("/activate")
+async def activate_model(request: ActivateRequest, x_admin_token: Optional[str] = Header(None)):
+    """
+    Serve a published version from now on, without restarting the API
+    
+    Args:
+        version: Version name under the registry's versions/ directory
+    """
+    require_admin(x_admin_token)
+    
+    try:
+        model_registry.activate(request.version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    return model_registry.stats()
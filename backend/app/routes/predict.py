@@ -1,46 +1,163 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-import yfinance as yf
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional, Union
+import asyncio
 import os
+import zlib
+
+from app.models.forecast import WINDOW, calculate_trend, simple_prediction, simple_prediction_batch
+from app.models.inference import inference_engine
+from app.models.registry import model_registry
+from app.models.simulation import MAX_PATHS, daily_volatility, quantile_bands, simulate_paths
+from app.utils.executors import cpu_pool, io_pool
+from app.utils.history_store import get_history_store
+from app.utils.indicator_state import get_indicator_cache
+from app.utils.metrics import CACHE_REQUESTS, ERRORS, observe_spans, record_spans, span
+from app.utils.result_cache import cache_key, etag_for, prediction_cache
+from app.utils.serialization import RESPONSE_FORMATS, FastJSONResponse, dumps, frame_payload
+from app.utils.shared_store import SnapshotChanged, SnapshotRef, get_shared_history
+from app.utils.singleflight import coalescer
 
 router = APIRouter()
 
+HISTORY_PERIOD = "2y"
+MAX_BATCH_SYMBOLS = int(os.getenv("MAX_BATCH_SYMBOLS", "500"))
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "50"))  # Symbols per bulk download in /batch
+PREDICT_INDICATORS = ("MA50", "MA100", "MA200", "MA20", "Daily_Return", "Volatility")
+
+# Frame column -> historical_data field
+HISTORICAL_FIELDS = {
+    "date": "date",
+    "Close": "price",
+    "Volume": "volume",
+    "MA50": "ma50",
+    "MA100": "ma100",
+    "MA200": "ma200",
+    "MA20": "ma20",
+}
+
+def model_version() -> str:
+    """Identifies the forecasting model in cache/coalescing keys (follows the registry's current pointer)"""
+    return model_registry.current_version() or inference_engine.version
+
+async def engine_for(symbol: str):
+    """
+    Model serving `symbol`: the registry's current version when one is
+    published, else the model preloaded from MODEL_PATH; None means the
+    simple prediction is used
+    """
+    engine = await model_registry.engine_for(symbol)
+    if engine is None and inference_engine.ready:
+        engine = inference_engine
+    return engine
+
 class PredictionRequest(BaseModel):
     symbol: str
     days: int = 30
+    simulations: Optional[int] = None  # Monte Carlo paths for confidence bands (off when unset)
+    seed: Optional[int] = None         # Defaults to a seed derived from the symbol and last bar
+
+class BatchPredictionRequest(BaseModel):
+    symbols: List[str]
+    horizons: List[int] = [30]
+
+class PredictionResult(NamedTuple):
+    body: bytes
+    etag: str
+    cache_status: str  # "HIT" or "MISS"
 
 class PredictionResponse(BaseModel):
     symbol: str
     predictions: list
-    historical_data: list
+    historical_data: Union[list, dict]  # dict of arrays with format=columnar
     forecast_dates: list
     metrics: dict
     trend_comparison: dict
     moving_averages: dict
+    simulation: Optional[dict] = None
 
 @router.post("/", response_model=PredictionResponse)
-async def predict_stock_price(request: PredictionRequest):
+async def predict_stock_price(request: PredictionRequest, fmt: str = Query("records", alias="format")):
     """
     Generate stock price predictions using LSTM model with trend comparison
     
     Args:
         symbol: Stock ticker symbol
         days: Number of days to predict (5-60)
+        simulations: Monte Carlo paths behind per-day confidence bands (1-20000, optional)
+        seed: Random seed for the simulation (optional)
+        format: "records" or "columnar" layout for historical_data
+    """
+    result = await cached_prediction(request, fmt)
+    return prediction_response(result)
+
+@router.get("/{symbol}", response_model=PredictionResponse)
+async def get_prediction(
+    symbol: str,
+    days: int = 30,
+    simulations: Optional[int] = None,
+    seed: Optional[int] = None,
+    fmt: str = Query("records", alias="format"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """
+    Cacheable GET form of the prediction endpoint
+    
+    Supports conditional requests: a matching If-None-Match returns 304.
+    
+    Args:
+        symbol: Stock ticker symbol
+        days: Number of days to predict (5-60)
+        simulations: Monte Carlo paths behind per-day confidence bands (1-20000, optional)
+        seed: Random seed for the simulation (optional)
+        format: "records" or "columnar" layout for historical_data
     """
+    request = PredictionRequest(symbol=symbol, days=days, simulations=simulations, seed=seed)
+    result = await cached_prediction(request, fmt)
+    if if_none_match and result.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": result.etag, "X-Cache": result.cache_status})
+    return prediction_response(result)
+
+def prediction_response(result: PredictionResult) -> FastJSONResponse:
+    return FastJSONResponse(result.body, headers={"ETag": result.etag, "X-Cache": result.cache_status})
+
+async def cached_prediction(request: PredictionRequest, fmt: str) -> PredictionResult:
+    """Validate the format and run the prediction, coalescing identical requests"""
+    if fmt not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+    
+    # Identical concurrent requests share a single computation
+    return await coalescer.do(
+        ("predict", request.symbol.upper(), HISTORY_PERIOD, request.days, model_version(), fmt,
+         request.simulations, request.seed),
+        lambda: run_prediction(request, fmt),
+    )
+
+async def run_prediction(request: PredictionRequest, fmt: str = "records") -> PredictionResult:
+    """Fetch history, then serve the prediction from cache or compute and cache it"""
     try:
         if request.days < 5 or request.days > 60:
             raise HTTPException(
                 status_code=400, 
                 detail="Days must be between 5 and 60"
             )
+        if request.simulations is not None and not 1 <= request.simulations <= MAX_PATHS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Simulations must be between 1 and {MAX_PATHS}"
+            )
         
-        # Fetch historical data (2 years for better moving average calculation)
-        stock = yf.Ticker(request.symbol)
-        hist = stock.history(period="2y")
+        # Fetch historical data (2 years for better moving average calculation),
+        # with its indicators, as views of the snapshot shared by all workers
+        with span("predict", "fetch"):
+            hist, ref = await io_pool.run(
+                get_shared_history().get_history_ref, request.symbol, HISTORY_PERIOD, "1d", PREDICT_INDICATORS
+            )
         
         if hist.empty:
             raise HTTPException(
@@ -48,189 +165,420 @@ async def predict_stock_price(request: PredictionRequest):
                 detail=f"No data found for symbol: {request.symbol}"
             )
         
-        # Calculate moving averages for historical data
-        hist['MA50'] = hist['Close'].rolling(window=50).mean()
-        hist['MA100'] = hist['Close'].rolling(window=100).mean()
-        hist['MA200'] = hist['Close'].rolling(window=200).mean()
-        hist['MA20'] = hist['Close'].rolling(window=20).mean()
-        
-        # Calculate volatility and daily returns
-        hist['Daily_Return'] = hist['Close'].pct_change()
-        hist['Volatility'] = hist['Daily_Return'].rolling(window=20).std()
-        
-        # Prepare data for prediction
-        data = hist['Close'].values.reshape(-1, 1)
+        # The result only changes when a new bar lands, the last bar is revised
+        # (during the session its close keeps moving) or the model changes
+        symbol = request.symbol.upper()
+        last_bar = hist.index[-1].isoformat()
+        last_close = float(hist['Close'].iloc[-1])
+        key = cache_key(symbol, last_bar, repr(last_close), request.days, model_version(), fmt,
+                        request.simulations, request.seed)
+        etag = etag_for(key)
         
-        # Scale the data
-        scaler = MinMaxScaler(feature_range=(0, 1))
-        scaled_data = scaler.fit_transform(data)
+        body = prediction_cache.get(key)
+        if body is not None:
+            CACHE_REQUESTS.inc(cache="prediction", result="hit")
+            return PredictionResult(body, etag, "HIT")
+        if prediction_cache.persistent:
+            body = await io_pool.run(prediction_cache.load, key)
+            if body is not None:
+                CACHE_REQUESTS.inc(cache="prediction", result="disk_hit")
+                return PredictionResult(body, etag, "HIT")
+        CACHE_REQUESTS.inc(cache="prediction", result="miss")
         
-        # TODO: Load and use trained LSTM model
-        # For now, using simple moving average prediction as placeholder
-        predictions = simple_prediction(scaled_data, request.days)
+        # LSTM forecast, micro-batched with other in-flight requests
+        forecast = None
+        engine = await engine_for(symbol)
+        if engine is not None:
+            with span("predict", "forecast"):
+                forecast = await engine.forecast(hist['Close'].values, request.days, request.symbol)
         
-        # Inverse transform predictions
-        predictions = scaler.inverse_transform(predictions.reshape(-1, 1))
+        # Indicators, payload assembly and JSON encoding are CPU-bound. The
+        # worker maps the snapshot itself; the frame is only sent if the file
+        # was replaced in the meantime
+        seed = request.seed if request.seed is not None else prediction_seed(symbol, last_bar)
+        with span("predict", "render"):
+            try:
+                body, spans = await cpu_pool.run(
+                    render_prediction, request.symbol, ref, request.days, forecast, fmt, seed, request.simulations
+                )
+            except SnapshotChanged:
+                body, spans = await cpu_pool.run(
+                    render_prediction, request.symbol, hist, request.days, forecast, fmt, seed, request.simulations
+                )
+        observe_spans(spans)
         
-        # Generate forecast dates
-        last_date = hist.index[-1]
-        forecast_dates = [
-            (last_date + timedelta(days=i+1)).strftime('%Y-%m-%d')
-            for i in range(request.days)
-        ]
-        
-        # Prepare historical data with moving averages
-        hist.reset_index(inplace=True)
-        historical_data = [
-            {
-                "date": row['Date'].strftime('%Y-%m-%d'),
-                "price": float(row['Close']),
-                "volume": int(row['Volume']),
-                "ma50": float(row['MA50']) if not pd.isna(row['MA50']) else None,
-                "ma100": float(row['MA100']) if not pd.isna(row['MA100']) else None,
-                "ma200": float(row['MA200']) if not pd.isna(row['MA200']) else None,
-                "ma20": float(row['MA20']) if not pd.isna(row['MA20']) else None,
-            }
-            for _, row in hist.tail(200).iterrows()
-        ]
-        
-        # Calculate current metrics
-        current_price = float(data[-1][0])
-        predicted_price = float(predictions[-1][0])
-        change = predicted_price - current_price
-        change_percent = (change / current_price) * 100
-        
-        # Calculate historical trend metrics (past 30 days vs past 60 days)
-        past_30_days = hist.tail(30)['Close'].values
-        past_60_days = hist.tail(60)['Close'].values
-        past_90_days = hist.tail(90)['Close'].values
-        
-        past_30_trend = calculate_trend(past_30_days)
-        past_60_trend = calculate_trend(past_60_days)
-        past_90_trend = calculate_trend(past_90_days)
-        
-        # Calculate predicted trend
-        pred_trend = calculate_trend(predictions.flatten())
-        
-        # Volatility comparison
-        historical_volatility = float(np.std(past_30_days) / np.mean(past_30_days) * 100)
-        predicted_volatility = float(np.std(predictions) / np.mean(predictions) * 100)
-        
-        # Trend comparison analysis
-        trend_comparison = {
-            "historical_trend_30d": {
-                "direction": "upward" if past_30_trend > 0 else "downward",
-                "slope": float(past_30_trend),
-                "avg_price": float(np.mean(past_30_days)),
-                "volatility": float(np.std(past_30_days)),
-            },
-            "historical_trend_60d": {
-                "direction": "upward" if past_60_trend > 0 else "downward",
-                "slope": float(past_60_trend),
-                "avg_price": float(np.mean(past_60_days)),
-                "volatility": float(np.std(past_60_days)),
-            },
-            "historical_trend_90d": {
-                "direction": "upward" if past_90_trend > 0 else "downward",
-                "slope": float(past_90_trend),
-                "avg_price": float(np.mean(past_90_days)),
-                "volatility": float(np.std(past_90_days)),
-            },
-            "predicted_trend": {
-                "direction": "upward" if pred_trend > 0 else "downward",
-                "slope": float(pred_trend),
-                "avg_price": float(np.mean(predictions)),
-                "volatility": float(np.std(predictions)),
-            },
-            "comparison": {
-                "trend_consistency": "consistent" if (past_30_trend > 0) == (pred_trend > 0) else "divergent",
-                "volatility_change": float(predicted_volatility - historical_volatility),
-                "momentum_shift": float(pred_trend - past_30_trend),
-            }
-        }
-        
-        # Moving averages data
-        moving_averages = {
-            "ma50": float(hist['MA50'].iloc[-1]) if not pd.isna(hist['MA50'].iloc[-1]) else None,
-            "ma100": float(hist['MA100'].iloc[-1]) if not pd.isna(hist['MA100'].iloc[-1]) else None,
-            "ma200": float(hist['MA200'].iloc[-1]) if not pd.isna(hist['MA200'].iloc[-1]) else None,
-            "current_vs_ma50": float((current_price / hist['MA50'].iloc[-1] - 1) * 100) if not pd.isna(hist['MA50'].iloc[-1]) else None,
-            "current_vs_ma100": float((current_price / hist['MA100'].iloc[-1] - 1) * 100) if not pd.isna(hist['MA100'].iloc[-1]) else None,
-            "current_vs_ma200": float((current_price / hist['MA200'].iloc[-1] - 1) * 100) if not pd.isna(hist['MA200'].iloc[-1]) else None,
-        }
-        
-        metrics = {
-            "current_price": current_price,
-            "predicted_price": predicted_price,
-            "change": change,
-            "change_percent": change_percent,
-            "avg_prediction": float(np.mean(predictions)),
-            "max_prediction": float(np.max(predictions)),
-            "min_prediction": float(np.min(predictions)),
-            "confidence_interval_upper": float(np.mean(predictions) + 1.96 * np.std(predictions)),
-            "confidence_interval_lower": float(np.mean(predictions) - 1.96 * np.std(predictions)),
-        }
-        
-        return {
-            "symbol": request.symbol,
-            "predictions": [float(p[0]) for p in predictions],
-            "historical_data": historical_data,
-            "forecast_dates": forecast_dates,
-            "metrics": metrics,
-            "trend_comparison": trend_comparison,
-            "moving_averages": moving_averages,
-        }
+        prediction_cache.put(key, body)
+        if prediction_cache.persistent:
+            await io_pool.run(prediction_cache.store, key, body)
+        return PredictionResult(body, etag, "MISS")
     
     except HTTPException:
         raise
     except Exception as e:
+        ERRORS.inc(operation="predict", type=type(e).__name__)
         raise HTTPException(status_code=500, detail=str(e))
 
-def calculate_trend(data: np.ndarray) -> float:
-    """
-    Calculate trend slope using linear regression
+def prediction_seed(symbol: str, last_bar) -> int:
     """
-    n = len(data)
-    x = np.arange(n)
+    Noise seed for the simple forecaster and the Monte Carlo simulation
     
-    # Calculate slope using least squares
-    x_mean = np.mean(x)
-    y_mean = np.mean(data)
+    Stable across processes (unlike hash()) so a cached response and a
+    recomputed one are identical; independent of the horizon so shorter
+    forecasts are prefixes of longer ones. `last_bar` is the last bar's
+    timestamp or storage key: both give the same seed, so every route that
+    forecasts a symbol from the same bars draws the same noise.
+    """
+    return zlib.crc32(f"{symbol}|{pd.Timestamp(last_bar).isoformat()}".encode())
+
+def render_prediction(symbol: str, hist: pd.DataFrame, days: int, forecast=None, fmt: str = "records",
+                      seed=None, simulations=None):
+    """
+    Build the prediction payload and encode it to JSON
     
-    numerator = np.sum((x - x_mean) * (data - y_mean))
-    denominator = np.sum((x - x_mean) ** 2)
+    Runs in the CPU pool, so it must stay a picklable module-level function.
+    `hist` can be a SnapshotRef, mapped here instead of pickled. Returning
+    bytes keeps the result cheap to send back from a worker process.
     
-    slope = numerator / denominator if denominator != 0 else 0
-    return slope
+    Returns:
+        (body, spans): the encoded payload and the stage timings recorded
+        while building it, for the caller to observe
+    """
+    if isinstance(hist, SnapshotRef):
+        hist = hist.frame()
+    with record_spans() as spans:
+        payload = build_prediction(symbol, hist, days, forecast, fmt, seed, simulations)
+        with span("predict", "serialize"):
+            body = dumps(payload)
+    return body, spans
 
-def simple_prediction(data: np.ndarray, days: int) -> np.ndarray:
+def build_prediction(symbol: str, hist: pd.DataFrame, days: int, forecast=None, fmt: str = "records",
+                     seed=None, simulations=None) -> dict:
     """
-    Simple prediction using moving average with trend
-    This is a placeholder until LSTM model is trained
+    Compute indicators, run the forecast and assemble the response payload
+    
+    `forecast` holds LSTM predicted prices when the model is loaded; otherwise
+    the simple moving-average prediction is used, with its noise drawn from
+    `seed` when given. With `simulations`, that many Monte Carlo paths around
+    the forecast give per-day quantile bands and the confidence interval.
     """
-    # Use last 60 days for prediction
-    window = 60
-    last_data = data[-window:]
+    # Moving averages, daily returns and volatility, unless they came with
+    # the shared snapshot (incremental: only bars new since the last request
+    # are computed)
+    missing = [name for name in PREDICT_INDICATORS if name not in hist]
+    if missing:
+        with span("predict", "indicators"):
+            for name, values in get_indicator_cache().get(symbol, hist, columns=missing).items():
+                hist[name] = values
     
-    # Calculate trend from recent data
-    trend = calculate_trend(last_data.flatten())
+    # Prepare data for prediction
+    data = hist['Close'].values.reshape(-1, 1)
     
-    predictions = []
-    current_data = last_data.copy()
+    if forecast is not None:
+        predictions = np.asarray(forecast, dtype=np.float64).reshape(-1, 1)
+    else:
+        with span("predict", "forecast"):
+            # Scale the data
+            scaler = MinMaxScaler(feature_range=(0, 1))
+            scaled_data = scaler.fit_transform(data)
+            
+            # Fallback when no trained model is available
+            predictions = simple_prediction(scaled_data, days, seed)
+            
+            # Inverse transform predictions
+            predictions = scaler.inverse_transform(predictions.reshape(-1, 1))
     
-    for i in range(days):
-        # Moving average with trend adjustment
-        ma_pred = np.mean(current_data[-30:])
-        trend_adjustment = trend * (i + 1) * 0.01  # Small trend influence
-        next_pred = ma_pred + trend_adjustment
-        
-        # Add some realistic noise
-        noise = np.random.normal(0, 0.002) if i > 0 else 0
-        next_pred = max(0.01, next_pred + noise)  # Ensure positive
+    # Generate forecast dates
+    forecast_dates = forecast_dates_after(hist.index[-1], days)
+    
+    # Prepare historical data with moving averages (built column-wise)
+    recent = hist.tail(200).copy()
+    recent['date'] = np.datetime_as_string(recent.index.to_numpy(dtype='datetime64[D]'), unit='D')
+    with span("predict", "payload"):
+        historical_data = frame_payload(recent, fmt, fields=HISTORICAL_FIELDS)
+    
+    # Calculate current metrics
+    current_price = float(data[-1][0])
+    
+    # Calculate historical trend metrics (past 30 days vs past 60 days)
+    past_30_days = hist.tail(30)['Close'].values
+    past_60_days = hist.tail(60)['Close'].values
+    past_90_days = hist.tail(90)['Close'].values
+    
+    past_30_trend = calculate_trend(past_30_days)
+    past_60_trend = calculate_trend(past_60_days)
+    past_90_trend = calculate_trend(past_90_days)
+    
+    # Calculate predicted trend
+    pred_trend = calculate_trend(predictions.flatten())
+    
+    # Volatility comparison
+    historical_volatility = float(np.std(past_30_days) / np.mean(past_30_days) * 100)
+    predicted_volatility = float(np.std(predictions) / np.mean(predictions) * 100)
+    
+    # Trend comparison analysis
+    trend_comparison = {
+        "historical_trend_30d": {
+            "direction": "upward" if past_30_trend > 0 else "downward",
+            "slope": float(past_30_trend),
+            "avg_price": float(np.mean(past_30_days)),
+            "volatility": float(np.std(past_30_days)),
+        },
+        "historical_trend_60d": {
+            "direction": "upward" if past_60_trend > 0 else "downward",
+            "slope": float(past_60_trend),
+            "avg_price": float(np.mean(past_60_days)),
+            "volatility": float(np.std(past_60_days)),
+        },
+        "historical_trend_90d": {
+            "direction": "upward" if past_90_trend > 0 else "downward",
+            "slope": float(past_90_trend),
+            "avg_price": float(np.mean(past_90_days)),
+            "volatility": float(np.std(past_90_days)),
+        },
+        "predicted_trend": {
+            "direction": "upward" if pred_trend > 0 else "downward",
+            "slope": float(pred_trend),
+            "avg_price": float(np.mean(predictions)),
+            "volatility": float(np.std(predictions)),
+        },
+        "comparison": {
+            "trend_consistency": "consistent" if (past_30_trend > 0) == (pred_trend > 0) else "divergent",
+            "volatility_change": float(predicted_volatility - historical_volatility),
+            "momentum_shift": float(pred_trend - past_30_trend),
+        }
+    }
+    
+    # Moving averages data
+    moving_averages = {
+        "ma50": float(hist['MA50'].iloc[-1]) if not pd.isna(hist['MA50'].iloc[-1]) else None,
+        "ma100": float(hist['MA100'].iloc[-1]) if not pd.isna(hist['MA100'].iloc[-1]) else None,
+        "ma200": float(hist['MA200'].iloc[-1]) if not pd.isna(hist['MA200'].iloc[-1]) else None,
+        "current_vs_ma50": float((current_price / hist['MA50'].iloc[-1] - 1) * 100) if not pd.isna(hist['MA50'].iloc[-1]) else None,
+        "current_vs_ma100": float((current_price / hist['MA100'].iloc[-1] - 1) * 100) if not pd.isna(hist['MA100'].iloc[-1]) else None,
+        "current_vs_ma200": float((current_price / hist['MA200'].iloc[-1] - 1) * 100) if not pd.isna(hist['MA200'].iloc[-1]) else None,
+    }
+    
+    metrics = prediction_metrics(current_price, predictions)
+    
+    payload = {
+        "symbol": symbol,
+        "predictions": predictions.ravel().tolist(),
+        "historical_data": historical_data,
+        "forecast_dates": forecast_dates,
+        "metrics": metrics,
+        "trend_comparison": trend_comparison,
+        "moving_averages": moving_averages,
+    }
+    
+    if simulations:
+        # Confidence interval from the simulated distribution of the final price
+        with span("predict", "simulation"):
+            volatility = daily_volatility(hist['Close'].values)
+            bands = quantile_bands(simulate_paths(predictions, volatility, simulations, seed))
+        metrics["confidence_interval_upper"] = float(bands["p97_5"][-1])
+        metrics["confidence_interval_lower"] = float(bands["p2_5"][-1])
+        payload["simulation"] = {
+            "paths": simulations,
+            "seed": seed,
+            "daily_volatility": volatility,
+            "bands": bands,
+        }
+    
+    return payload
+
+def forecast_dates_after(last_date, days: int) -> list:
+    """Calendar dates for each forecast day after the last bar"""
+    return [
+        (last_date + timedelta(days=i+1)).strftime('%Y-%m-%d')
+        for i in range(days)
+    ]
+
+def prediction_metrics(current_price: float, predictions: np.ndarray) -> dict:
+    """Summary metrics for a predicted price path"""
+    predictions = np.asarray(predictions, dtype=np.float64)
+    predicted_price = float(predictions.ravel()[-1])
+    change = predicted_price - current_price
+    change_percent = (change / current_price) * 100
+    
+    return {
+        "current_price": current_price,
+        "predicted_price": predicted_price,
+        "change": change,
+        "change_percent": change_percent,
+        "avg_prediction": float(np.mean(predictions)),
+        "max_prediction": float(np.max(predictions)),
+        "min_prediction": float(np.min(predictions)),
+        "confidence_interval_upper": float(np.mean(predictions) + 1.96 * np.std(predictions)),
+        "confidence_interval_lower": float(np.mean(predictions) - 1.96 * np.std(predictions)),
+    }
+
+@router.post("/batch")
+async def predict_batch(request: BatchPredictionRequest):
+    """
+    Generate predictions for a whole watchlist in one call
+    
+    Symbols are processed in chunks of BATCH_CHUNK_SIZE: each chunk's
+    histories are downloaded in bulk and its symbols are forecast with one
+    batched call per model. Results are streamed back as newline-delimited
+    JSON, one line per symbol, as soon as their group is done (so lines come
+    in completion order, not request order). A symbol whose download or
+    forecast fails gets an "error" line instead of failing the whole batch.
+    
+    Args:
+        symbols: Stock ticker symbols (up to MAX_BATCH_SYMBOLS)
+        horizons: Forecast lengths in days (each 5-60)
+    """
+    symbols = list(dict.fromkeys(symbol.upper() for symbol in request.symbols))
+    if not symbols or len(symbols) > MAX_BATCH_SYMBOLS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Between 1 and {MAX_BATCH_SYMBOLS} symbols are required"
+        )
+    if not request.horizons or any(days < 5 or days > 60 for days in request.horizons):
+        raise HTTPException(
+            status_code=400,
+            detail="Horizons must be between 5 and 60"
+        )
+    horizons = sorted(set(request.horizons))
+    chunks = [symbols[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(symbols), BATCH_CHUNK_SIZE)]
+    
+    async def stream():
+        # Every chunk runs concurrently; lines are sent as each group finishes
+        queue = asyncio.Queue()
         
-        predictions.append(next_pred)
+        async def run(chunk):
+            sent = set()
+            try:
+                async for results in batch_chunk(chunk, horizons):
+                    sent.update(result["symbol"] for result in results)
+                    await queue.put([batch_line(result) for result in results])
+            except Exception as e:
+                # Unexpected failure (e.g. a model that fails to load): every
+                # symbol still gets its line, so the stream is never short
+                ERRORS.inc(operation="predict_batch", type=type(e).__name__)
+                await queue.put([batch_line({"symbol": symbol, "error": str(e)})
+                                 for symbol in chunk if symbol not in sent])
+            finally:
+                await queue.put(None)
         
-        # Update window
-        current_data = np.append(current_data[1:], next_pred)
+        tasks = [asyncio.ensure_future(run(chunk)) for chunk in chunks]
+        try:
+            running = len(tasks)
+            while running:
+                lines = await queue.get()
+                if lines is None:
+                    running -= 1
+                else:
+                    yield b"".join(lines)
+        finally:
+            for task in tasks:
+                task.cancel()
     
-    return np.array(predictions)
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+async def batch_chunk(symbols: list, horizons: list):
+    """
+    Result lines for one chunk of a batch, yielded per model group as each
+    finishes; failures become error lines for the symbols they affect
+    """
+    try:
+        # One bulk download for every symbol of the chunk that isn't cached
+        with span("predict_batch", "fetch"):
+            histories = await io_pool.run(get_history_store().get_histories, symbols, HISTORY_PERIOD)
+    except Exception as e:
+        ERRORS.inc(operation="predict_batch", type=type(e).__name__)
+        yield [{"symbol": symbol, "error": str(e)} for symbol in symbols]
+        return
+    
+    usable = {symbol: hist for symbol, hist in histories.items() if len(hist) >= WINDOW}
+    unusable = [symbol for symbol in symbols if symbol not in usable]
+    if unusable:
+        yield [batch_result(symbol, histories.get(symbol), None, horizons) for symbol in unusable]
+    
+    # One batched forecast per model, out to the longest horizon
+    for engine, group in await engine_groups(list(usable)):
+        series = [usable[symbol]['Close'].to_numpy(dtype=np.float64) for symbol in group]
+        last_bars = [usable[symbol].index[-1].isoformat() for symbol in group]
+        try:
+            with span("predict_batch", "forecast"):
+                predictions = await forecast_group(engine, series, max(horizons), group, last_bars)
+        except Exception as e:
+            ERRORS.inc(operation="predict_batch", type=type(e).__name__)
+            yield [{"symbol": symbol, "error": str(e)} for symbol in group]
+            continue
+        yield [batch_result(symbol, usable[symbol], forecast, horizons) for symbol, forecast in zip(group, predictions)]
+
+def batch_line(result: dict) -> bytes:
+    return dumps(result) + b"\n"
+
+async def engine_groups(symbols: list) -> list:
+    """Symbols grouped by the model serving them, as [(engine or None, symbols)]"""
+    groups = {}
+    for symbol in symbols:
+        engine = await engine_for(symbol)
+        groups.setdefault(id(engine), (engine, []))[1].append(symbol)
+    return list(groups.values())
+
+async def forecast_group(engine, series: list, days: int, symbols: list, last_bars: list) -> list:
+    """
+    Forecast close-price arrays with one batched call to `engine` (None: the
+    simple prediction, seeded per symbol and last bar like the single route)
+    """
+    if engine is not None:
+        return await engine.forecast_many(series, days, symbols)
+    seeds = [prediction_seed(symbol, last_bar) for symbol, last_bar in zip(symbols, last_bars)]
+    return await cpu_pool.run(simple_forecast_batch, series, days, seeds)
+
+async def forecast_closes(closes: dict, days: int, last_bars: dict) -> dict:
+    """
+    Forecast close-price arrays ({symbol: closes}, each at least WINDOW long,
+    ending at the bar timestamp in `last_bars`) with one call per model
+    """
+    forecasts = {}
+    for engine, symbols in await engine_groups(list(closes)):
+        predictions = await forecast_group(
+            engine, [closes[symbol] for symbol in symbols], days, symbols, [last_bars[symbol] for symbol in symbols]
+        )
+        forecasts.update(zip(symbols, predictions))
+    return forecasts
+
+def simple_forecast_batch(series: list, days: int, seeds=None) -> list:
+    """
+    simple_prediction for many close-price histories in one vectorized pass
+    
+    Each series is min-max scaled on its own history, as the single-symbol
+    route does, and the scaled windows are stacked into one array. `seeds`
+    holds one noise seed per series.
+    """
+    lows = np.array([values.min() for values in series])
+    spans = np.array([values.max() - values.min() for values in series])
+    spans[spans == 0] = 1.0
+    windows = np.stack([values[-WINDOW:] for values in series])
+    
+    scaled = (windows - lows[:, None]) / spans[:, None]
+    predictions = simple_prediction_batch(scaled, days, seeds) * spans[:, None] + lows[:, None]
+    return list(predictions)
+
+def batch_result(symbol: str, hist, forecast, horizons: list) -> dict:
+    """One line of the batch response"""
+    if hist is None or hist.empty:
+        return {"symbol": symbol, "error": f"No data found for symbol: {symbol}"}
+    if forecast is None:
+        return {"symbol": symbol, "error": f"Not enough history for symbol: {symbol}"}
+    
+    try:
+        current_price = float(hist['Close'].iloc[-1])
+        dates = forecast_dates_after(hist.index[-1], max(horizons))
+        return {
+            "symbol": symbol,
+            "forecasts": {
+                str(days): {
+                    "predictions": forecast[:days].tolist(),
+                    "forecast_dates": dates[:days],
+                    "metrics": prediction_metrics(current_price, forecast[:days]),
+                }
+                for days in horizons
+            },
+        }
+    except Exception as e:
+        return {"symbol": symbol, "error": str(e)}
@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Header, HTTPException
+from pydantic import BaseModel
+from typing import List, Optional
+import os
+
+from app.routes.models import require_admin
+from app.routes.predict import PredictionRequest, cached_prediction
+from app.routes.stock import load_stock_data
+from app.utils.history_store import HISTORY_DB_PATH
+from app.utils.info_store import get_info_store
+from app.utils.scheduler import Scheduler
+
+router = APIRouter()
+
+# Configuration
+SCHEDULER_WATCHLIST = os.getenv("SCHEDULER_WATCHLIST", "")            # Comma-separated symbols
+SCHEDULER_WATCHLIST_FILE = os.getenv("SCHEDULER_WATCHLIST_FILE", "")  # One symbol per line, # comments
+SCHEDULER_MODE = os.getenv("SCHEDULER_MODE", "close")                # "close" or "interval"
+SCHEDULER_INTERVAL = int(os.getenv("SCHEDULER_INTERVAL_SECONDS", "3600"))
+SCHEDULER_CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "4"))
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER_SECONDS", "30"))
+SCHEDULER_HORIZONS = [int(days) for days in os.getenv("SCHEDULER_HORIZONS", "30").split(",") if days.strip()]
+SCHEDULER_RUN_ON_STARTUP = os.getenv("SCHEDULER_RUN_ON_STARTUP", "1") == "1"
+SCHEDULER_LOCK_PATH = os.path.join(os.path.dirname(HISTORY_DB_PATH), "scheduler.lock")  # One worker runs the schedule
+STOCK_PERIOD = "1y"  # The stock route's default period
+
+class RunRequest(BaseModel):
+    symbols: Optional[List[str]] = None  # Part of the watchlist (default: all of it)
+
+def load_watchlist() -> list:
+    """Symbols from SCHEDULER_WATCHLIST and SCHEDULER_WATCHLIST_FILE"""
+    symbols = [symbol.strip().upper() for symbol in SCHEDULER_WATCHLIST.split(",") if symbol.strip()]
+    if SCHEDULER_WATCHLIST_FILE:
+        with open(SCHEDULER_WATCHLIST_FILE) as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    symbols.append(line.split()[0].upper())
+    return list(dict.fromkeys(symbols))
+
+async def precompute(symbol: str):
+    """
+    Warm everything a request for `symbol` needs
+    
+    Forecasts go through the same coalescing and result cache as the
+    prediction route, so a user request for the default format and a
+    scheduled horizon is served from cache. The 2y history they refresh
+    also covers the stock route's period, whose indicators are brought up
+    to date next.
+    """
+    await get_info_store().get(symbol)
+    for days in SCHEDULER_HORIZONS:
+        await cached_prediction(PredictionRequest(symbol=symbol, days=days), "records")
+    await load_stock_data(symbol, STOCK_PERIOD)
+
+watchlist_scheduler = Scheduler(
+    precompute,
+    load_watchlist(),
+    mode=SCHEDULER_MODE,
+    interval=SCHEDULER_INTERVAL,
+    concurrency=SCHEDULER_CONCURRENCY,
+    jitter=SCHEDULER_JITTER,
+    run_on_start=SCHEDULER_RUN_ON_STARTUP,
+    lock_path=SCHEDULER_LOCK_PATH,
+)
+
+@router.get("/")
+async def scheduler_status():
+    """
+    Schedule, last run summary and the latest job status of every watchlist symbol
+    """
+    return {**watchlist_scheduler.stats(), "jobs": watchlist_scheduler.jobs}
+
+@router.post("/run", status_code=202)
+async def run_scheduler(request: RunRequest = RunRequest(), x_admin_token: Optional[str] = Header(None)):
+    """
+    Start a pre-computation run now instead of waiting for the next one
+    
+    While a run is in progress, the requested symbols it does not cover are
+    queued for a follow-up run that starts as soon as it finishes.
+    
+    Args:
+        symbols: Watchlist symbols to refresh (default: the whole watchlist)
+    """
+    require_admin(x_admin_token)
+    
+    symbols = None
+    if request.symbols:
+        symbols = [symbol.upper() for symbol in request.symbols]
+        unknown = sorted(set(symbols) - set(watchlist_scheduler.symbols))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Not in the watchlist: {', '.join(unknown)}")
+    if not (symbols or watchlist_scheduler.symbols):
+        raise HTTPException(status_code=400, detail="The watchlist is empty")
+    
+    watchlist_scheduler.trigger(symbols)
+    return watchlist_scheduler.stats()
@@ -0,0 +1,181 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import List, Optional
+import asyncio
+import logging
+import os
+import numpy as np
+import pandas as pd
+
+from app.models.forecast import WINDOW
+from app.routes.predict import HISTORY_PERIOD, forecast_closes
+from app.utils.executors import io_pool
+from app.utils.history_store import get_history_store, period_start
+from app.utils.metrics import ERRORS, span
+from app.utils.screener import FIELDS, PriceMatrix, load_universe, parse_condition, screen
+from app.utils.serialization import FastJSONResponse, dumps
+from app.utils.singleflight import coalescer
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Configuration
+SCREENER_DAYS = int(os.getenv("SCREENER_DAYS", "504"))                   # Trading days kept per symbol (the 2y history)
+SCREENER_FORECASTS = os.getenv("SCREENER_FORECASTS", "1") == "1"         # Forecast fields, one batched forecast per build
+SCREENER_FORECAST_DAYS = int(os.getenv("SCREENER_FORECAST_DAYS", "30"))
+MAX_SCREENER_RESULTS = 1000
+
+class Universe:
+    """
+    The price matrix of every stored daily history
+    
+    It is rebuilt once any stored history was refreshed after it was built.
+    The first request waits for the build; later ones are answered from the
+    previous matrix while the next one is built in the background.
+    """
+    
+    def __init__(self):
+        self.matrix = None
+        self.builds = 0
+        self.last_error = None
+    
+    async def get(self) -> PriceMatrix:
+        refreshed = await io_pool.run(get_history_store().last_refreshed, "1d")
+        if self.matrix is None or refreshed > self.matrix.source_refreshed:
+            build = coalescer.do(("screener",), self.rebuild)
+            if self.matrix is None:
+                await build
+            else:
+                asyncio.ensure_future(build)
+        if self.matrix is None:
+            raise RuntimeError(self.last_error or "The screener universe is not built yet")
+        return self.matrix
+    
+    async def rebuild(self):
+        try:
+            start = period_start(HISTORY_PERIOD).isoformat()
+            with span("screener", "matrix"):
+                # Read and packed on an I/O thread: the long close frame is too big to ship to a worker process
+                matrix, closes = await io_pool.run(load_universe, get_history_store(), start, SCREENER_DAYS)
+            if SCREENER_FORECASTS and len(matrix):
+                with span("screener", "forecast"):
+                    await add_forecasts(matrix, closes)
+        except Exception as e:
+            ERRORS.inc(operation="screener", type=type(e).__name__)
+            logger.warning("Screener universe build failed: %s", e)
+            self.last_error = str(e)
+            return
+        self.matrix = matrix
+        self.builds += 1
+        self.last_error = None
+    
+    def stats(self):
+        matrix = self.matrix
+        return {
+            "symbols": len(matrix) if matrix is not None else 0,
+            "days": len(matrix.dates) if matrix is not None else 0,
+            "as_of": str(matrix.dates[-1]) if matrix is not None and len(matrix.dates) else None,
+            "matrix_bytes": matrix.closes.nbytes if matrix is not None else 0,
+            "built_at": matrix.built_at if matrix is not None else None,
+            "builds": self.builds,
+            "last_error": self.last_error,
+            "fields": list(matrix.fields) if matrix is not None else list(FIELDS),
+        }
+
+async def add_forecasts(matrix: PriceMatrix, closes: dict):
+    """
+    Forecast every symbol with at least WINDOW bars in one batch per model
+    
+    The forecasts use the stored closes at full precision and the per-symbol
+    seeds, so they are the ones /api/predict and the batch route return.
+    
+    Args:
+        matrix: Universe the forecast fields are added to
+        closes: {symbol: (closes, last bar key)} of every symbol in the matrix
+    """
+    usable = {symbol: values for symbol, values in closes.items() if len(values[0]) >= WINDOW}
+    forecasts = await forecast_closes(
+        {symbol: values for symbol, (values, _) in usable.items()},
+        SCREENER_FORECAST_DAYS,
+        {symbol: pd.Timestamp(last_bar).isoformat() for symbol, (_, last_bar) in usable.items()},
+    )
+    
+    predicted = np.full(len(matrix), np.nan)
+    change = np.full(len(matrix), np.nan)
+    for row, symbol in enumerate(matrix.symbols.tolist()):
+        if symbol in forecasts:
+            last_close = usable[symbol][0][-1]
+            predicted[row] = forecasts[symbol][-1]
+            change[row] = (predicted[row] - last_close) / last_close * 100
+    matrix.add_field("predicted_price", predicted)
+    matrix.add_field("forecast_change_percent", change)
+
+universe = Universe()
+
+@router.get("/")
+async def screen_universe(
+    where: List[str] = Query([]),
+    sort: Optional[str] = None,
+    limit: int = 50,
+    symbols: Optional[str] = None,
+):
+    """
+    Screen every stored symbol by its latest indicators and forecast
+    
+    Conditions are evaluated for the whole universe at once over a
+    date-aligned price matrix built from the history store, so a screen
+    takes milliseconds however many symbols are stored. Symbols get into the
+    universe by being requested once or through the scheduler watchlist.
+    
+    Args:
+        where: Conditions that must all hold, "field op value" with op one of
+            <, <=, >, >= and a number or another field as value
+            (e.g. where=rsi<30&where=close<ma200&where=forecast_change_percent>5)
+        sort: Field to order by, "-field" for descending (default: symbol order)
+        limit: Maximum number of results (1-1000)
+        symbols: Comma-separated part of the universe to screen (default: all of it)
+    """
+    if limit < 1 or limit > MAX_SCREENER_RESULTS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_SCREENER_RESULTS}")
+    
+    try:
+        matrix = await universe.get()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    fields = tuple(matrix.fields)
+    try:
+        conditions = [parse_condition(condition, fields) for condition in where]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if sort is not None and sort.lower().lstrip("-") not in fields:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(fields)}")
+    
+    rows = None
+    if symbols:
+        requested = [symbol.strip().upper() for symbol in symbols.split(",") if symbol.strip()]
+        rows = np.flatnonzero(np.isin(matrix.symbols, requested))
+    
+    with span("screener", "screen"):
+        picked, matched = screen(matrix.fields, conditions, sort and sort.lower(), limit, rows)
+        columns = {name: values[picked].tolist() for name, values in matrix.fields.items()}
+    
+    return FastJSONResponse(dumps({
+        "as_of": str(matrix.dates[-1]) if len(matrix.dates) else None,
+        "universe": len(matrix),
+        "matched": matched,
+        "results": [
+            {
+                "symbol": str(matrix.symbols[row]),
+                "last_bar": str(matrix.last_bars[row]),
+                **{name: values[i] for name, values in columns.items()},
+            }
+            for i, row in enumerate(picked.tolist())
+        ],
+    }))
+
+@router.get("/stats")
+async def screener_stats():
+    """
+    Size, age and fields of the screener universe
+    """
+    return universe.stats()
@@ -1,104 +1,313 @@
-from fastapi import APIRouter, HTTPException
-import yfinance as yf
-from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+import math
+import os
+from datetime import date, datetime, timedelta
+from typing import Optional
 import pandas as pd
 import numpy as np
 
+from app.utils.executors import cpu_pool, io_pool
+from app.utils.history_store import INTERVALS, PERIODS, bar_key, get_history_store
+from app.utils.indicator_state import get_indicator_cache
+from app.utils.indicators import LOOKBACK, compute_indicators
+from app.utils.info_store import get_info_store
+from app.utils.metrics import ERRORS, observe_spans, record_spans, span
+from app.utils.serialization import RESPONSE_FORMATS, FastJSONResponse, dumps, frame_columns, frame_payload, frame_records
+from app.utils.shared_store import SnapshotChanged, SnapshotRef, get_shared_history
+from app.utils.singleflight import coalescer
+
 router = APIRouter()
 
+STOCK_INDICATORS = (
+    "MA50", "MA100", "MA200", "MA20",
+    "Daily_Return", "Volatility",
+    "BB_upper", "BB_lower",
+    "RSI",
+)
+
+STREAM_FORMATS = ("ndjson", "columnar")
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "1000"))
+MAX_STREAM_CHUNK_SIZE = 10000
+MAX_INFO_SYMBOLS = int(os.getenv("MAX_INFO_SYMBOLS", "200"))
+
+@router.get("/info")
+async def get_stocks_info(symbols: str):
+    """
+    Basic information for many stocks in one call, served from the metadata store
+    
+    Stored entries are returned immediately (stale ones are refreshed in the
+    background); symbols never seen before are fetched concurrently. A symbol
+    whose lookup fails gets an "error" entry instead of failing the call.
+    
+    Args:
+        symbols: Comma-separated ticker symbols (up to MAX_INFO_SYMBOLS)
+    """
+    requested = list(dict.fromkeys(symbol.strip().upper() for symbol in symbols.split(",") if symbol.strip()))
+    if not requested or len(requested) > MAX_INFO_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_INFO_SYMBOLS} symbols are required")
+    
+    found = await get_info_store().get_many(requested)
+    return [
+        info_payload(symbol, found[symbol]) if found[symbol] is not None
+        else {"symbol": symbol, "error": f"No information found for symbol: {symbol}"}
+        for symbol in requested
+    ]
+
 @router.get("/{symbol}")
-async def get_stock_data(symbol: str, period: str = "1y"):
+async def get_stock_data(symbol: str, period: str = "1y", fmt: str = Query("records", alias="format")):
     """
     Fetch stock data from Yahoo Finance with moving averages and technical indicators
     
     Args:
         symbol: Stock ticker symbol (e.g., AAPL, TSLA)
         period: Time period (1mo, 3mo, 6mo, 1y, 2y, 5y)
+        format: "records" (list of row objects) or "columnar" (one array per field)
     """
+    if fmt not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of: {', '.join(PERIODS)}")
+    
+    # Identical concurrent requests share a single computation
+    body = await coalescer.do(
+        ("stock", symbol.upper(), period, None, None, fmt),
+        lambda: load_stock_data(symbol, period, fmt),
+    )
+    return FastJSONResponse(body)
+
+async def load_stock_data(symbol: str, period: str, fmt: str = "records") -> bytes:
+    """Build the encoded stock data payload (history, indicators, info and summary)"""
     try:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period=period)
+        # Bars and indicators are zero-copy views of the snapshot shared by all workers
+        with span("stock", "fetch"):
+            hist, ref = await io_pool.run(get_shared_history().get_history_ref, symbol, period, "1d", STOCK_INDICATORS)
         
         if hist.empty:
             raise HTTPException(status_code=404, detail=f"No data found for symbol: {symbol}")
         
-        # Calculate moving averages
-        hist['MA50'] = hist['Close'].rolling(window=50).mean()
-        hist['MA100'] = hist['Close'].rolling(window=100).mean()
-        hist['MA200'] = hist['Close'].rolling(window=200).mean()
-        
-        # Calculate additional technical indicators
-        hist['MA20'] = hist['Close'].rolling(window=20).mean()
-        hist['Daily_Return'] = hist['Close'].pct_change()
-        hist['Volatility'] = hist['Daily_Return'].rolling(window=20).std()
-        
-        # Calculate Bollinger Bands
-        hist['BB_upper'] = hist['MA20'] + (hist['Close'].rolling(window=20).std() * 2)
-        hist['BB_lower'] = hist['MA20'] - (hist['Close'].rolling(window=20).std() * 2)
-        
-        # Calculate RSI (Relative Strength Index)
-        delta = hist['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss
-        hist['RSI'] = 100 - (100 / (1 + rs))
-        
-        # Reset index to make Date a column
-        hist.reset_index(inplace=True)
-        
-        # Convert to dict for JSON response
-        data = hist.to_dict(orient='records')
-        
-        # Get stock info
-        info = stock.info
-        
-        # Calculate summary statistics
-        recent_data = hist.tail(30)
-        summary = {
-            "avg_volume": float(recent_data['Volume'].mean()),
-            "avg_price": float(recent_data['Close'].mean()),
-            "price_std": float(recent_data['Close'].std()),
-            "min_price": float(recent_data['Close'].min()),
-            "max_price": float(recent_data['Close'].max()),
-            "current_ma50": float(hist['MA50'].iloc[-1]) if not pd.isna(hist['MA50'].iloc[-1]) else None,
-            "current_ma100": float(hist['MA100'].iloc[-1]) if not pd.isna(hist['MA100'].iloc[-1]) else None,
-            "current_ma200": float(hist['MA200'].iloc[-1]) if not pd.isna(hist['MA200'].iloc[-1]) else None,
+        # Metadata comes from the store and never waits on Yahoo Finance; a
+        # symbol seen for the first time gets defaults while it is fetched
+        info = await get_info_store().get(symbol, wait=False) or {}
+        info = {
+            "name": info.get("longName", symbol),
+            "currency": info.get("currency", "USD"),
+            "exchange": info.get("exchange", "Unknown"),
+            # The stored quote can be a day old; the latest bar is not
+            "currentPrice": float(hist['Close'].iloc[-1]),
+            "marketCap": info.get("marketCap", 0)
         }
         
-        return {
-            "symbol": symbol,
-            "data": data,
-            "info": {
-                "name": info.get("longName", symbol),
-                "currency": info.get("currency", "USD"),
-                "exchange": info.get("exchange", "Unknown"),
-                "currentPrice": info.get("currentPrice", 0),
-                "marketCap": info.get("marketCap", 0)
-            },
-            "summary": summary
-        }
+        # Indicators, payload assembly and JSON encoding all happen in the CPU
+        # pool, which maps the snapshot itself (the frame is only sent if the
+        # file was replaced in the meantime)
+        with span("stock", "render"):
+            try:
+                body, spans = await cpu_pool.run(render_stock_data, symbol, ref, info, fmt)
+            except SnapshotChanged:
+                body, spans = await cpu_pool.run(render_stock_data, symbol, hist, info, fmt)
+        observe_spans(spans)
+        return body
     
+    except HTTPException:
+        raise
     except Exception as e:
+        ERRORS.inc(operation="stock", type=type(e).__name__)
         raise HTTPException(status_code=500, detail=str(e))
 
+def render_stock_data(symbol: str, hist: pd.DataFrame, info: dict, fmt: str = "records"):
+    """
+    Compute the stock data payload and encode it to JSON
+    
+    Runs in the CPU pool, so it must stay a picklable module-level function.
+    `hist` can be a SnapshotRef, mapped here instead of pickled. Returning
+    bytes keeps the result cheap to send back from a worker process.
+    
+    Returns:
+        (body, spans): the encoded payload and the stage timings recorded
+        while building it, for the caller to observe
+    """
+    if isinstance(hist, SnapshotRef):
+        hist = hist.frame()
+    with record_spans() as spans:
+        data, summary = compute_stock_data(symbol, hist, fmt)
+        with span("stock", "serialize"):
+            body = dumps({
+                "symbol": symbol,
+                "data": data,
+                "info": info,
+                "summary": summary
+            })
+    return body, spans
+
+def compute_stock_data(symbol: str, hist: pd.DataFrame, fmt: str = "records"):
+    """Calculate technical indicators and summary statistics"""
+    # Moving averages, returns, volatility, Bollinger Bands and RSI, unless
+    # they came with the shared snapshot (incremental: only bars new since
+    # the last request are computed)
+    missing = [name for name in STOCK_INDICATORS if name not in hist]
+    if missing:
+        with span("stock", "indicators"):
+            for name, values in get_indicator_cache().get(symbol, hist, columns=missing).items():
+                hist[name] = values
+    
+    # Date becomes the first field; NaN becomes null
+    with span("stock", "payload"):
+        data = frame_payload(hist, fmt, index_field="Date")
+    
+    # Calculate summary statistics
+    recent_data = hist.tail(30)
+    summary = {
+        "avg_volume": float(recent_data['Volume'].mean()),
+        "avg_price": float(recent_data['Close'].mean()),
+        "price_std": float(recent_data['Close'].std()),
+        "min_price": float(recent_data['Close'].min()),
+        "max_price": float(recent_data['Close'].max()),
+        "current_ma50": float(hist['MA50'].iloc[-1]) if not pd.isna(hist['MA50'].iloc[-1]) else None,
+        "current_ma100": float(hist['MA100'].iloc[-1]) if not pd.isna(hist['MA100'].iloc[-1]) else None,
+        "current_ma200": float(hist['MA200'].iloc[-1]) if not pd.isna(hist['MA200'].iloc[-1]) else None,
+    }
+    
+    return data, summary
+
 @router.get("/{symbol}/info")
 async def get_stock_info(symbol: str):
     """Get basic stock information"""
     try:
-        stock = yf.Ticker(symbol)
-        info = stock.info
-        
-        return {
-            "symbol": symbol,
-            "name": info.get("longName", symbol),
-            "sector": info.get("sector", "Unknown"),
-            "industry": info.get("industry", "Unknown"),
-            "currency": info.get("currency", "USD"),
-            "exchange": info.get("exchange", "Unknown"),
-            "currentPrice": info.get("currentPrice", 0),
-            "marketCap": info.get("marketCap", 0),
-            "description": info.get("longBusinessSummary", "")
-        }
+        info = await get_info_store().get(symbol)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if info is None:
+        raise HTTPException(status_code=500, detail=f"Could not load information for symbol: {symbol}")
+    
+    return info_payload(symbol, info)
+
+def info_payload(symbol: str, info: dict) -> dict:
+    """Response shape of the info endpoints"""
+    return {
+        "symbol": symbol,
+        "name": info.get("longName", symbol),
+        "sector": info.get("sector", "Unknown"),
+        "industry": info.get("industry", "Unknown"),
+        "currency": info.get("currency", "USD"),
+        "exchange": info.get("exchange", "Unknown"),
+        "currentPrice": info.get("currentPrice", 0),
+        "marketCap": info.get("marketCap", 0),
+        "description": info.get("longBusinessSummary", "")
+    }
+
+@router.get("/{symbol}/stream")
+async def stream_stock_data(
+    symbol: str,
+    period: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: Optional[int] = None,
+    interval: str = "1d",
+    fmt: str = Query("ndjson", alias="format"),
+    chunk_size: int = STREAM_CHUNK_SIZE,
+):
+    """
+    Stream bars with technical indicators as newline-delimited JSON
+    
+    Bars are read from the history store and encoded a chunk at a time, so
+    memory per request is bounded by `chunk_size` however long the range is.
+    Each chunk's indicators are computed with the LOOKBACK bars before it, so
+    values match a computation over the whole history. When `limit` cuts the
+    range short, the X-Next-Start header holds the `start` of the next page.
+    
+    Args:
+        symbol: Stock ticker symbol
+        period: Range to keep downloaded when `start` is not given (default 1y, 5d for intraday)
+        start: First bar (YYYY-MM-DD, or a bar key from X-Next-Start)
+        end: Last bar, inclusive (YYYY-MM-DD)
+        limit: Maximum number of bars in this page
+        interval: Bar size (1d, 1wk, 1h, 5m, ...)
+        format: "ndjson" (one object per bar) or "columnar" (one object of arrays per chunk)
+        chunk_size: Bars per chunk (1-10000)
+    """
+    if fmt not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(STREAM_FORMATS)}")
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"interval must be one of: {', '.join(INTERVALS)}")
+    if period is not None and period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of: {', '.join(PERIODS)}")
+    if not 1 <= chunk_size <= MAX_STREAM_CHUNK_SIZE:
+        raise HTTPException(status_code=400, detail=f"chunk_size must be between 1 and {MAX_STREAM_CHUNK_SIZE}")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
     
+    symbol = symbol.upper()
+    intraday = not interval.endswith(("d", "wk", "mo"))
+    period = period or ("5d" if intraday else "1y")
+    # A bare end date includes every intraday bar of that day
+    end = f"{end} 23:59:59" if end is not None and len(end) == 10 else end
+    
+    store = get_history_store()
+    try:
+        covered_from = await io_pool.run(store.refresh, symbol, period, interval, warmup_start(start, interval))
+        first = start or covered_from
+        next_start = await io_pool.run(store.key_at, symbol, interval, first, end, limit) if limit else None
+        warmup = await io_pool.run(store.read_closes_before, symbol, interval, first, LOOKBACK)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        ERRORS.inc(operation="stock_stream", type=type(e).__name__)
         raise HTTPException(status_code=500, detail=str(e))
+    
+    async def stream():
+        nonlocal warmup
+        remaining, after = limit, None
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            try:
+                # SQLite read on an I/O thread, indicators and encoding in the CPU pool
+                bars = await io_pool.run(store.read, symbol, interval, start=first, end=end, limit=size, after=after)
+                count = len(bars)
+                if count:
+                    body, after, warmup, spans = await cpu_pool.run(render_chunk, bars, interval, warmup, fmt)
+                    observe_spans(spans)
+            except Exception as e:
+                # Headers are already sent; report the failure in-band like the batch endpoint
+                ERRORS.inc(operation="stock_stream", type=type(e).__name__)
+                yield dumps({"symbol": symbol, "error": str(e)}) + b"\n"
+                return
+            if count == 0:
+                return
+            yield body
+            if remaining is not None:
+                remaining -= count
+    
+    headers = {"X-Next-Start": next_start} if next_start else {}
+    return StreamingResponse(stream(), media_type="application/x-ndjson", headers=headers)
+
+def warmup_start(start: Optional[str], interval: str) -> Optional[str]:
+    """
+    Date to keep downloaded from so daily bars at `start` come with LOOKBACK
+    earlier bars; None (the period decides) when no start is given
+    """
+    if start is None or interval != "1d":
+        return start
+    # Trading days to calendar days, with slack for holidays
+    days = math.ceil(LOOKBACK * 7 / 5) + 14
+    return (date.fromisoformat(start[:10]) - timedelta(days=days)).isoformat()
+
+def render_chunk(bars: pd.DataFrame, interval: str, warmup: np.ndarray, fmt: str):
+    """
+    Encode a chunk of bars with their indicators
+    
+    Runs in the CPU pool, so it must stay a picklable module-level function.
+    
+    Returns:
+        (body, last bar key, closes to carry into the next chunk, stage timings)
+    """
+    with record_spans() as spans, span("stock_stream", "chunk"):
+        closes = np.concatenate((warmup, bars["Close"].to_numpy(dtype=np.float64)))
+        for name, values in compute_indicators(closes, STOCK_INDICATORS).items():
+            bars[name] = values[len(warmup):]
+        
+        if fmt == "columnar":
+            body = dumps(frame_columns(bars, index_field="Date")) + b"\n"
+        else:
+            body = b"".join(dumps(row) + b"\n" for row in frame_records(bars, index_field="Date"))
+    return body, bar_key(bars.index[-1], interval), closes[-LOOKBACK:], spans
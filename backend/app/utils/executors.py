@@ -0,0 +1,108 @@
+"""
+Execution pools for work that must not run on the event loop
+
+Blocking network I/O (Yahoo Finance, SQLite) goes to a bounded thread pool,
+CPU-heavy pandas/NumPy work to a process pool. Each pool has its own
+concurrency limit; callers beyond the limit wait on a semaphore, and the
+number of waiters is reported as the queue depth.
+"""
+
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Configuration
+IO_POOL_WORKERS = int(os.getenv("IO_POOL_WORKERS", "16"))
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(os.cpu_count() or 1)))
+CPU_POOL_MODE = os.getenv("CPU_POOL_MODE", "process")  # "process" or "thread"
+
+
+class BoundedPool:
+    """Executor wrapper with a concurrency limit and queue-depth accounting"""
+
+    def __init__(self, name, executor_factory, limit):
+        self.name = name
+        self.limit = limit
+        self._executor_factory = executor_factory
+        self._executor = None
+        self._semaphore = None
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = self._executor_factory()
+        return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        """Run `fn(*args, **kwargs)` in the pool once a slot is free"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+        self.completed += 1
+        return result
+
+    def stats(self):
+        return {
+            "limit": self.limit,
+            "running": self.running,
+            "queued": self.queued,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._semaphore = None
+
+
+def _cpu_executor():
+    if CPU_POOL_MODE == "thread" or CPU_POOL_WORKERS <= 0:
+        return ThreadPoolExecutor(max_workers=max(CPU_POOL_WORKERS, 1), thread_name_prefix="cpu")
+    # spawn: forking a process that already runs threads is unsafe
+    return ProcessPoolExecutor(
+        max_workers=CPU_POOL_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+io_pool = BoundedPool(
+    "io",
+    lambda: ThreadPoolExecutor(max_workers=IO_POOL_WORKERS, thread_name_prefix="io"),
+    IO_POOL_WORKERS,
+)
+cpu_pool = BoundedPool("cpu", _cpu_executor, max(CPU_POOL_WORKERS, 1))
+
+
+def pool_stats():
+    """Concurrency and queue-depth metrics for every pool"""
+    return {pool.name: pool.stats() for pool in (io_pool, cpu_pool)}
+
+
+def shutdown_pools():
+    for pool in (io_pool, cpu_pool):
+        pool.shutdown()
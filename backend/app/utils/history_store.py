@@ -0,0 +1,428 @@
+"""
+Local OHLCV history store with incremental refresh
+
+Bars are kept in a SQLite database on local disk. A cold request downloads
+the full period once; after that only bars newer than the last stored date
+are fetched, and only when the cached copy is stale according to the
+market calendar.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, time
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from app.utils.metrics import CACHE_REQUESTS, upstream_call
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configuration
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", os.path.join(BACKEND_DIR, "data", "history.db"))
+OPEN_MARKET_TTL = int(os.getenv("HISTORY_TTL_SECONDS", "300"))  # Refresh interval while the market is open
+CLOSE_SETTLE_MINUTES = 20  # Yahoo keeps revising the last bar for a while after the close
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = time(9, 30)
+MARKET_CLOSE = time(16, 0)
+
+PERIOD_DAYS = {
+    "1d": 1,
+    "5d": 5,
+    "1mo": 31,
+    "3mo": 92,
+    "6mo": 183,
+    "1y": 366,
+    "2y": 731,
+    "5y": 1827,
+    "10y": 3653,
+}
+PERIODS = (*PERIOD_DAYS, "ytd", "max")  # Every period period_start() accepts
+
+# yfinance bar sizes; intraday ones are only available for recent periods upstream
+INTERVALS = ("1m", "2m", "5m", "15m", "30m", "60m", "90m", "1h", "1d", "5d", "1wk", "1mo", "3mo")
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"]
+DB_COLUMNS = ["open", "high", "low", "close", "volume", "dividends", "stock_splits"]
+
+
+class YahooFetcher:
+    """Upstream fetcher backed by Yahoo Finance"""
+
+    def fetch(self, symbol, period=None, start=None, interval="1d"):
+        stock = yf.Ticker(symbol)
+        if start is not None:
+            return stock.history(start=start, interval=interval)
+        return stock.history(period=period, interval=interval)
+
+    def info(self, symbol):
+        """Ticker metadata (name, sector, market cap, ...)"""
+        with upstream_call("info"):
+            return yf.Ticker(symbol).info
+
+    def fetch_many(self, symbols, period=None, start=None, interval="1d"):
+        """Download several tickers in one request; returns {symbol: frame}"""
+        data = yf.download(
+            list(symbols), period=None if start else period, start=start, interval=interval,
+            group_by="ticker", auto_adjust=True, actions=True, threads=True, progress=False,
+        )
+        frames = {}
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                if symbol not in data.columns.get_level_values(0):
+                    frames[symbol] = pd.DataFrame()
+                    continue
+                frame = data[symbol]
+            else:
+                frame = data
+            frames[symbol] = frame.dropna(how="all")
+        return frames
+
+
+def is_market_open(now=None):
+    """Check whether the US equity market is in its regular session"""
+    now = now or datetime.now(MARKET_TZ)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def last_market_close(now=None):
+    """Most recent regular-session close at or before now (holidays are ignored)"""
+    now = now or datetime.now(MARKET_TZ)
+    close = datetime.combine(now.date(), MARKET_CLOSE, tzinfo=MARKET_TZ)
+    if now < close:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close
+
+
+def period_start(period, now=None):
+    """First calendar date covered by a yfinance-style period, None for 'max'"""
+    now = now or datetime.now(MARKET_TZ)
+    if period == "max":
+        return None
+    if period == "ytd":
+        return now.date().replace(month=1, day=1)
+    if period not in PERIOD_DAYS:
+        raise ValueError(f"Unsupported period: {period}")
+    return now.date() - timedelta(days=PERIOD_DAYS[period])
+
+
+def _key_format(interval):
+    if interval.endswith("d") or interval.endswith("wk") or interval.endswith("mo"):
+        return "%Y-%m-%d"
+    return "%Y-%m-%d %H:%M:%S"
+
+
+def bar_key(ts, interval="1d"):
+    """Storage key for a bar timestamp, in market-local time"""
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(MARKET_TZ).tz_localize(None)
+    return ts.strftime(_key_format(interval))
+
+
+def frame_keys(index, interval="1d"):
+    """Storage keys for a whole DatetimeIndex at once"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert(MARKET_TZ).tz_localize(None)
+    return index.strftime(_key_format(interval)).to_numpy(dtype=str)
+
+
+class HistoryStore:
+    """SQLite-backed cache of OHLCV bars shared by the API and training code"""
+
+    def __init__(self, path=HISTORY_DB_PATH, fetcher=None):
+        self.path = path
+        self.fetcher = fetcher or YahooFetcher()
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._init_db()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        with self.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS bars (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL,
+                    volume REAL, dividends REAL, stock_splits REAL,
+                    PRIMARY KEY (symbol, interval, date)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS meta (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    covered_from TEXT NOT NULL,
+                    last_date TEXT NOT NULL,
+                    refreshed_at REAL NOT NULL,
+                    PRIMARY KEY (symbol, interval)
+                )
+                """
+            )
+
+    def _lock_for(self, symbol, interval):
+        with self._locks_guard:
+            return self._locks.setdefault((symbol, interval), threading.Lock())
+
+    def is_fresh(self, refreshed_at, now=None):
+        """Decide whether a copy refreshed at `refreshed_at` (epoch seconds) can be served"""
+        now = now or datetime.now(MARKET_TZ)
+        refreshed = datetime.fromtimestamp(refreshed_at, MARKET_TZ)
+        settled = last_market_close(now) + timedelta(minutes=CLOSE_SETTLE_MINUTES)
+        if is_market_open(now) or now < settled:
+            return (now - refreshed).total_seconds() < OPEN_MARKET_TTL
+        return refreshed >= settled
+
+    def _needs_download(self, meta, covered_from):
+        """Whether the full range has to be downloaded rather than only the bars since the last stored one"""
+        if meta is None or meta["covered_from"] > covered_from:
+            return True
+        # A symbol upstream had no bars for: retried from scratch once its negative entry goes stale
+        return not meta["last_date"] and not self.is_fresh(meta["refreshed_at"])
+
+    def get_history(self, symbol, period="1y", interval="1d"):
+        """
+        Return bars for `period` as a DataFrame shaped like yfinance's history()
+
+        Downloads the full period on a cold cache (or when the requested period
+        reaches further back than what is stored), otherwise fetches only the
+        bars since the last stored date once the cached copy goes stale.
+        """
+        covered_from = self.refresh(symbol, period, interval)
+        return self.read(symbol, interval, start=covered_from)
+
+    def refresh(self, symbol, period="1y", interval="1d", start=None):
+        """
+        Bring the stored bars for `period` (or from the date `start`) up to date
+        without reading them back; returns the storage key reads should start at
+        """
+        symbol = symbol.upper()
+        if start is None:
+            since = period_start(period)
+            covered_from = since.isoformat() if since is not None else ""
+        else:
+            covered_from = str(start)[:10]
+
+        with self._lock_for(symbol, interval):
+            meta = self._read_meta(symbol, interval)
+            if self._needs_download(meta, covered_from):
+                CACHE_REQUESTS.inc(cache="history", result="miss")
+                with upstream_call("history"):
+                    if start is None:
+                        frame = self.fetcher.fetch(symbol, period=period, interval=interval)
+                    else:
+                        frame = self.fetcher.fetch(symbol, start=covered_from, interval=interval)
+                self._write(symbol, interval, frame, covered_from)
+            elif not self.is_fresh(meta["refreshed_at"]):
+                CACHE_REQUESTS.inc(cache="history", result="stale")
+                with upstream_call("history"):
+                    frame = self.fetcher.fetch(symbol, start=meta["last_date"][:10], interval=interval)
+                self._write(symbol, interval, frame, meta["covered_from"])
+            else:
+                CACHE_REQUESTS.inc(cache="history", result="hit")
+
+        return covered_from
+
+    def get_histories(self, symbols, period="1y", interval="1d"):
+        """
+        get_history for many symbols, batching upstream downloads
+
+        Cold symbols are downloaded together in one multi-ticker request and
+        stale ones in another (from the oldest last stored date among them).
+        Returns {symbol: frame} keyed by the upper-cased symbols.
+        """
+        symbols = sorted({symbol.upper() for symbol in symbols})
+        start = period_start(period)
+        covered_from = start.isoformat() if start is not None else ""
+
+        locks = [self._lock_for(symbol, interval) for symbol in symbols]
+        for lock in locks:  # Always acquired in sorted order
+            lock.acquire()
+        try:
+            cold, stale = [], {}
+            for symbol in symbols:
+                meta = self._read_meta(symbol, interval)
+                if self._needs_download(meta, covered_from):
+                    cold.append(symbol)
+                elif not self.is_fresh(meta["refreshed_at"]):
+                    stale[symbol] = meta
+
+            CACHE_REQUESTS.inc(len(cold), cache="history", result="miss")
+            CACHE_REQUESTS.inc(len(stale), cache="history", result="stale")
+            CACHE_REQUESTS.inc(len(symbols) - len(cold) - len(stale), cache="history", result="hit")
+            if cold:
+                frames = self._fetch_many(cold, period=period, interval=interval)
+                for symbol in cold:
+                    self._write(symbol, interval, frames.get(symbol), covered_from)
+            if stale:
+                since = min(meta["last_date"][:10] for meta in stale.values())
+                frames = self._fetch_many(list(stale), start=since, interval=interval)
+                for symbol, meta in stale.items():
+                    self._write(symbol, interval, frames.get(symbol), meta["covered_from"])
+        finally:
+            for lock in locks:
+                lock.release()
+
+        return {symbol: self.read(symbol, interval, start=covered_from) for symbol in symbols}
+
+    def _fetch_many(self, symbols, period=None, start=None, interval="1d"):
+        # Fetchers without a bulk endpoint (e.g. simple fakes) are called per symbol
+        if hasattr(self.fetcher, "fetch_many"):
+            with upstream_call("history_bulk"):
+                return self.fetcher.fetch_many(symbols, period=period, start=start, interval=interval)
+        frames = {}
+        for symbol in symbols:
+            with upstream_call("history"):
+                frames[symbol] = self.fetcher.fetch(symbol, period=period, start=start, interval=interval)
+        return frames
+
+    def read(self, symbol, interval="1d", start="", end=None, limit=None, after=None):
+        """
+        Read stored bars without touching the upstream fetcher
+
+        `start` and `end` are inclusive storage keys; `after` (exclusive) lets
+        callers page through a range by passing the last key they received.
+        """
+        query = f"SELECT date, {', '.join(DB_COLUMNS)} FROM bars WHERE symbol = ? AND interval = ? AND date >= ?"
+        params = [symbol.upper(), interval, start or ""]
+        if after is not None:
+            query += " AND date > ?"
+            params.append(after)
+        if end is not None:
+            query += " AND date <= ?"
+            params.append(end)
+        query += " ORDER BY date"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+
+        with self.connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        frame = pd.DataFrame(rows, columns=["Date"] + COLUMNS)
+        frame["Date"] = pd.to_datetime(frame["Date"])
+        return frame.set_index("Date")
+
+    def read_closes_before(self, symbol, interval, before, count):
+        """Close prices of the last `count` stored bars before the key `before`, oldest first"""
+        with self.connect() as conn:
+            rows = conn.execute(
+                "SELECT close FROM bars WHERE symbol = ? AND interval = ? AND date < ? ORDER BY date DESC LIMIT ?",
+                (symbol.upper(), interval, before or "", int(count)),
+            ).fetchall()
+        return np.array([np.nan if row[0] is None else row[0] for row in reversed(rows)], dtype=np.float64)
+
+    def read_all_closes(self, interval="1d", start=""):
+        """Close prices of every stored symbol from the key `start` on, as a long (symbol, date, close) frame"""
+        with self.connect() as conn:
+            rows = conn.execute(
+                "SELECT symbol, date, close FROM bars WHERE interval = ? AND date >= ? AND close IS NOT NULL",
+                (interval, start or ""),
+            ).fetchall()
+        return pd.DataFrame(rows, columns=["symbol", "date", "close"])
+
+    def last_refreshed(self, interval="1d"):
+        """Most recent refresh time of any stored symbol (0 when nothing is stored)"""
+        with self.connect() as conn:
+            row = conn.execute("SELECT MAX(refreshed_at) FROM meta WHERE interval = ?", (interval,)).fetchone()
+        return row[0] or 0.0
+
+    def key_at(self, symbol, interval, start="", end=None, offset=0):
+        """Storage key of the bar `offset` rows into [start, end], or None past the end"""
+        query = "SELECT date FROM bars WHERE symbol = ? AND interval = ? AND date >= ?"
+        params = [symbol.upper(), interval, start or ""]
+        if end is not None:
+            query += " AND date <= ?"
+            params.append(end)
+        query += " ORDER BY date LIMIT 1 OFFSET ?"
+        params.append(int(offset))
+        with self.connect() as conn:
+            row = conn.execute(query, params).fetchone()
+        return row[0] if row else None
+
+    def meta(self, symbol, interval="1d"):
+        """Stored range and last refresh time of a symbol, or None when nothing is stored"""
+        return self._read_meta(symbol.upper(), interval)
+
+    def _read_meta(self, symbol, interval):
+        with self.connect() as conn:
+            row = conn.execute(
+                "SELECT covered_from, last_date, refreshed_at FROM meta WHERE symbol = ? AND interval = ?",
+                (symbol, interval),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"covered_from": row[0], "last_date": row[1], "refreshed_at": row[2]}
+
+    def _write(self, symbol, interval, frame, covered_from):
+        if frame is None or frame.empty:
+            # Nothing new upstream; still record the check so we don't hammer Yahoo. An unknown
+            # symbol gets a row with no last date, negatively cached until it goes stale; the
+            # checked range counts as covered so a longer period doesn't download every time.
+            with self.connect() as conn:
+                conn.execute(
+                    "INSERT INTO meta (symbol, interval, covered_from, last_date, refreshed_at) "
+                    "VALUES (?, ?, ?, '', ?) "
+                    "ON CONFLICT(symbol, interval) DO UPDATE SET refreshed_at = excluded.refreshed_at, "
+                    "covered_from = MIN(covered_from, excluded.covered_from)",
+                    (symbol, interval, covered_from, datetime.now(MARKET_TZ).timestamp()),
+                )
+            return
+
+        frame = frame.reindex(columns=COLUMNS)
+        keys = frame_keys(frame.index, interval)
+        values = frame.to_numpy(dtype="float64")
+        rows = [
+            (symbol, interval, key, *[None if pd.isna(v) else float(v) for v in row])
+            for key, row in zip(keys, values)
+        ]
+
+        with self.connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO bars (symbol, interval, date, {', '.join(DB_COLUMNS)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' * len(DB_COLUMNS))})",
+                rows,
+            )
+            last_date = conn.execute(
+                "SELECT MAX(date) FROM bars WHERE symbol = ? AND interval = ?", (symbol, interval)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (symbol, interval, covered_from, last_date, refreshed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (symbol, interval, covered_from, last_date, datetime.now(MARKET_TZ).timestamp()),
+            )
+
+
+_store = None
+_store_guard = threading.Lock()
+
+
+def get_history_store():
+    """Process-wide history store"""
+    global _store
+    with _store_guard:
+        if _store is None:
+            _store = HistoryStore()
+        return _store
+
+
+def set_fetcher(fetcher):
+    """Swap the upstream fetcher (e.g. a local fake in tests)"""
+    get_history_store().fetcher = fetcher
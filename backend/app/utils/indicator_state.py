@@ -0,0 +1,372 @@
+"""
+Streaming indicator state so new bars don't trigger a full recomputation
+
+IndicatorState keeps running window sums, ring buffers and RSI gain/loss
+accumulators, and folds a new (or revised) bar in with O(1) work.
+IndicatorCache keeps the computed indicator series per symbol next to the
+history cache: a cold start computes everything once with the vectorized
+engine, and from then on only bars that arrived since the last request are
+pushed through the state.
+"""
+
+import json
+import math
+import threading
+
+import numpy as np
+
+from app.utils.history_store import frame_keys, get_history_store
+from app.utils.indicators import (
+    BB_WIDTH,
+    BB_WINDOW,
+    INDICATORS,
+    MA_WINDOWS,
+    RSI_WINDOW,
+    VOLATILITY_WINDOW,
+    compute_indicators,
+)
+
+CLOSE_CAPACITY = max(MA_WINDOWS.values())
+# Running sums drift slightly; anything this small is treated as exactly zero
+ZERO_TOLERANCE = 1e-12
+
+
+class IndicatorState:
+    """Running state for every indicator of one symbol"""
+
+    def __init__(self):
+        self.count = 0
+        self.anchor = None  # Closes are stored relative to this to keep squared sums precise
+        self.last_key = None
+        self.last_close = None
+        self.prev_close = None
+        self.closes = np.zeros(CLOSE_CAPACITY)
+        self.returns = np.zeros(VOLATILITY_WINDOW)
+        self.gains = np.zeros(RSI_WINDOW)
+        self.losses = np.zeros(RSI_WINDOW)
+        self.close_sums = {window: 0.0 for window in MA_WINDOWS.values()}
+        self.close_sq_sum = 0.0
+        self.return_sum = 0.0
+        self.return_sq_sum = 0.0
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+
+    @classmethod
+    def from_history(cls, keys, closes):
+        """Rebuild the state from the tail of a history (enough bars to fill every window)"""
+        state = cls()
+        start = max(len(closes) - CLOSE_CAPACITY - 1, 0)
+        if start:
+            # Pretend the earlier bars were seen: they count towards the warm-up,
+            # and everything they left in the windows is overwritten by the replay
+            state.count = start
+            state.anchor = float(closes[start])
+            state.last_key = keys[start - 1]
+            state.last_close = float(closes[start - 1])
+        for key, close in zip(keys[start:], closes[start:]):
+            state.update(key, close)
+        return state
+
+    def update(self, key, close):
+        """
+        Fold in one bar and return its indicator values
+
+        A bar with the same key as the last one (e.g. today's bar while the
+        market is open) replaces it instead of being appended.
+        """
+        close = float(close)
+        if self.count and key == self.last_key:
+            self._revise(close)
+        else:
+            self._append(key, close)
+        return self.values()
+
+    def _append(self, key, close):
+        if self.anchor is None:
+            self.anchor = close
+        i = self.count
+        x = close - self.anchor
+
+        # Price windows all read from one ring of the last CLOSE_CAPACITY closes
+        for window in self.close_sums:
+            if i >= window:
+                self.close_sums[window] -= self.closes[(i - window) % CLOSE_CAPACITY]
+            self.close_sums[window] += x
+        if i >= BB_WINDOW:
+            self.close_sq_sum -= self.closes[(i - BB_WINDOW) % CLOSE_CAPACITY] ** 2
+        self.close_sq_sum += x * x
+        self.closes[i % CLOSE_CAPACITY] = x
+
+        delta = 0.0
+        if i >= 1:
+            delta = close - self.last_close
+            j = i - 1  # Index of this bar's return
+            r = close / self.last_close - 1
+            if j >= VOLATILITY_WINDOW:
+                old = self.returns[j % VOLATILITY_WINDOW]
+                self.return_sum -= old
+                self.return_sq_sum -= old * old
+            self.return_sum += r
+            self.return_sq_sum += r * r
+            self.returns[j % VOLATILITY_WINDOW] = r
+
+        if i >= RSI_WINDOW:
+            self.gain_sum -= self.gains[i % RSI_WINDOW]
+            self.loss_sum -= self.losses[i % RSI_WINDOW]
+        self.gains[i % RSI_WINDOW] = max(delta, 0.0)
+        self.losses[i % RSI_WINDOW] = max(-delta, 0.0)
+        self.gain_sum += self.gains[i % RSI_WINDOW]
+        self.loss_sum += self.losses[i % RSI_WINDOW]
+
+        self.prev_close = self.last_close
+        self.last_close = close
+        self.last_key = key
+        self.count += 1
+
+    def _revise(self, close):
+        i = self.count - 1
+        x = close - self.anchor
+        old = self.closes[i % CLOSE_CAPACITY]
+
+        # The last bar is inside every window, so each sum just moves by the difference
+        for window in self.close_sums:
+            self.close_sums[window] += x - old
+        self.close_sq_sum += x * x - old * old
+        self.closes[i % CLOSE_CAPACITY] = x
+
+        if i >= 1:
+            j = i - 1
+            r = close / self.prev_close - 1
+            old_r = self.returns[j % VOLATILITY_WINDOW]
+            self.return_sum += r - old_r
+            self.return_sq_sum += r * r - old_r * old_r
+            self.returns[j % VOLATILITY_WINDOW] = r
+
+            delta = close - self.prev_close
+            slot = i % RSI_WINDOW
+            self.gain_sum += max(delta, 0.0) - self.gains[slot]
+            self.loss_sum += max(-delta, 0.0) - self.losses[slot]
+            self.gains[slot] = max(delta, 0.0)
+            self.losses[slot] = max(-delta, 0.0)
+
+        self.last_close = close
+
+    @staticmethod
+    def _std(total, sq_total, n):
+        var = (sq_total - total * total / n) / (n - 1)
+        return math.sqrt(max(var, 0.0))
+
+    def values(self):
+        """Indicator values for the last bar (NaN until a window has filled)"""
+        n = self.count
+        nan = float("nan")
+        out = dict.fromkeys(INDICATORS, nan)
+
+        for name, window in MA_WINDOWS.items():
+            if n >= window:
+                out[name] = self.close_sums[window] / window + self.anchor
+
+        if n >= BB_WINDOW:
+            band = self._std(self.close_sums[BB_WINDOW], self.close_sq_sum, BB_WINDOW) * BB_WIDTH
+            out["BB_upper"] = out["MA20"] + band
+            out["BB_lower"] = out["MA20"] - band
+
+        if n >= 2:
+            out["Daily_Return"] = self.last_close / self.prev_close - 1
+        if n - 1 >= VOLATILITY_WINDOW:
+            out["Volatility"] = self._std(self.return_sum, self.return_sq_sum, VOLATILITY_WINDOW)
+
+        if n >= RSI_WINDOW:
+            gain = max(self.gain_sum, 0.0) / RSI_WINDOW
+            loss = max(self.loss_sum, 0.0) / RSI_WINDOW
+            scale = abs(self.last_close) or 1.0
+            if loss <= ZERO_TOLERANCE * scale:
+                out["RSI"] = nan if gain <= ZERO_TOLERANCE * scale else 100.0
+            else:
+                out["RSI"] = 100 - (100 / (1 + gain / loss))
+
+        return out
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "anchor": self.anchor,
+            "last_key": self.last_key,
+            "last_close": self.last_close,
+            "prev_close": self.prev_close,
+            "closes": self.closes.tolist(),
+            "returns": self.returns.tolist(),
+            "gains": self.gains.tolist(),
+            "losses": self.losses.tolist(),
+            "close_sums": {str(k): v for k, v in self.close_sums.items()},
+            "close_sq_sum": self.close_sq_sum,
+            "return_sum": self.return_sum,
+            "return_sq_sum": self.return_sq_sum,
+            "gain_sum": self.gain_sum,
+            "loss_sum": self.loss_sum,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        for name in ("count", "anchor", "last_key", "last_close", "prev_close",
+                     "close_sq_sum", "return_sum", "return_sq_sum", "gain_sum", "loss_sum"):
+            setattr(state, name, data[name])
+        for name in ("closes", "returns", "gains", "losses"):
+            setattr(state, name, np.array(data[name], dtype=np.float64))
+        state.close_sums = {int(k): v for k, v in data["close_sums"].items()}
+        return state
+
+
+class _Series:
+    """Indicator series for one symbol, aligned with its stored bar keys"""
+
+    def __init__(self, keys, values, state):
+        self.keys = keys
+        self.values = values
+        self.state = state
+
+
+class IndicatorCache:
+    """Per-symbol indicator series and state, persisted in the history database"""
+
+    def __init__(self, store=None):
+        self.store = store or get_history_store()
+        self._series = {}
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _init_db(self):
+        columns = ", ".join(f"{name.lower()} REAL" for name in INDICATORS)
+        with self.store.connect() as conn:
+            conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS indicators (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    {columns},
+                    PRIMARY KEY (symbol, interval, date)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS indicator_state (
+                    symbol TEXT NOT NULL,
+                    interval TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    PRIMARY KEY (symbol, interval)
+                )
+                """
+            )
+
+    def get(self, symbol, hist, interval="1d", columns=INDICATORS):
+        """
+        Indicator columns aligned with `hist` (a frame read from the history store)
+
+        Bars newer than the cached series are folded in through the streaming
+        state; the full vectorized computation only runs on a cold start or
+        when `hist` reaches back further than the cached series.
+        """
+        symbol = symbol.upper()
+        keys = frame_keys(hist.index, interval)
+        closes = hist["Close"].to_numpy(dtype=np.float64)
+        if len(keys) == 0:
+            return {name: np.array([]) for name in columns}
+
+        with self._lock:
+            series = self._series.get((symbol, interval)) or self._load(symbol, interval)
+            if series is not None:
+                series = self._extend(symbol, interval, series, keys, closes)
+            if series is None:
+                series = self._rebuild(symbol, interval, keys, closes)
+            self._series[(symbol, interval)] = series
+
+            positions = np.searchsorted(series.keys, keys)
+            if positions[-1] >= len(series.keys) or not np.array_equal(series.keys[positions], keys):
+                # The stored bars changed underneath us (e.g. a backfill); start over
+                series = self._rebuild(symbol, interval, keys, closes)
+                self._series[(symbol, interval)] = series
+                positions = np.arange(len(keys))
+
+        return {name: series.values[name][positions] for name in columns}
+
+    def _extend(self, symbol, interval, series, keys, closes):
+        """Push bars newer than the cached series through the state; None if it can't be reused"""
+        if keys[0] < series.keys[0]:
+            return None
+        last = np.searchsorted(keys, series.state.last_key)
+        if last >= len(keys) or keys[last] != series.state.last_key:
+            return None
+
+        pending = range(last, len(keys))
+        if len(pending) == 1 and closes[last] == series.state.last_close:
+            return series
+
+        rows = [series.state.update(keys[i], closes[i]) for i in pending]
+
+        # Replace the revised last bar and append the new ones
+        base = len(series.keys) - 1
+        series.keys = np.concatenate((series.keys[:base], keys[last:]))
+        series.values = {
+            name: np.concatenate((values[:base], [row[name] for row in rows]))
+            for name, values in series.values.items()
+        }
+        self._save(symbol, interval, keys[last:], rows, series.state)
+        return series
+
+    def _rebuild(self, symbol, interval, keys, closes):
+        values = compute_indicators(closes, INDICATORS)
+        state = IndicatorState.from_history(keys, closes)
+        rows = [{name: values[name][i] for name in INDICATORS} for i in range(len(keys))]
+        self._save(symbol, interval, keys, rows, state, replace=True)
+        return _Series(keys, values, state)
+
+    def _load(self, symbol, interval):
+        with self.store.connect() as conn:
+            row = conn.execute(
+                "SELECT state FROM indicator_state WHERE symbol = ? AND interval = ?", (symbol, interval)
+            ).fetchone()
+            if row is None:
+                return None
+            rows = conn.execute(
+                f"SELECT date, {', '.join(name.lower() for name in INDICATORS)} FROM indicators "
+                "WHERE symbol = ? AND interval = ? ORDER BY date",
+                (symbol, interval),
+            ).fetchall()
+        if not rows:
+            return None
+
+        keys = np.array([r[0] for r in rows], dtype=str)
+        table = np.array([r[1:] for r in rows], dtype=np.float64)  # None -> NaN
+        values = {name: table[:, i].copy() for i, name in enumerate(INDICATORS)}
+        return _Series(keys, values, IndicatorState.from_dict(json.loads(row[0])))
+
+    def _save(self, symbol, interval, keys, rows, state, replace=False):
+        placeholders = ", ".join("?" * (len(INDICATORS) + 3))
+        records = [
+            (symbol, interval, str(key), *[None if math.isnan(row[name]) else row[name] for name in INDICATORS])
+            for key, row in zip(keys, rows)
+        ]
+        with self.store.connect() as conn:
+            if replace:
+                conn.execute("DELETE FROM indicators WHERE symbol = ? AND interval = ?", (symbol, interval))
+            conn.executemany(f"INSERT OR REPLACE INTO indicators VALUES ({placeholders})", records)
+            conn.execute(
+                "INSERT OR REPLACE INTO indicator_state (symbol, interval, state) VALUES (?, ?, ?)",
+                (symbol, interval, json.dumps(state.to_dict())),
+            )
+
+
+_cache = None
+_cache_guard = threading.Lock()
+
+
+def get_indicator_cache():
+    """Process-wide indicator cache"""
+    global _cache
+    with _cache_guard:
+        if _cache is None:
+            _cache = IndicatorCache()
+        return _cache
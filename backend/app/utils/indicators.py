@@ -0,0 +1,129 @@
+"""
+Vectorized technical indicator engine shared by the stock and predict routes
+
+Every indicator is derived from a handful of cumulative sums over one
+contiguous float64 array, so each window costs O(n) regardless of its length
+and windows that share inputs (MA20 and the Bollinger bands) share the work.
+Results match the pandas rolling() definitions, including their NaN warm-up.
+"""
+
+import numpy as np
+
+# All indicators the engine knows, in the order they appear in API payloads
+INDICATORS = (
+    "MA50", "MA100", "MA200", "MA20",
+    "Daily_Return", "Volatility",
+    "BB_upper", "BB_lower",
+    "RSI",
+)
+
+MA_WINDOWS = {"MA20": 20, "MA50": 50, "MA100": 100, "MA200": 200}
+BB_WINDOW = 20
+BB_WIDTH = 2
+VOLATILITY_WINDOW = 20
+RSI_WINDOW = 14
+
+# Prior bars every indicator value depends on (MA200's window); a chunk of a
+# longer series gets exact values when this many preceding bars come with it
+LOOKBACK = max(MA_WINDOWS.values()) - 1
+
+
+class _RollingSums:
+    """Prefix sums of a series (and optionally its squares) for O(1) window queries"""
+
+    def __init__(self, values, squares=False):
+        values = np.asarray(values, dtype=np.float64)
+        invalid = np.isnan(values)
+        self.has_nan = bool(invalid.any())
+        if self.has_nan:
+            self.nan_count = np.concatenate(([0], np.cumsum(invalid)))
+            values = np.where(invalid, 0.0, values)
+
+        # Shift by a representative value so the squared sums don't lose precision
+        self.shift = float(values[0]) if len(values) else 0.0
+        shifted = values - self.shift
+        self.sums = np.concatenate(([0.0], np.cumsum(shifted)))
+        self.sq_sums = np.concatenate(([0.0], np.cumsum(shifted * shifted))) if squares else None
+        self.n = len(values)
+
+    def _window(self, window):
+        out = np.full(self.n, np.nan)
+        if self.n < window:
+            return out, None, None
+        s = self.sums[window:] - self.sums[:-window]
+        sq = self.sq_sums[window:] - self.sq_sums[:-window] if self.sq_sums is not None else None
+        return out, s, sq
+
+    def _mask_nan(self, out, window):
+        if self.has_nan and self.n >= window:
+            tainted = (self.nan_count[window:] - self.nan_count[:-window]) > 0
+            out[window - 1:][tainted] = np.nan
+        return out
+
+    def mean(self, window):
+        out, s, _ = self._window(window)
+        if s is not None:
+            out[window - 1:] = s / window + self.shift
+        return self._mask_nan(out, window)
+
+    def std(self, window):
+        """Sample standard deviation (ddof=1), as pandas rolling().std()"""
+        out, s, sq = self._window(window)
+        if s is not None:
+            var = (sq - s * s / window) / (window - 1)
+            out[window - 1:] = np.sqrt(np.maximum(var, 0.0))
+        return self._mask_nan(out, window)
+
+
+def compute_indicators(close, columns=INDICATORS):
+    """
+    Compute the requested indicators for a close-price series
+
+    Args:
+        close: 1-D array-like of close prices
+        columns: indicator names from INDICATORS
+
+    Returns:
+        dict of name -> float64 array aligned with `close`, in the requested order
+    """
+    unknown = set(columns) - set(INDICATORS)
+    if unknown:
+        raise ValueError(f"Unknown indicators: {sorted(unknown)}")
+
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    wanted = set(columns)
+    results = {}
+
+    price_sums = _RollingSums(close, squares=bool(wanted & {"BB_upper", "BB_lower"}))
+    for name, window in MA_WINDOWS.items():
+        if name in wanted or (name == "MA20" and wanted & {"BB_upper", "BB_lower"}):
+            results[name] = price_sums.mean(window)
+
+    if wanted & {"BB_upper", "BB_lower"}:
+        band = price_sums.std(BB_WINDOW) * BB_WIDTH
+        results["BB_upper"] = results["MA20"] + band
+        results["BB_lower"] = results["MA20"] - band
+
+    if wanted & {"Daily_Return", "Volatility"}:
+        returns = np.full(len(close), np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns[1:] = close[1:] / close[:-1] - 1
+        results["Daily_Return"] = returns
+
+        if "Volatility" in wanted:
+            # The first return is undefined, so the window starts one bar later
+            volatility = np.full(len(close), np.nan)
+            if len(close) > 1:
+                volatility[1:] = _RollingSums(returns[1:], squares=True).std(VOLATILITY_WINDOW)
+            results["Volatility"] = volatility
+
+    if "RSI" in wanted:
+        delta = np.zeros(len(close))
+        delta[1:] = np.diff(close)
+        # pandas' where(delta > 0, 0) turns the leading NaN into a zero gain/loss
+        gain = _RollingSums(np.where(delta > 0, delta, 0.0)).mean(RSI_WINDOW)
+        loss = _RollingSums(np.where(delta < 0, -delta, 0.0)).mean(RSI_WINDOW)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            results["RSI"] = 100 - (100 / (1 + gain / loss))
+
+    return {name: results[name] for name in columns}
@@ -0,0 +1,193 @@
+"""
+Ticker metadata store with a long TTL and background refresh
+
+Ticker.info is a separate, slow Yahoo Finance round-trip for data that
+barely changes (name, sector, exchange, market cap). Entries are kept in
+memory and in the history database; an entry older than INFO_TTL_SECONDS
+is still served while a refresh runs in the background, and concurrent
+refreshes of one symbol share a single upstream call. Failed lookups are
+not retried for INFO_RETRY_SECONDS.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from app.utils.executors import io_pool
+from app.utils.history_store import get_history_store
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+INFO_TTL = int(os.getenv("INFO_TTL_SECONDS", str(24 * 3600)))
+INFO_RETRY_SECONDS = int(os.getenv("INFO_RETRY_SECONDS", "300"))
+INFO_REFRESH_CONCURRENCY = int(os.getenv("INFO_REFRESH_CONCURRENCY", "8"))
+
+# Ticker.info keys kept in the store (the full dict has well over a hundred)
+INFO_FIELDS = (
+    "longName", "shortName", "sector", "industry", "currency", "exchange",
+    "currentPrice", "marketCap", "longBusinessSummary",
+)
+
+
+class InfoStore:
+    """Ticker.info subset per symbol, persisted next to the bars in the history database"""
+
+    def __init__(self, store=None, ttl=INFO_TTL):
+        self.store = store or get_history_store()
+        self.ttl = ttl
+        self._entries = {}      # symbol -> (info, fetched_at)
+        self._failed = {}       # symbol -> time of the last failed lookup
+        self._refreshing = {}   # symbol -> task, so concurrent refreshes share one upstream call
+        self._semaphore = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.failures = 0
+        self._init_db()
+
+    def _init_db(self):
+        with self.store.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ticker_info (
+                    symbol TEXT PRIMARY KEY,
+                    info TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+                """
+            )
+
+    def lookup(self, symbol):
+        """(info, fresh) from memory or the database without going upstream; (None, False) if unknown"""
+        symbol = symbol.upper()
+        with self._lock:
+            entry = self._entries.get(symbol)
+        if entry is None:
+            with self.store.connect() as conn:
+                row = conn.execute("SELECT info, fetched_at FROM ticker_info WHERE symbol = ?", (symbol,)).fetchone()
+            if row is None:
+                return None, False
+            entry = (json.loads(row[0]), row[1])
+            with self._lock:
+                self._entries[symbol] = entry
+        info, fetched_at = entry
+        return info, time.time() - fetched_at < self.ttl
+
+    def fetch(self, symbol):
+        """Blocking upstream lookup; stores and returns the kept fields"""
+        symbol = symbol.upper()
+        # Fetchers without an info endpoint (e.g. simple fakes) have no metadata
+        fetcher = self.store.fetcher
+        raw = fetcher.info(symbol) if hasattr(fetcher, "info") else {}
+        info = {key: raw[key] for key in INFO_FIELDS if raw.get(key) is not None}
+        fetched_at = time.time()
+        with self.store.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ticker_info (symbol, info, fetched_at) VALUES (?, ?, ?)",
+                (symbol, json.dumps(info), fetched_at),
+            )
+        with self._lock:
+            self._entries[symbol] = (info, fetched_at)
+        return info
+
+    async def get(self, symbol, wait=True):
+        """
+        Metadata for `symbol`
+
+        Fresh entries are returned as-is and stale ones are returned while a
+        background refresh runs. A symbol with no entry is fetched when `wait`
+        is set; otherwise the fetch is started and None is returned, so the
+        caller never waits on Yahoo Finance.
+        """
+        return (await self.get_many([symbol], wait))[symbol.upper()]
+
+    async def get_many(self, symbols, wait=True):
+        """get() for many symbols, fetching the missing ones concurrently; returns {symbol: info or None}"""
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        found = await io_pool.run(lambda: {symbol: self.lookup(symbol) for symbol in symbols})
+
+        results, missing = {}, []
+        for symbol, (info, fresh) in found.items():
+            results[symbol] = info
+            if info is None:
+                self.misses += 1
+                missing.append(symbol)
+            elif fresh:
+                self.hits += 1
+            else:
+                self.stale += 1
+                self.refresh(symbol)
+
+        pending = {symbol: task for symbol in missing if (task := self.refresh(symbol)) is not None}
+        if wait and pending:
+            fetched = await asyncio.gather(*(asyncio.shield(task) for task in pending.values()))
+            results.update(zip(pending, fetched))
+        return results
+
+    def refresh(self, symbol):
+        """Start (or join) a background refresh of `symbol`; None while a failure is backing off"""
+        task = self._refreshing.get(symbol)
+        if task is not None:
+            return task
+        if time.time() - self._failed.get(symbol, 0) < INFO_RETRY_SECONDS:
+            return None
+        task = asyncio.ensure_future(self._refresh(symbol))
+        self._refreshing[symbol] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(symbol, None))
+        return task
+
+    async def _refresh(self, symbol):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(INFO_REFRESH_CONCURRENCY)
+        async with self._semaphore:
+            try:
+                info = await io_pool.run(self.fetch, symbol)
+            except Exception as e:
+                self.failures += 1
+                self._failed[symbol] = time.time()
+                logger.warning("Info lookup failed for %s: %s", symbol, e)
+                # Serve whatever is stored, however old
+                with self._lock:
+                    return self._entries.get(symbol, (None, 0))[0]
+        self.refreshes += 1
+        self._failed.pop(symbol, None)
+        return info
+
+    async def close(self):
+        """Cancel background refreshes (at shutdown)"""
+        tasks = list(self._refreshing.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._semaphore = None
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "stale": self.stale,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "refreshing": len(self._refreshing),
+        }
+
+
+_info_store = None
+_info_store_guard = threading.Lock()
+
+
+def get_info_store():
+    """Process-wide ticker metadata store"""
+    global _info_store
+    with _info_store_guard:
+        if _info_store is None:
+            _info_store = InfoStore()
+        return _info_store
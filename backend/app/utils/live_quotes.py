@@ -0,0 +1,254 @@
+"""
+Live quote fan-out with one upstream poll per symbol
+
+A QuoteHub runs a single background poller for every symbol that has at
+least one subscriber, whatever the number of subscribers: upstream load
+grows with the number of distinct symbols, not with connected clients. Each
+new quote goes through the hub's `update` callback once, is encoded once and
+is offered to every subscriber of the symbol.
+
+Subscribers hold at most one pending message per symbol. A consumer that
+falls behind has older updates replaced by the latest one (conflation) rather
+than queued, so memory per connection is bounded by its subscriptions and a
+slow client never holds up the poller or other clients.
+
+The quote source is pluggable: set_quote_source() swaps Yahoo Finance for a
+local fake, the same way set_fetcher() does for the history store.
+"""
+
+import asyncio
+import logging
+
+import yfinance as yf
+
+from app.utils.executors import io_pool
+from app.utils.history_store import is_market_open
+from app.utils.metrics import ERRORS, Counter, upstream_call
+from app.utils.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+POLLS = Counter("live_quote_polls_total", "Upstream quote polls by result", ("result",))
+MESSAGES = Counter("live_messages_total", "Live updates offered to subscribers by outcome", ("outcome",))
+SLOW_CONSUMERS = Counter("live_slow_consumers_total", "Connections closed for not reading their updates")
+
+
+class YahooQuoteSource:
+    """Latest trade price from Yahoo Finance (fast_info, no history download)"""
+
+    def quote(self, symbol):
+        with upstream_call("quote"):
+            info = yf.Ticker(symbol).fast_info
+            return {
+                "price": float(info["lastPrice"]),
+                "previous_close": float(info["previousClose"]),
+                "day_high": float(info["dayHigh"]),
+                "day_low": float(info["dayLow"]),
+                "volume": float(info["lastVolume"]),
+            }
+
+
+_quote_source = YahooQuoteSource()
+
+
+def get_quote_source():
+    return _quote_source
+
+
+def set_quote_source(source):
+    """Swap the upstream quote source (e.g. a local fake in tests)"""
+    global _quote_source
+    _quote_source = source
+
+
+class Subscriber:
+    """One connection's outbox: the latest undelivered message per symbol"""
+
+    def __init__(self):
+        self.symbols = set()
+        self._pending = {}          # symbol -> JSON text
+        self._ready = asyncio.Event()
+        self._replies = 0
+        self.delivered = 0
+        self.conflated = 0
+
+    def offer(self, symbol, message):
+        """Queue an update, replacing an undelivered one for the same symbol"""
+        if symbol in self._pending:
+            self.conflated += 1
+            MESSAGES.inc(outcome="conflated")
+        self._pending[symbol] = message
+        self._ready.set()
+
+    def send(self, message):
+        """Queue a message that is never conflated (replies to commands)"""
+        self._replies += 1
+        self._pending[("reply", self._replies)] = message
+        self._ready.set()
+
+    async def next(self):
+        """Wait for and take every pending message, in the order they were first queued"""
+        await self._ready.wait()
+        messages = list(self._pending.values())
+        self._pending.clear()
+        self._ready.clear()
+        self.delivered += len(messages)
+        MESSAGES.inc(len(messages), outcome="delivered")
+        return messages
+
+    async def pump(self, send, timeout):
+        """
+        Deliver messages through `send` (a coroutine function) until one
+        takes longer than `timeout` seconds, i.e. the client stopped reading
+        """
+        while True:
+            for message in await self.next():
+                try:
+                    await asyncio.wait_for(send(message), timeout)
+                except asyncio.TimeoutError:
+                    SLOW_CONSUMERS.inc()
+                    return
+
+
+class _Feed:
+    """Poller state for one symbol"""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.subscribers = set()
+        self.state = None
+        self.last_message = None    # Sent to new subscribers right away
+        self.expiry = None          # Timer stopping the feed once it has no subscribers
+        self.polls = 0
+        self.errors = 0
+        self.last_error = None
+        self.task = None
+
+
+class QuoteHub:
+    """
+    Per-symbol pollers fanning quote updates out to subscribers
+
+    `load(symbol)` (a coroutine function) builds a symbol's state once when
+    its feed starts. `update(symbol, state, quote)` (a coroutine function)
+    folds each polled quote into it and returns the message to fan out,
+    already encoded as JSON text, or None when nothing changed. A feed stops
+    `idle_seconds` after its last subscriber leaves, so a quick reconnect
+    reuses its state.
+    """
+
+    def __init__(self, load, update, interval=5.0, closed_interval=300.0, idle_seconds=30.0):
+        self.load = load
+        self.update = update
+        self.interval = interval
+        self.closed_interval = closed_interval
+        self.idle_seconds = idle_seconds
+        self._feeds = {}
+
+    def subscribe(self, subscriber, symbol):
+        symbol = symbol.upper()
+        feed = self._feeds.get(symbol)
+        if feed is None:
+            feed = self._feeds[symbol] = _Feed(symbol)
+            feed.task = asyncio.ensure_future(self._poll(feed))
+        feed.subscribers.add(subscriber)
+        if feed.expiry is not None:
+            feed.expiry.cancel()
+            feed.expiry = None
+        subscriber.symbols.add(symbol)
+        if feed.last_message is not None:
+            subscriber.offer(symbol, feed.last_message)
+
+    def unsubscribe(self, subscriber, symbol):
+        symbol = symbol.upper()
+        subscriber.symbols.discard(symbol)
+        feed = self._feeds.get(symbol)
+        if feed is not None:
+            feed.subscribers.discard(subscriber)
+            if not feed.subscribers and feed.expiry is None:
+                feed.expiry = asyncio.get_running_loop().call_later(self.idle_seconds, self._expire, feed)
+
+    def disconnect(self, subscriber):
+        for symbol in list(subscriber.symbols):
+            self.unsubscribe(subscriber, symbol)
+
+    def _expire(self, feed):
+        feed.expiry = None
+        if not feed.subscribers and self._feeds.get(feed.symbol) is feed:
+            feed.task.cancel()
+            del self._feeds[feed.symbol]
+
+    def _broadcast(self, feed, message):
+        for subscriber in list(feed.subscribers):
+            subscriber.offer(feed.symbol, message)
+
+    async def _poll(self, feed):
+        try:
+            feed.state = await self.load(feed.symbol)
+        except Exception as e:
+            self._fail(feed, e)
+            if self._feeds.get(feed.symbol) is feed:
+                del self._feeds[feed.symbol]
+            return
+
+        while True:
+            try:
+                quote = await io_pool.run(get_quote_source().quote, feed.symbol)
+                message = await self.update(feed.symbol, feed.state, quote)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                feed.errors += 1
+                feed.last_error = f"{type(e).__name__}: {e}"
+                POLLS.inc(result="error")
+                logger.warning("Quote poll for %s failed: %s", feed.symbol, e)
+            else:
+                feed.polls += 1
+                POLLS.inc(result="ok")
+                if message is not None:
+                    feed.last_message = message
+                    self._broadcast(feed, message)
+            await asyncio.sleep(self.interval if is_market_open() else self.closed_interval)
+
+    def _fail(self, feed, error):
+        """A feed that can't start tells its subscribers and goes away"""
+        ERRORS.inc(operation="live", type=type(error).__name__)
+        logger.warning("Live feed for %s failed to start: %s", feed.symbol, error)
+        for subscriber in list(feed.subscribers):
+            subscriber.symbols.discard(feed.symbol)
+        feed.last_error = str(error)
+        self._broadcast(feed, self.error_message(feed.symbol, str(error)))
+
+    @staticmethod
+    def error_message(symbol, error):
+        return dumps({"type": "error", "symbol": symbol, "error": error}).decode()
+
+    async def close(self):
+        """Stop every poller (at shutdown)"""
+        tasks = [feed.task for feed in self._feeds.values()]
+        for feed in self._feeds.values():
+            if feed.expiry is not None:
+                feed.expiry.cancel()
+            feed.task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._feeds.clear()
+
+    def stats(self):
+        subscribers = set()
+        for feed in self._feeds.values():
+            subscribers |= feed.subscribers
+        return {
+            "feeds": len(self._feeds),
+            "subscribers": len(subscribers),
+            "interval_seconds": self.interval,
+            "closed_interval_seconds": self.closed_interval,
+            "symbols": {
+                symbol: {
+                    "subscribers": len(feed.subscribers),
+                    "polls": feed.polls,
+                    "errors": feed.errors,
+                    "last_error": feed.last_error,
+                }
+                for symbol, feed in self._feeds.items()
+            },
+        }
@@ -0,0 +1,254 @@
+"""
+In-process metrics in the Prometheus text format
+
+Counters and histograms live in process memory and are rendered by
+GET /metrics. Besides per-route request latency (MetricsMiddleware), the
+prediction and stock paths time each stage with `span()`, and the history
+store counts upstream calls and cache hits.
+
+Work that runs in the CPU process pool can't update this process's metrics;
+it collects its spans with `record_spans()`, returns them with its result,
+and the caller replays them with `observe_spans()`.
+"""
+
+import bisect
+import contextvars
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+from app.utils.profiler import profile_request
+
+# Configuration
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "stock_api")
+
+_metrics = []
+_recording = contextvars.ContextVar("metrics_spans", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """A named family of samples keyed by label values"""
+
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = f"{METRICS_PREFIX}_{name}"
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+    @abstractmethod
+    def samples(self):
+        """Exposition lines of every sample, without the HELP and TYPE header"""
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = _labels(self.labelnames, key, [("le", _number(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class CallbackMetric(Metric):
+    """Gauge or counter read from existing stats at scrape time; `fn` returns {label values: value}"""
+
+    def __init__(self, name, help, kind, labelnames, fn):
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self):
+        values = sorted(self.fn().items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values]
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ("method", "route", "status")
+)
+STAGE_SECONDS = Histogram(
+    "stage_duration_seconds", "Time spent in each stage of an operation", ("operation", "stage")
+)
+UPSTREAM_SECONDS = Histogram(
+    "upstream_request_duration_seconds", "Yahoo Finance call latency", ("call",)
+)
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Failed Yahoo Finance calls", ("call", "type"))
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by result", ("cache", "result"))
+ERRORS = Counter("errors_total", "Errors by operation and exception type", ("operation", "type"))
+
+
+@contextmanager
+def span(operation, stage):
+    """Time the enclosed block as `stage` of `operation`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        spans = _recording.get()
+        if spans is not None:
+            spans.append((operation, stage, elapsed))
+        else:
+            STAGE_SECONDS.observe(elapsed, operation=operation, stage=stage)
+
+
+@contextmanager
+def record_spans():
+    """Collect spans into a list instead of observing them (for CPU pool workers)"""
+    spans = []
+    token = _recording.set(spans)
+    try:
+        yield spans
+    finally:
+        _recording.reset(token)
+
+
+def observe_spans(spans):
+    """Observe spans returned from a CPU pool worker"""
+    for operation, stage, elapsed in spans:
+        STAGE_SECONDS.observe(elapsed, operation=operation, stage=stage)
+
+
+@contextmanager
+def upstream_call(call):
+    """Time an upstream (Yahoo Finance) call and count its failures"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(call=call, type=type(e).__name__)
+        raise
+    finally:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, call=call)
+
+
+def route_template(scope):
+    """Path template of the matched route (e.g. /api/stock/{symbol}), so labels stay low-cardinality"""
+    # Newer FastAPI versions keep included routers intact and record the prefixed path separately
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    if context is not None:
+        return context.path
+    return getattr(scope.get("route"), "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status codes and unhandled errors
+
+    Latency runs until the last body chunk is sent, so streamed responses
+    are measured in full. Requests carrying the profiling header are handed
+    to the sampling profiler when it is enabled (see profiler.py).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await profile_request(self.app, scope, receive, send_with_status)
+        except Exception as e:
+            ERRORS.inc(operation="http", type=type(e).__name__)
+            raise
+        finally:
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=route_template(scope),
+                status=status,
+            )
@@ -0,0 +1,111 @@
+"""
+Per-request sampling profiler
+
+Off unless PROFILER_ENABLED=1. A request sent with `X-Profile: 1` then has
+the stacks of the event loop and I/O pool threads sampled every
+PROFILER_INTERVAL_MS while it runs. Samples are aggregated as collapsed
+stacks (the input format of flamegraph.pl and speedscope); the response
+carries an X-Profile-Id header and the profile is served by
+GET /metrics/profiles/{id} until PROFILER_KEEP newer ones replace it.
+
+Sampling sees every thread of this process, so other requests in flight
+show up too; profile under light load. Work in the CPU process pool is not
+visible (run with CPU_POOL_MODE=thread to include it). Only one request is
+profiled at a time; the header is ignored while a profile is running.
+"""
+
+import os
+import sys
+import threading
+import uuid
+from collections import Counter, OrderedDict
+
+from app.utils.executors import io_pool
+
+# Configuration
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL_MS", "5")) / 1000
+PROFILER_KEEP = int(os.getenv("PROFILER_KEEP", "20"))
+PROFILE_HEADER = b"x-profile"
+
+_profiles = OrderedDict()
+_active = threading.Lock()
+
+
+class SamplingProfiler:
+    """Background thread sampling Python stacks into collapsed-stack counts"""
+
+    def __init__(self, interval=PROFILER_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        """Stop sampling and wait for the sampler thread, off the event loop"""
+        self._stop.set()
+        await io_pool.run(self._thread.join)
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own:
+                    self._sample(names.get(ident, str(ident)), frame)
+
+    def _sample(self, thread_name, frame):
+        # Idle pool workers sit in _worker waiting on their queue
+        if frame.f_code.co_name == "_worker" and frame.f_code.co_filename.endswith(os.path.join("futures", "thread.py")):
+            return
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        stack.append(thread_name)
+        self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """One 'frame;frame;frame count' line per distinct stack, most sampled first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def get_profile(profile_id):
+    """Collapsed stacks of a finished profile, or None"""
+    return _profiles.get(profile_id)
+
+
+def _wants_profile(scope):
+    return PROFILER_ENABLED and any(
+        name == PROFILE_HEADER and value not in (b"", b"0") for name, value in scope.get("headers", [])
+    )
+
+
+async def profile_request(app, scope, receive, send):
+    """Run the ASGI `app` for one request, sampling it when asked to by the header"""
+    if not _wants_profile(scope) or not _active.acquire(blocking=False):
+        await app(scope, receive, send)
+        return
+
+    profile_id = uuid.uuid4().hex[:12]
+
+    async def send_with_id(message):
+        if message["type"] == "http.response.start":
+            message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+        await send(message)
+
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        await app(scope, receive, send_with_id)
+    finally:
+        await profiler.stop()
+        _active.release()
+        _profiles[profile_id] = profiler.collapsed()
+        while len(_profiles) > PROFILER_KEEP:
+            _profiles.popitem(last=False)
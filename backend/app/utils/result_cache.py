@@ -0,0 +1,152 @@
+"""
+Cache of encoded prediction responses
+
+A prediction only depends on the history up to the last bar, the horizon,
+the model and the response format, so the key holds the last bar's date and
+close, the horizon, the model version and the format: entries go stale on
+their own when a new bar lands, the session's bar moves, or a new model is
+activated, and nothing has to be invalidated explicitly. Entries live in a size-bounded
+in-memory LRU, optionally backed by a SQLite file that survives restarts
+and is shared between worker processes.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Configuration
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_DB_PATH = os.getenv("RESULT_CACHE_DB_PATH", "")  # Empty disables the disk tier
+RESULT_CACHE_DISK_TTL = int(os.getenv("RESULT_CACHE_DISK_TTL", str(7 * 24 * 3600)))
+
+
+def cache_key(*parts) -> str:
+    """Flatten key parts into the string used for storage"""
+    return "|".join(str(part) for part in parts)
+
+
+def etag_for(key: str) -> str:
+    """Strong ETag for the response stored under `key`"""
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+class ResultCache:
+    """Byte-bounded LRU of response bodies with an optional SQLite tier"""
+
+    def __init__(self, max_bytes=RESULT_CACHE_MAX_BYTES, path=RESULT_CACHE_DB_PATH):
+        self.max_bytes = max_bytes
+        self.path = path
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.persistent:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._init_db()
+
+    @property
+    def persistent(self) -> bool:
+        return bool(self.path)
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        with self.connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get(self, key: str):
+        """Memory lookup; returns the body or None"""
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            elif not self.persistent:
+                self.misses += 1
+            return body
+
+    def load(self, key: str):
+        """
+        Disk lookup for a key that missed in memory (blocking, call off the loop)
+
+        A disk hit is promoted into the memory tier.
+        """
+        if not self.persistent:
+            return None
+        with self.connect() as conn:
+            row = conn.execute("SELECT body FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        body = bytes(row[0])
+        with self._lock:
+            self.disk_hits += 1
+        self._remember(key, body)
+        return body
+
+    def put(self, key: str, body: bytes):
+        """Add a body to the memory tier, evicting least recently used entries"""
+        self._remember(key, body)
+
+    def store(self, key: str, body: bytes):
+        """Write a body to the disk tier and drop expired rows (blocking)"""
+        if not self.persistent:
+            return
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, body, created_at) VALUES (?, ?, ?)",
+                (key, body, now),
+            )
+            conn.execute("DELETE FROM results WHERE created_at < ?", (now - RESULT_CACHE_DISK_TTL,))
+
+    def _remember(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "persistent": self.persistent,
+            }
+
+
+# Process-wide cache for POST/GET /api/predict responses
+prediction_cache = ResultCache()
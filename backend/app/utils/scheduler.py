@@ -0,0 +1,246 @@
+"""
+In-process scheduler for background pre-computation
+
+Runs a per-symbol job for a watchlist either once after every market close
+(once Yahoo has settled the last bar) or on a fixed interval. Each run
+starts symbols after a random jitter and keeps at most `concurrency` of
+them in flight, so neither Yahoo Finance nor the execution pools see a
+burst. The last outcome of every symbol is kept for the status endpoint.
+
+With several API worker processes, only the one holding an exclusive flock
+on `lock_path` runs the schedule; the others retry now and then and take
+over if it exits. Runs started by hand go to whichever worker received the
+request. Every job writes through the shared on-disk stores, so the other
+workers serve those symbols from local data.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.utils.history_store import CLOSE_SETTLE_MINUTES, MARKET_CLOSE, MARKET_TZ
+from app.utils.metrics import Counter
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: every worker runs the schedule
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_MODES = ("close", "interval")
+LEADER_RETRY_SECONDS = 60  # How often a worker without the scheduler lock tries to take it over
+
+JOBS = Counter("scheduler_jobs_total", "Scheduled pre-computation jobs by result", ("result",))
+
+
+def _shield(future):
+    """asyncio.shield() whose outcome counts as retrieved, for callers that don't await it"""
+    shielded = asyncio.shield(future)
+    shielded.add_done_callback(lambda f: f.cancelled() or f.exception())
+    return shielded
+
+
+def next_close_run(now=None):
+    """First weekday market close plus the settle delay strictly after `now` (holidays are ignored)"""
+    now = now or datetime.now(MARKET_TZ)
+    run = datetime.combine(now.date(), MARKET_CLOSE, tzinfo=MARKET_TZ) + timedelta(minutes=CLOSE_SETTLE_MINUTES)
+    if run <= now:
+        run += timedelta(days=1)
+    while run.weekday() >= 5:
+        run += timedelta(days=1)
+    return run
+
+
+class Scheduler:
+    """Runs `job(symbol)` (a coroutine function) for every watchlist symbol on a schedule"""
+
+    def __init__(self, job, symbols, mode="close", interval=3600, concurrency=4, jitter=30.0,
+                 timeout=300.0, run_on_start=True, lock_path=None):
+        if mode not in SCHEDULE_MODES:
+            raise ValueError(f"Schedule mode must be one of: {', '.join(SCHEDULE_MODES)}")
+        self.job = job
+        self.symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols))
+        self.mode = mode
+        self.interval = interval
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.timeout = timeout
+        self.run_on_start = run_on_start
+        self.lock_path = lock_path  # Only the worker holding this file's lock runs the schedule
+        self.leader = False
+        self.next_run = None
+        self.last_run = None
+        self.jobs = {}          # symbol -> status of its latest job
+        self.queued = []        # Symbols waiting for the follow-up of the run in progress
+        self._task = None
+        self._run = None
+        self._run_symbols = set()
+        self._follow_up = None  # Resolved when the queued symbols have run
+        self._lock_file = None
+
+    @property
+    def running(self):
+        return self._run is not None and not self._run.done()
+
+    def start(self):
+        if self.symbols and self._task is None:
+            self._task = asyncio.ensure_future(self._loop())
+
+    async def stop(self):
+        # Drop the queue first so the cancelled run does not start its follow-up
+        self.queued = []
+        if self._follow_up is not None:
+            self._follow_up.cancel()
+        tasks = [task for task in (self._task, self._run) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = self._run = self._follow_up = None
+        self._release()
+
+    def next_run_time(self, now=None):
+        now = now or datetime.now(MARKET_TZ)
+        if self.mode == "interval":
+            return now + timedelta(seconds=self.interval)
+        return next_close_run(now)
+
+    async def _loop(self):
+        # With several API workers only one runs the schedule; the others
+        # keep trying in case the leader goes away
+        while not self._acquire():
+            await asyncio.sleep(LEADER_RETRY_SECONDS)
+        if self.run_on_start:
+            await self.trigger()
+        while True:
+            self.next_run = self.next_run_time()
+            delay = (self.next_run - datetime.now(MARKET_TZ)).total_seconds()
+            await asyncio.sleep(max(delay, 0))
+            await self.trigger()
+
+    def _acquire(self):
+        """Take the scheduler lock without blocking; True once this worker holds it"""
+        if self.lock_path is None or fcntl is None:
+            self.leader = True
+            return True
+        f = open(self.lock_path, "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._lock_file = f
+        self.leader = True
+        logger.info("Running the watchlist schedule in this worker (pid %d)", os.getpid())
+        return True
+
+    def _release(self):
+        if self._lock_file is not None:
+            self._lock_file.close()  # Closing the file drops the flock
+            self._lock_file = None
+        self.leader = False
+
+    def trigger(self, symbols=None):
+        """
+        Start a run now; returns a future resolved when the symbols have run
+
+        `symbols` restricts the run to part of the watchlist. While a run is in
+        progress, the requested symbols it does not cover are queued for a
+        follow-up run started as soon as it finishes; when it covers all of
+        them, the call joins it.
+        """
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in symbols)) if symbols else self.symbols
+        if not self.running:
+            # A follow-up that has not started yet is folded into this run
+            self._start_run(self.queued + [symbol for symbol in symbols if symbol not in self.queued])
+            return _shield(self._run)
+
+        if all(symbol in self._run_symbols for symbol in symbols):
+            return _shield(self._run)
+        for symbol in symbols:
+            if symbol not in self._run_symbols and symbol not in self.queued:
+                self.queued.append(symbol)
+                self.jobs.setdefault(symbol, {})["state"] = "queued"
+        if self._follow_up is None:
+            self._follow_up = asyncio.get_running_loop().create_future()
+        return _shield(self._follow_up)
+
+    def _start_run(self, symbols):
+        waiter, self._follow_up = self._follow_up, None
+        self.queued = []
+        self._run_symbols = set(symbols)
+        self._run = asyncio.ensure_future(self._run_all(symbols))
+        self._run.add_done_callback(lambda task: self._run_done(task, waiter))
+
+    def _run_done(self, task, waiter):
+        error = None if task.cancelled() else task.exception()
+        if error is not None:
+            logger.error("Scheduled run failed: %s", error)
+        if waiter is not None and not waiter.done():
+            if task.cancelled():
+                waiter.cancel()
+            elif error is not None:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(None)
+        # Started in the same step that sees the run finish, so no trigger can
+        # start another run in between
+        if task is self._run and self.queued:
+            self._start_run(self.queued)
+
+    async def _run_all(self, symbols):
+        started = time.time()
+        self.last_run = {"started_at": started, "finished_at": None, "symbols": len(symbols), "ok": 0, "failed": 0}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        for symbol in symbols:
+            self.jobs.setdefault(symbol, {})["state"] = "pending"
+
+        async def run_one(symbol):
+            # Spread the starts so the first `concurrency` jobs don't all go upstream at once
+            await asyncio.sleep(random.uniform(0, self.jitter))
+            async with semaphore:
+                status = self.jobs[symbol]
+                status.update(state="running", started_at=time.time())
+                try:
+                    await asyncio.wait_for(self.job(symbol), self.timeout)
+                except asyncio.CancelledError:
+                    status["state"] = "cancelled"
+                    raise
+                except Exception as e:
+                    status.update(state="failed", error=f"{type(e).__name__}: {e}")
+                    self.last_run["failed"] += 1
+                    JOBS.inc(result="failed")
+                    logger.warning("Scheduled job for %s failed: %s", symbol, e)
+                else:
+                    status.update(state="done", error=None, succeeded_at=time.time())
+                    self.last_run["ok"] += 1
+                    JOBS.inc(result="ok")
+                finally:
+                    status["duration"] = round(time.time() - status["started_at"], 3)
+
+        await asyncio.gather(*(run_one(symbol) for symbol in symbols))
+        self.last_run["finished_at"] = time.time()
+        self.last_run["duration"] = round(self.last_run["finished_at"] - started, 3)
+        logger.info("Scheduled run finished: %d ok, %d failed", self.last_run["ok"], self.last_run["failed"])
+
+    def stats(self):
+        states = {}
+        for status in self.jobs.values():
+            states[status.get("state")] = states.get(status.get("state"), 0) + 1
+        return {
+            "enabled": self._task is not None,
+            "leader": self.leader,
+            "mode": self.mode,
+            "interval_seconds": self.interval if self.mode == "interval" else None,
+            "watchlist": len(self.symbols),
+            "concurrency": self.concurrency,
+            "jitter_seconds": self.jitter,
+            "running": self.running,
+            "queued": len(self.queued),
+            "next_run": self.next_run.isoformat() if self.next_run else None,
+            "last_run": self.last_run,
+            "states": states,
+        }
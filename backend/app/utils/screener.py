@@ -0,0 +1,191 @@
+"""
+Date-aligned price matrix for screening a whole symbol universe at once
+
+The cached closes of every symbol are packed into one dense float32
+[symbols, days] matrix over the union of their trading days; a symbol
+missing a day carries its previous close forward, and days before its first
+bar stay NaN. The indicators of the latest day are computed for all symbols
+together with column-wise NumPy operations (one vector per field), so a
+screen is a few vector comparisons and a partial sort: milliseconds for
+thousands of symbols instead of one history pipeline per symbol.
+"""
+
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.indicators import BB_WIDTH, BB_WINDOW, MA_WINDOWS, RSI_WINDOW, VOLATILITY_WINDOW
+
+# Per-symbol values a screen can filter and sort on (forecast fields are added by the caller)
+FIELDS = ("close", "daily_return", "ma20", "ma50", "ma100", "ma200", "bb_upper", "bb_lower", "rsi", "volatility")
+
+OPERATORS = {"<=": np.less_equal, ">=": np.greater_equal, "<": np.less, ">": np.greater}
+CONDITION = re.compile(r"^\s*([a-z_0-9]+)\s*(<=|>=|<|>)\s*(\S+)\s*$")
+
+
+def forward_fill(matrix):
+    """Fill NaN gaps along each row with the last value before them (leading NaN stay)"""
+    present = ~np.isnan(matrix)
+    last = np.where(present, np.arange(matrix.shape[1]), 0)
+    np.maximum.accumulate(last, axis=1, out=last)
+    return matrix[np.arange(matrix.shape[0])[:, None], last]
+
+
+def latest_indicators(closes):
+    """
+    The stock route's indicators for the last day of every row, as vectors
+
+    Windows that reach past a row's first bar give NaN, as in the per-symbol
+    computation.
+    """
+    tail = closes[:, -(max(MA_WINDOWS.values()) + 1):].astype(np.float64)
+    rows, days = tail.shape
+    nan = np.full(rows, np.nan)
+
+    def window(values, size):
+        return values[:, -size:] if values.shape[1] >= size else None
+
+    out = {"close": tail[:, -1]}
+    for name, size in MA_WINDOWS.items():
+        values = window(tail, size)
+        out[name.lower()] = values.mean(axis=1) if values is not None else nan
+
+    values = window(tail, BB_WINDOW)
+    band = values.std(axis=1, ddof=1) * BB_WIDTH if values is not None else nan
+    out["bb_upper"] = out["ma20"] + band
+    out["bb_lower"] = out["ma20"] - band
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = tail[:, 1:] / tail[:, :-1] - 1
+        out["daily_return"] = returns[:, -1] if days > 1 else nan
+        values = window(returns, VOLATILITY_WINDOW)
+        out["volatility"] = values.std(axis=1, ddof=1) if values is not None else nan
+
+        delta = np.diff(tail[:, -(RSI_WINDOW + 1):], axis=1)
+        if delta.shape[1] == RSI_WINDOW:
+            gain = np.where(delta > 0, delta, 0.0).mean(axis=1)
+            loss = np.where(delta < 0, -delta, 0.0).mean(axis=1)
+            rsi = 100 - (100 / (1 + gain / loss))
+            rsi[np.isnan(delta).any(axis=1)] = np.nan
+            out["rsi"] = rsi
+        else:
+            out["rsi"] = nan
+
+    return {name: out[name] for name in FIELDS}
+
+
+class PriceMatrix:
+    """Closes of a symbol universe on shared trading days, with the latest indicator vectors"""
+
+    def __init__(self, symbols, dates, closes, last_bars):
+        self.symbols = symbols          # [symbols] str
+        self.dates = dates              # [days] storage keys
+        self.closes = closes            # [symbols, days] float32, forward-filled
+        self.last_bars = last_bars      # [symbols] key of each symbol's latest stored bar
+        self.fields = latest_indicators(closes) if len(symbols) else {name: np.array([]) for name in FIELDS}
+        self.built_at = time.time()
+        self.source_refreshed = 0.0     # Store refresh time the matrix reflects
+
+    @classmethod
+    def from_closes(cls, frame, days):
+        """Build from a long (symbol, date, close) frame, keeping the last `days` trading days"""
+        if frame.empty:
+            return cls(np.array([], dtype=str), np.array([], dtype=str), np.empty((0, 0), dtype=np.float32),
+                       np.array([], dtype=str))
+        symbol_codes, symbols = pd.factorize(frame["symbol"], sort=True)
+        date_codes, dates = pd.factorize(frame["date"], sort=True)
+        closes = np.full((len(symbols), len(dates)), np.nan, dtype=np.float32)
+        closes[symbol_codes, date_codes] = frame["close"].to_numpy(dtype=np.float32)
+
+        last = np.full(len(symbols), -1)
+        np.maximum.at(last, symbol_codes, date_codes)
+        dates = np.asarray(dates, dtype=str)
+        closes = forward_fill(closes[:, -days:])
+        return cls(np.asarray(symbols, dtype=str), dates[-days:], closes, dates[last])
+
+    @classmethod
+    def from_store(cls, store, start="", days=504, interval="1d"):
+        """Build from every symbol in the history store, with one query"""
+        return load_universe(store, start, days, interval)[0]
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def add_field(self, name, values):
+        self.fields[name] = np.asarray(values, dtype=np.float64)
+
+
+def symbol_closes(frame):
+    """
+    Each symbol's stored closes from a long (symbol, date, close) frame, as
+    {symbol: (float64 closes oldest first, key of the last bar)}
+    """
+    frame = frame.sort_values(["symbol", "date"], kind="stable")
+    symbols = frame["symbol"].to_numpy()
+    dates = frame["date"].to_numpy()
+    closes = frame["close"].to_numpy(dtype=np.float64)
+    bounds = np.flatnonzero(symbols[1:] != symbols[:-1]) + 1
+    return {
+        str(symbols[first]): (closes[first:last], str(dates[last - 1]))
+        for first, last in zip(np.r_[0, bounds], np.r_[bounds, len(symbols)])
+    }
+
+
+def load_universe(store, start="", days=504, interval="1d"):
+    """
+    PriceMatrix of every symbol in the history store, with one query, plus
+    each symbol's stored closes from `start` on at full precision
+    (symbol_closes()), for computations that must match the per-symbol routes
+    """
+    refreshed = store.last_refreshed(interval)  # Read first: a refresh racing the query triggers another build
+    frame = store.read_all_closes(interval, start)
+    matrix = PriceMatrix.from_closes(frame, days)
+    matrix.source_refreshed = refreshed
+    return matrix, symbol_closes(frame)
+
+
+def parse_condition(text, fields):
+    """
+    Parse "field op value" (e.g. "rsi<30", "close<ma200"); the right-hand
+    side is a number or another field. Returns (field, operator, value).
+    """
+    match = CONDITION.match(text.lower())
+    if match is None:
+        raise ValueError(f"Conditions look like 'rsi<30' or 'close<ma200', got: {text!r}")
+    field, op, value = match.groups()
+    if field not in fields:
+        raise ValueError(f"Unknown field {field!r}; fields: {', '.join(fields)}")
+    if value not in fields:
+        try:
+            value = float(value)
+        except ValueError:
+            raise ValueError(f"{value!r} is neither a number nor a field") from None
+    return field, op, value
+
+
+def screen(fields, conditions, sort=None, limit=50, rows=None):
+    """
+    Row indices matching every condition, ordered by `sort` ("field" for
+    ascending, "-field" for descending; NaN last) and cut to the top `limit`
+
+    `rows` restricts the screen to a subset of rows.
+    """
+    size = len(next(iter(fields.values())))
+    mask = np.ones(size, dtype=bool) if rows is None else np.isin(np.arange(size), rows)
+    with np.errstate(invalid="ignore"):
+        for field, op, value in conditions:
+            other = fields[value] if isinstance(value, str) else value
+            mask &= OPERATORS[op](fields[field], other)  # NaN compares false
+    matched = np.flatnonzero(mask)
+
+    if sort is None:
+        return matched[:limit], len(matched)
+    descending = sort.startswith("-")
+    keys = fields[sort.lstrip("-")][matched]
+    keys = np.where(np.isnan(keys), np.inf, -keys if descending else keys)
+    if limit < len(matched):
+        top = np.argpartition(keys, limit - 1)[:limit]
+        matched, keys = matched[top], keys[top]
+    return matched[np.argsort(keys, kind="stable")], int(mask.sum())
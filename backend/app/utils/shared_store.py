@@ -0,0 +1,320 @@
+"""
+Memory-mapped history and indicator snapshots shared by every API worker
+
+Each (symbol, interval) has one read-only snapshot file under
+SHARED_STORE_DIR: a JSON header padded to a page, followed by a float64
+[fields, bars] block holding the bar timestamps, the OHLCV columns and every
+indicator, one contiguous row per field. Workers map it with np.memmap, so
+history frames and indicator columns are views onto the OS page cache: there
+is one copy per box however many uvicorn workers read it, and a worker that
+just started serves its first request from the file without downloading or
+recomputing anything.
+
+One writer at a time rebuilds a snapshot: the worker that finds it stale
+takes an exclusive flock on the symbol's lock file, re-checks (another worker
+may have just rebuilt it), refreshes the history store and writes the new
+snapshot to a temporary file that atomically replaces the old one. Readers
+still holding the old mapping keep a consistent view until their next lookup.
+
+Work sent to the CPU process pool gets a SnapshotRef (file path, signature
+and slice) rather than the frame, and the worker maps the file itself:
+nothing but the reference is pickled. A worker that finds the file replaced
+since the reference was taken raises SnapshotChanged.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from app.utils.history_store import COLUMNS, HISTORY_DB_PATH, get_history_store, period_start
+from app.utils.indicator_state import get_indicator_cache
+from app.utils.indicators import INDICATORS
+from app.utils.metrics import CACHE_REQUESTS
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: writers are only coordinated within a process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+SHARED_STORE_DIR = os.getenv("SHARED_STORE_DIR", os.path.join(os.path.dirname(HISTORY_DB_PATH), "shared"))
+SHARED_STORE_MAX_OPEN = int(os.getenv("SHARED_STORE_MAX_OPEN", "512"))  # Mappings kept open per process
+
+HEADER_BYTES = 4096
+MAGIC = b"STOCKSNAP1\n"
+FIELDS = ("timestamp", *COLUMNS, *INDICATORS)
+_ROWS = {name: i for i, name in enumerate(FIELDS)}
+
+
+class Snapshot:
+    """A mapped snapshot: header fields plus the [fields, bars] array (read-only)"""
+
+    def __init__(self, header, data, signature):
+        self.symbol = header["symbol"]
+        self.interval = header["interval"]
+        self.covered_from = header["covered_from"]
+        self.refreshed_at = header["refreshed_at"]
+        self.data = data
+        self.signature = signature
+        self.timestamps = data[_ROWS["timestamp"]]
+
+    def frame(self, start="", columns=()):
+        """
+        Bars from the storage key `start` on, shaped like HistoryStore.read(),
+        plus the requested indicator columns; every column is a view of the file
+        """
+        first = np.searchsorted(self.timestamps, key_seconds(start)) if start else 0
+        index = pd.DatetimeIndex(pd.to_datetime(self.timestamps[first:].astype(np.int64), unit="s"), name="Date")
+        # One block per column, each a slice of its row: nothing is copied
+        return pd.DataFrame(
+            {name: self.data[_ROWS[name], first:] for name in (*COLUMNS, *columns)}, index=index, copy=False
+        )
+
+
+class SnapshotChanged(LookupError):
+    """The snapshot file behind a SnapshotRef was replaced since the reference was taken"""
+
+
+class SnapshotRef(NamedTuple):
+    """Picklable pointer to a slice of a snapshot, resolved by mapping the file in the current process"""
+
+    path: str
+    signature: tuple
+    start: str
+    columns: tuple
+
+    def frame(self):
+        """The slice as Snapshot.frame() returns it; raises SnapshotChanged if the file was replaced"""
+        return map_snapshot(self.path, self.signature).frame(self.start, self.columns)
+
+
+_mapped = OrderedDict()  # path -> Snapshot, the mappings of SnapshotRefs resolved in this process
+_mapped_lock = threading.Lock()
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def map_snapshot(path, signature):
+    """The snapshot at `path` mapped in this process, provided it is still the version `signature` names"""
+    with _mapped_lock:
+        snapshot = _mapped.get(path)
+        if snapshot is not None and snapshot.signature == signature:
+            _mapped.move_to_end(path)
+            return snapshot
+    try:
+        if _signature(path) != signature:
+            raise SnapshotChanged(path)
+        snapshot = _read_snapshot(path, signature)
+        # Replaced between the check and the mapping: the mapping may be of the new file
+        if _signature(path) != signature:
+            raise SnapshotChanged(path)
+    except FileNotFoundError:
+        raise SnapshotChanged(path) from None
+    with _mapped_lock:
+        _mapped[path] = snapshot
+        _mapped.move_to_end(path)
+        while len(_mapped) > SHARED_STORE_MAX_OPEN:
+            _mapped.popitem(last=False)
+    return snapshot
+
+
+def key_seconds(key):
+    """Storage key (market-local, naive) as the seconds stored in the timestamp row"""
+    return pd.Timestamp(key).value // 10**9
+
+
+def _write_snapshot(path, header, data):
+    encoded = json.dumps(header).encode()
+    if len(MAGIC) + len(encoded) + 1 > HEADER_BYTES:
+        raise ValueError("Snapshot header does not fit in its page")
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write((MAGIC + encoded + b"\n").ljust(HEADER_BYTES, b" "))
+        f.write(np.ascontiguousarray(data, dtype="<f8").tobytes())
+    os.replace(tmp, path)
+
+
+def _read_snapshot(path, signature):
+    with open(path, "rb") as f:
+        head = f.read(HEADER_BYTES)
+    if not head.startswith(MAGIC):
+        raise ValueError(f"Not a snapshot file: {path}")
+    header = json.loads(head[len(MAGIC):].strip())
+    shape = (len(header["fields"]), header["bars"])
+    if tuple(header["fields"]) != FIELDS:
+        raise ValueError(f"Snapshot fields changed: {path}")
+    data = np.memmap(path, dtype="<f8", mode="r", offset=HEADER_BYTES, shape=shape).view(np.ndarray)
+    return Snapshot(header, data, signature)
+
+
+class SharedHistoryStore:
+    """Serves history frames with indicators from shared, memory-mapped snapshots"""
+
+    def __init__(self, directory=SHARED_STORE_DIR, store=None):
+        self.directory = directory
+        self.store = store or get_history_store()
+        self._open = OrderedDict()   # (symbol, interval) -> Snapshot, least recently used first
+        self._open_lock = threading.Lock()
+        self._writer_locks = {}
+        self._writer_locks_guard = threading.Lock()
+        self.hits = 0
+        self.rebuilds = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, symbol, interval):
+        return os.path.join(self.directory, f"{symbol}_{interval}.snap")
+
+    def get_history(self, symbol, period="1y", interval="1d", columns=()):
+        """
+        HistoryStore.get_history() with the indicator `columns` attached
+
+        A snapshot that covers `period` and is fresh by the market calendar is
+        served as-is; otherwise one writer refreshes the bars and republishes it.
+        """
+        snapshot, covered_from = self._snapshot(symbol, period, interval)
+        if snapshot is None:
+            index = pd.DatetimeIndex([], name="Date")
+            return pd.DataFrame(columns=[*COLUMNS, *columns], index=index, dtype="float64")
+        return snapshot.frame(covered_from, columns)
+
+    def get_history_ref(self, symbol, period="1y", interval="1d", columns=()):
+        """
+        get_history() plus a SnapshotRef to the same bars, for work handed to
+        another process; returns (frame, ref), ref None when there are no bars
+        """
+        snapshot, covered_from = self._snapshot(symbol, period, interval)
+        if snapshot is None:
+            return self.get_history(symbol, period, interval, columns), None
+        ref = SnapshotRef(self.path(snapshot.symbol, interval), snapshot.signature, covered_from, tuple(columns))
+        return snapshot.frame(covered_from, columns), ref
+
+    def _snapshot(self, symbol, period, interval):
+        """Up-to-date snapshot covering `period` (None without bars) and the storage key the period starts at"""
+        symbol = symbol.upper()
+        since = period_start(period)
+        covered_from = since.isoformat() if since is not None else ""
+
+        snapshot = self.open(symbol, interval)
+        if not self._usable(snapshot, covered_from):
+            with self._writer(symbol, interval):
+                # Another worker may have rebuilt it while we waited for the lock
+                snapshot = self.open(symbol, interval)
+                if not self._usable(snapshot, covered_from):
+                    CACHE_REQUESTS.inc(cache="shared_history", result="rebuild")
+                    self.rebuilds += 1
+                    self.store.refresh(symbol, period, interval)
+                    snapshot = self.publish(symbol, interval)
+        else:
+            CACHE_REQUESTS.inc(cache="shared_history", result="hit")
+            self.hits += 1
+        return snapshot, covered_from
+
+    def _usable(self, snapshot, covered_from):
+        return (
+            snapshot is not None
+            and snapshot.covered_from <= covered_from
+            and self.store.is_fresh(snapshot.refreshed_at)
+        )
+
+    def publish(self, symbol, interval):
+        """Write the snapshot of everything stored for the symbol; returns it mapped (None without bars)"""
+        meta = self.store.meta(symbol, interval)
+        hist = self.store.read(symbol, interval, start=meta["covered_from"]) if meta else None
+        if hist is None or hist.empty:
+            return None
+
+        indicators = get_indicator_cache().get(symbol, hist, interval)
+        data = np.empty((len(FIELDS), len(hist)))
+        data[0] = hist.index.as_unit("s").asi8
+        data[1:1 + len(COLUMNS)] = hist[COLUMNS].to_numpy(dtype=np.float64).T
+        for i, name in enumerate(INDICATORS, 1 + len(COLUMNS)):
+            data[i] = indicators[name]
+
+        header = {
+            "symbol": symbol,
+            "interval": interval,
+            "covered_from": meta["covered_from"],
+            "refreshed_at": meta["refreshed_at"],
+            "fields": list(FIELDS),
+            "bars": len(hist),
+        }
+        _write_snapshot(self.path(symbol, interval), header, data)
+        return self.open(symbol, interval)
+
+    def open(self, symbol, interval):
+        """The current snapshot of a symbol, remapped when the file was replaced; None if there is none"""
+        key = (symbol, interval)
+        path = self.path(symbol, interval)
+        try:
+            signature = _signature(path)
+        except FileNotFoundError:
+            return None
+
+        with self._open_lock:
+            snapshot = self._open.get(key)
+            if snapshot is not None and snapshot.signature == signature:
+                self._open.move_to_end(key)
+                return snapshot
+        try:
+            snapshot = _read_snapshot(path, signature)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring snapshot %s: %s", path, e)
+            return None
+        with self._open_lock:
+            self._open[key] = snapshot
+            self._open.move_to_end(key)
+            while len(self._open) > SHARED_STORE_MAX_OPEN:
+                self._open.popitem(last=False)
+        return snapshot
+
+    @contextmanager
+    def _writer(self, symbol, interval):
+        """Exclusive right to rebuild a snapshot, across threads and worker processes"""
+        with self._writer_locks_guard:
+            lock = self._writer_locks.setdefault((symbol, interval), threading.Lock())
+        with lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path(symbol, interval) + ".lock", "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def stats(self):
+        with self._open_lock:
+            snapshots = list(self._open.values())
+        return {
+            "directory": self.directory,
+            "mapped": len(snapshots),
+            "mapped_bytes": sum(snapshot.data.nbytes for snapshot in snapshots),
+            "hits": self.hits,
+            "rebuilds": self.rebuilds,
+        }
+
+
+_shared = None
+_shared_guard = threading.Lock()
+
+
+def get_shared_history():
+    """Process-wide shared history store"""
+    global _shared
+    with _shared_guard:
+        if _shared is None:
+            _shared = SharedHistoryStore()
+        return _shared
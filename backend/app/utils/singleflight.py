@@ -0,0 +1,57 @@
+"""
+In-process request coalescing (single-flight)
+
+Concurrent callers asking for the same key share one in-flight computation
+instead of each repeating the history fetch, indicators and forecast.
+"""
+
+import asyncio
+from collections import defaultdict
+
+
+class SingleFlight:
+    """Run at most one computation per key at a time and share its result"""
+
+    def __init__(self):
+        self._inflight = {}
+        self._stats = defaultdict(lambda: {"calls": 0, "executions": 0, "coalesced": 0})
+
+    async def do(self, key, fn):
+        """
+        Await `fn()` for `key`, or join the computation already running for it
+
+        The first element of the key is used as the namespace for the counters
+        (e.g. "stock" or "predict"). The computation runs as its own task, so a
+        caller disconnecting does not cancel it for everybody else.
+        """
+        stats = self._stats[key[0]]
+        stats["calls"] += 1
+
+        task = self._inflight.get(key)
+        if task is None:
+            stats["executions"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            stats["coalesced"] += 1
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter went away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        """Counters per namespace plus the number of computations in flight"""
+        return {
+            "in_flight": len(self._inflight),
+            "routes": {name: dict(counts) for name, counts in self._stats.items()},
+        }
+
+
+# Shared by all routers in this process
+coalescer = SingleFlight()
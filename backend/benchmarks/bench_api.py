@@ -0,0 +1,294 @@
+"""
+Benchmark: API hot paths on recorded data
+
+Replays fixture histories (benchmarks/fixtures.py) through the real route
+code, without network access, and measures:
+
+  - per-stage timings of the prediction and stock paths (fetch, indicators,
+    scaling, forecast, payload assembly, serialization)
+  - end-to-end latency of POST /api/predict/ and GET /api/stock/{symbol}
+    at several concurrency levels, through an in-process ASGI client
+
+With --replay only the committed fixtures are used (every one of them by
+default), and a symbol without one is an error rather than a synthetic
+stand-in; the fixture files' digest is stored with the results so runs on
+different data are not compared by mistake.
+
+Results are written as JSON; pass --compare to diff against an earlier run.
+The prediction result cache is disabled unless --with-cache is given, so
+repeated requests measure the computation rather than cache hits.
+
+Run from the backend directory:
+    python -m benchmarks.bench_api --replay --compare benchmarks/results/baseline.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+STAGE_REPEAT = 30
+DAYS = 30
+
+
+def configure_environment(workdir, with_cache):
+    """Point every on-disk store at a scratch directory before the app is imported"""
+    os.environ["HISTORY_DB_PATH"] = os.path.join(workdir, "history.db")
+    os.environ["MODEL_REGISTRY_DIR"] = os.path.join(workdir, "registry")
+    os.environ["RESULT_CACHE_DB_PATH"] = ""
+    if not with_cache:
+        os.environ["RESULT_CACHE_MAX_BYTES"] = "0"
+
+
+def median_ms(fn, repeat=STAGE_REPEAT):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def stage_timings(symbol, fetcher, workdir):
+    """Median time of each stage of the prediction and stock paths for one symbol"""
+    import numpy as np
+    from sklearn.preprocessing import MinMaxScaler
+
+    from app.models.forecast import simple_prediction
+    from app.models.inference import inference_engine
+    from app.routes.predict import HISTORY_PERIOD, PREDICT_INDICATORS, build_prediction
+    from app.routes.stock import STOCK_INDICATORS, compute_stock_data
+    from app.utils.history_store import HistoryStore, get_history_store
+    from app.utils.indicators import compute_indicators
+    from app.utils.serialization import dumps
+
+    cold = iter(range(10 ** 6))
+    stages = {
+        # A fresh store per call: full download (fixture replay) plus SQLite write
+        "fetch_cold": median_ms(
+            lambda: HistoryStore(os.path.join(workdir, f"cold-{next(cold)}.db"), fetcher).get_history(symbol, HISTORY_PERIOD),
+            repeat=5,
+        ),
+        "fetch_warm": median_ms(lambda: get_history_store().get_history(symbol, HISTORY_PERIOD)),
+    }
+
+    hist = get_history_store().get_history(symbol, HISTORY_PERIOD)
+    close = hist["Close"].to_numpy()
+    stages["indicators"] = median_ms(lambda: compute_indicators(close, PREDICT_INDICATORS))
+
+    data = close.reshape(-1, 1)
+    stages["scaling"] = median_ms(lambda: MinMaxScaler(feature_range=(0, 1)).fit_transform(data))
+    scaled = MinMaxScaler(feature_range=(0, 1)).fit_transform(data)
+
+    stages["forecast_simple"] = median_ms(lambda: simple_prediction(scaled, DAYS, 0))
+    if inference_engine.ready:
+        window = [scaled[-inference_engine.sequence_length:, 0].astype(np.float32)]
+        stages["forecast_model"] = median_ms(lambda: inference_engine.predict_batch(window, [DAYS]))
+
+    stages["prediction_payload"] = median_ms(lambda: build_prediction(symbol, hist.copy(), DAYS, None, "records", 0))
+    payload = build_prediction(symbol, hist.copy(), DAYS, None, "records", 0)
+    stages["prediction_serialization"] = median_ms(lambda: dumps(payload))
+
+    stock_hist = get_history_store().get_history(symbol, "1y")
+    stages["stock_indicators"] = median_ms(lambda: compute_indicators(stock_hist["Close"].to_numpy(), STOCK_INDICATORS))
+    stages["stock_payload"] = median_ms(lambda: compute_stock_data(symbol, stock_hist.copy()))
+    stock_payload = compute_stock_data(symbol, stock_hist.copy())
+    stages["stock_serialization"] = median_ms(lambda: dumps({"symbol": symbol, "data": stock_payload[0]}))
+    return {name: round(value, 4) for name, value in stages.items()}
+
+
+def percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def load_test(app, requests, concurrency, with_cache):
+    """Issue `requests` (list of (method, url, body)) with at most `concurrency` in flight"""
+    import httpx
+
+    from app.utils.result_cache import prediction_cache
+
+    if not with_cache:
+        prediction_cache.clear()
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def issue(method, url, body):
+            nonlocal failures
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.request(method, url, json=body)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(issue(*request) for request in requests))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(requests),
+        "failures": failures,
+        "throughput_rps": round(len(requests) / elapsed, 2),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+        "max_ms": round(latencies[-1], 3),
+    }
+
+
+async def end_to_end(symbols, concurrency_levels, requests_per_level, with_cache):
+    from main import app
+
+    endpoints = {
+        # Vary the horizon so concurrent requests aren't all coalesced into one
+        "predict": [("POST", "/api/predict/", {"symbol": s, "days": d}) for s in symbols for d in (10, 20, 30, 60)],
+        "stock": [("GET", f"/api/stock/{s}?period=1y", None) for s in symbols],
+    }
+
+    # Runs the app's startup/shutdown handlers (model loading, pool shutdown)
+    async with app.router.lifespan_context(app):
+        # Warm the history store and the indicator cache, as a running server would be
+        for name, requests in endpoints.items():
+            await load_test(app, requests, 1, with_cache)
+
+        results = {}
+        for name, requests in endpoints.items():
+            results[name] = {}
+            for concurrency in concurrency_levels:
+                batch = [requests[i % len(requests)] for i in range(requests_per_level)]
+                results[name][str(concurrency)] = await load_test(app, batch, concurrency, with_cache)
+                stats = results[name][str(concurrency)]
+                print(f"{name:<8} c={concurrency:<4} p50 {stats['p50_ms']:>8.2f} ms  p95 {stats['p95_ms']:>8.2f} ms"
+                      f"  {stats['throughput_rps']:>8.1f} req/s  failures {stats['failures']}")
+        return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=BENCH_DIR, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def fixture_digest(symbols, fixture_dir):
+    """SHA-256 over the history fixtures of `symbols`, identifying the replayed data"""
+    from benchmarks.fixtures import history_path
+
+    digest = hashlib.sha256()
+    for symbol in sorted(symbols):
+        with open(history_path(symbol, fixture_dir), "rb") as f:
+            digest.update(symbol.encode() + b"\0" + f.read())
+    return digest.hexdigest()
+
+
+def compare(current, baseline):
+    """Print relative changes against an earlier results file"""
+    print(f"\nCompared with {baseline['meta'].get('revision')} ({baseline['meta'].get('timestamp')}):")
+    digests = current["meta"].get("fixture_digest"), baseline["meta"].get("fixture_digest")
+    if digests[0] != digests[1]:
+        print("  Warning: the runs replayed different data (fixture digests differ)")
+    for symbol, stages in current["stages"].items():
+        for stage, value in stages.items():
+            before = baseline.get("stages", {}).get(symbol, {}).get(stage)
+            if before:
+                print(f"  {symbol:<6} {stage:<26} {before:>9.3f} -> {value:>9.3f} ms  {(value / before - 1) * 100:+6.1f}%")
+    for endpoint, levels in current["end_to_end"].items():
+        for level, stats in levels.items():
+            before = baseline.get("end_to_end", {}).get(endpoint, {}).get(level)
+            if before:
+                change = (stats["p50_ms"] / before["p50_ms"] - 1) * 100
+                print(f"  {endpoint:<8} c={level:<4} p50 {before['p50_ms']:>9.3f} -> {stats['p50_ms']:>9.3f} ms  {change:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the API hot paths on recorded data")
+    parser.add_argument("--symbols", nargs="+", help="Default: AAPL MSFT NVDA AMZN, or every fixture with --replay")
+    parser.add_argument("--replay", action="store_true", help="Use only the recorded fixtures, never synthetic data")
+    parser.add_argument("--fixtures", help="Fixture directory (default: benchmarks/fixtures)")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=128, help="Requests per concurrency level")
+    parser.add_argument("--with-cache", action="store_true", help="Keep the prediction result cache enabled")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results file to diff against")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-api-")
+    configure_environment(workdir, args.with_cache)
+
+    from app.utils.history_store import set_fetcher
+    from benchmarks.fixtures import FIXTURE_DIR, FixtureFetcher, fixture_symbols, history_path
+
+    fixture_dir = args.fixtures or FIXTURE_DIR
+    if args.symbols:
+        symbols = [symbol.upper() for symbol in args.symbols]
+    else:
+        symbols = fixture_symbols(fixture_dir) if args.replay else ["AAPL", "MSFT", "NVDA", "AMZN"]
+    if args.replay:
+        missing = [symbol for symbol in symbols if not os.path.exists(history_path(symbol, fixture_dir))]
+        if missing or not symbols:
+            sys.exit(f"--replay needs a fixture for every symbol; missing in {fixture_dir}: "
+                     f"{', '.join(missing) or '(no fixtures)'}")
+
+    fetcher = FixtureFetcher(fixture_dir)
+    set_fetcher(fetcher)  # Also serves Ticker.info to the metadata store
+
+    for symbol in symbols:
+        fetcher.frame(symbol)
+    synthetic = [symbol for symbol, source in fetcher.sources.items() if source == "synthetic"]
+    if synthetic:
+        print(f"No recorded fixture for {', '.join(synthetic)}; using synthetic histories")
+
+    print(f"{'symbol':<8} {'stage':<26} {'median ms':>10}")
+    stages = {}
+    for symbol in symbols:
+        stages[symbol] = stage_timings(symbol, fetcher, workdir)
+        for stage, value in stages[symbol].items():
+            print(f"{symbol:<8} {stage:<26} {value:>10.3f}")
+    print()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "cpu_pool_mode": os.getenv("CPU_POOL_MODE", "process"),
+            "with_cache": args.with_cache,
+            "data": dict(fetcher.sources),
+            "fixture_digest": fixture_digest(symbols, fixture_dir) if args.replay else None,
+        },
+        "stages": stages,
+        "end_to_end": asyncio.run(end_to_end(symbols, args.concurrency, args.requests, args.with_cache)),
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
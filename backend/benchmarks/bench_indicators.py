@@ -0,0 +1,77 @@
+"""
+Benchmark: vectorized indicator engine vs the original pandas rolling() code
+
+Run from the backend directory:
+    python -m benchmarks.bench_indicators
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.indicators import INDICATORS, compute_indicators
+
+HISTORIES = {"5y": 252 * 5, "20y": 252 * 20}
+REPEAT = 50
+
+
+def pandas_indicators(close):
+    """Indicator code as it was written in the stock route"""
+    hist = pd.DataFrame({"Close": close})
+    hist['MA50'] = hist['Close'].rolling(window=50).mean()
+    hist['MA100'] = hist['Close'].rolling(window=100).mean()
+    hist['MA200'] = hist['Close'].rolling(window=200).mean()
+    hist['MA20'] = hist['Close'].rolling(window=20).mean()
+    hist['Daily_Return'] = hist['Close'].pct_change()
+    hist['Volatility'] = hist['Daily_Return'].rolling(window=20).std()
+    hist['BB_upper'] = hist['MA20'] + (hist['Close'].rolling(window=20).std() * 2)
+    hist['BB_lower'] = hist['MA20'] - (hist['Close'].rolling(window=20).std() * 2)
+    delta = hist['Close'].diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+    rs = gain / loss
+    hist['RSI'] = 100 - (100 / (1 + rs))
+    return hist
+
+
+def synthetic_close(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, n)))
+
+
+def best_of(fn, *args):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    print(f"{'history':<8} {'rows':>6} {'pandas ms':>10} {'engine ms':>10} {'speedup':>8} {'max rel err':>12}")
+    for label, rows in HISTORIES.items():
+        close = synthetic_close(rows)
+
+        expected = pandas_indicators(close)
+        actual = compute_indicators(close)
+        max_err = 0.0
+        for name in INDICATORS:
+            want = expected[name].to_numpy()
+            got = actual[name]
+            assert np.array_equal(np.isnan(want), np.isnan(got)), f"NaN mismatch in {name}"
+            valid = ~np.isnan(want)
+            err = np.abs(got[valid] - want[valid]) / np.maximum(np.abs(want[valid]), 1e-12)
+            max_err = max(max_err, float(err.max(initial=0.0)))
+
+        pandas_time = best_of(pandas_indicators, close)
+        engine_time = best_of(compute_indicators, close)
+        print(
+            f"{label:<8} {rows:>6} {pandas_time * 1000:>10.3f} {engine_time * 1000:>10.3f} "
+            f"{pandas_time / engine_time:>7.1f}x {max_err:>12.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
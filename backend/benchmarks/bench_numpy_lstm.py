@@ -0,0 +1,139 @@
+"""
+Parity and cold-start check: NumPy LSTM export vs Keras
+
+Builds the architectures train_model.py produces (plus the checked-in
+saved model, if any), exports them with ml_model/export_model.py and compares
+forward passes. Then loads each backend in a fresh process and reports the
+time to a warmed-up model and the peak RSS.
+
+Run from the backend directory:
+    python -m benchmarks.bench_numpy_lstm
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ML_MODEL_DIR = os.path.join(BACKEND_DIR, "..", "ml_model")
+SAVED_MODEL = os.path.join(ML_MODEL_DIR, "saved_models", "lstm_model.h5")
+SEQUENCE_LENGTH = 60
+TOLERANCE = 1e-4
+
+# Loads one model in a fresh interpreter and reports load time and peak RSS
+STARTUP_SCRIPT = """
+import os, resource, sys, time
+start = time.perf_counter()
+os.environ["INFERENCE_BACKEND"] = sys.argv[2]
+from app.models.inference import InferenceEngine
+engine = InferenceEngine(sys.argv[1])
+assert engine.load()
+elapsed = time.perf_counter() - start
+try:
+    # VmHWM starts fresh at exec; ru_maxrss would include the parent's peak
+    with open("/proc/self/status") as f:
+        peak = next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+except OSError:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(elapsed, peak / 1024, "tensorflow" in sys.modules)
+"""
+
+
+def build_models():
+    from tensorflow import keras
+    from tensorflow.keras.layers import LSTM, Dense, Dropout, RepeatVector, Reshape, TimeDistributed
+
+    def stacked(horizon):
+        return keras.Sequential([
+            keras.Input((SEQUENCE_LENGTH, 1)),
+            LSTM(50, return_sequences=True), Dropout(0.2),
+            LSTM(50, return_sequences=True), Dropout(0.2),
+            LSTM(50), Dropout(0.2),
+            Dense(25), Dense(horizon),
+        ])
+
+    seq2seq = keras.Sequential([
+        keras.Input((SEQUENCE_LENGTH, 1)),
+        LSTM(50, return_sequences=True), Dropout(0.2),
+        LSTM(50), Dropout(0.2),
+        RepeatVector(60),
+        LSTM(50, return_sequences=True), Dropout(0.2),
+        TimeDistributed(Dense(1)),
+        Reshape((60,)),
+    ])
+
+    models = {"recursive": stacked(1), "direct-dense": stacked(60), "direct-seq2seq": seq2seq}
+    if os.path.exists(SAVED_MODEL):
+        models["saved_models"] = keras.models.load_model(SAVED_MODEL, compile=False)
+    return models
+
+
+def check_parity(workdir):
+    """Compare every model's forward pass; returns (h5 paths, names of mismatching models)"""
+    sys.path.insert(0, os.path.abspath(ML_MODEL_DIR))
+    from export_model import export_numpy
+    from app.models.numpy_lstm import NumpyLSTMModel
+
+    rng = np.random.default_rng(0)
+    x = rng.random((64, SEQUENCE_LENGTH, 1), dtype=np.float32)
+    print(f"{'model':<16} {'max abs diff':>12} {'keras ms':>9} {'numpy ms':>9}")
+    paths, mismatches = {}, []
+    for name, model in build_models().items():
+        h5_path = os.path.join(workdir, f"{name}.h5")
+        model.save(h5_path)
+        npz_path = export_numpy(model, os.path.join(workdir, f"{name}.npz"))
+        paths[name] = h5_path
+
+        expected = model(x, training=False).numpy()
+        numpy_model = NumpyLSTMModel.load(npz_path)
+        actual = numpy_model(x)
+        diff = float(np.max(np.abs(expected - actual.reshape(expected.shape))))
+
+        keras_ms = timed(lambda: model(x, training=False))
+        numpy_ms = timed(lambda: numpy_model(x))
+        status = "ok" if diff < TOLERANCE else "MISMATCH"
+        if diff >= TOLERANCE:
+            mismatches.append(name)
+        print(f"{name:<16} {diff:>12.2e} {keras_ms:>9.1f} {numpy_ms:>9.1f}  {status}")
+    return paths, mismatches
+
+
+def timed(fn, repeat=20):
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def compare_startup(model_path):
+    print(f"\n{'backend':<8} {'load s':>7} {'peak RSS MB':>12} {'tensorflow imported':>20}")
+    for backend in ("keras", "numpy"):
+        out = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT, model_path, backend],
+            cwd=BACKEND_DIR, capture_output=True, text=True,
+            env={**os.environ, "TF_CPP_MIN_LOG_LEVEL": "3"},
+        )
+        if out.returncode != 0:
+            print(f"{backend:<8} failed: {out.stderr.strip().splitlines()[-1]}")
+            continue
+        elapsed, rss, tf_loaded = out.stdout.split()[-3:]
+        print(f"{backend:<8} {float(elapsed):>7.2f} {float(rss):>12.0f} {tf_loaded:>20}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as workdir:
+        paths, mismatches = check_parity(workdir)
+        compare_startup(paths["direct-dense"])
+    if mismatches:
+        sys.exit(f"NumPy export does not match Keras for: {', '.join(mismatches)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Recorded yfinance histories for offline benchmarks
+
+Fixtures live in benchmarks/fixtures/ as <SYMBOL>.csv.gz (the frame returned
+by Ticker.history) and <SYMBOL>.info.json (Ticker.info). FixtureFetcher plugs
+into the history store in place of Yahoo Finance and replays them, shifted
+by whole weeks so the last recorded bar lands on the latest session; period
+and start slicing behave like the live API. Symbols without a recording get
+a deterministic synthetic history instead, and are reported as such.
+FixtureQuoteSource does the same for the live quote feed.
+
+Record fixtures (needs network access), from the backend directory:
+    python -m benchmarks.fixtures AAPL MSFT NVDA --period 10y
+
+The committed SAMPLE fixture was written without network access with
+--synthetic (a frozen synthetic history in the recorded file format), so
+`bench_api --replay` runs on the same bytes on every machine; recording
+real tickers next to it works the same way.
+"""
+
+import argparse
+import json
+import os
+import zlib
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.utils.history_store import COLUMNS, MARKET_TZ, last_market_close, period_start
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SYNTHETIC_YEARS = 20
+
+
+def history_path(symbol, fixture_dir=FIXTURE_DIR):
+    return os.path.join(fixture_dir, f"{symbol.upper()}.csv.gz")
+
+
+def info_path(symbol, fixture_dir=FIXTURE_DIR):
+    return os.path.join(fixture_dir, f"{symbol.upper()}.info.json")
+
+
+def synthetic_history(symbol, years=SYNTHETIC_YEARS):
+    """Deterministic geometric random walk shaped like Ticker.history()"""
+    rng = np.random.default_rng(zlib.crc32(symbol.upper().encode()))
+    end = pd.Timestamp(last_market_close().date())
+    index = pd.bdate_range(end=end, periods=252 * years, tz=MARKET_TZ, name="Date")
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.018, len(index))))
+    spread = close * rng.uniform(0.002, 0.02, len(index))
+    return pd.DataFrame(
+        {
+            "Open": close + rng.normal(0, 0.3, len(index)) * spread,
+            "High": close + spread,
+            "Low": close - spread,
+            "Close": close,
+            "Volume": rng.integers(1_000_000, 50_000_000, len(index)).astype(float),
+            "Dividends": 0.0,
+            "Stock Splits": 0.0,
+        },
+        index=index,
+    )
+
+
+class FixtureFetcher:
+    """History store fetcher that replays fixtures instead of calling Yahoo Finance"""
+
+    def __init__(self, fixture_dir=FIXTURE_DIR):
+        self.fixture_dir = fixture_dir
+        self.sources = {}  # symbol -> "recorded" or "synthetic"
+        self._frames = {}
+
+    def frame(self, symbol):
+        symbol = symbol.upper()
+        if symbol not in self._frames:
+            path = history_path(symbol, self.fixture_dir)
+            if os.path.exists(path):
+                frame = pd.read_csv(path, index_col="Date")
+                frame.index = pd.to_datetime(frame.index, utc=True).tz_convert(MARKET_TZ)
+                frame = frame.reindex(columns=COLUMNS).fillna({"Dividends": 0.0, "Stock Splits": 0.0})
+                # Replay as if recorded today; whole weeks keep bars on weekdays
+                weeks = (last_market_close().date() - frame.index[-1].date()).days // 7
+                frame.index = frame.index + timedelta(weeks=weeks)
+                self.sources[symbol] = "recorded"
+            else:
+                frame = synthetic_history(symbol)
+                self.sources[symbol] = "synthetic"
+            self._frames[symbol] = frame
+        return self._frames[symbol]
+
+    def fetch(self, symbol, period=None, start=None, interval="1d"):
+        if interval != "1d":
+            raise ValueError("Fixtures only hold daily bars")
+        frame = self.frame(symbol)
+        since = start if start is not None else period_start(period) if period else None
+        if since is not None:
+            frame = frame[frame.index >= pd.Timestamp(since, tz=MARKET_TZ)]
+        return frame.copy()
+
+    def fetch_many(self, symbols, period=None, start=None, interval="1d"):
+        return {symbol: self.fetch(symbol, period=period, start=start, interval=interval) for symbol in symbols}
+
+    def info(self, symbol):
+        """Recorded Ticker.info, or a minimal stand-in"""
+        path = info_path(symbol, self.fixture_dir)
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        return {"longName": symbol.upper(), "currency": "USD", "exchange": "FIXTURE"}
+
+
+class FixtureQuoteSource:
+    """Live quote source that random-walks from each symbol's last fixture close"""
+
+    def __init__(self, fetcher=None, volatility=0.001):
+        self.fetcher = fetcher or FixtureFetcher()
+        self.volatility = volatility
+        self.polls = {}  # symbol -> number of quotes served
+        self._prices = {}
+        self._rng = np.random.default_rng(0)
+
+    def quote(self, symbol):
+        symbol = symbol.upper()
+        frame = self.fetcher.frame(symbol)
+        price = self._prices.get(symbol, float(frame["Close"].iloc[-1]))
+        price *= 1 + self._rng.normal(0, self.volatility)
+        self._prices[symbol] = price
+        self.polls[symbol] = self.polls.get(symbol, 0) + 1
+        return {
+            "price": price,
+            "previous_close": float(frame["Close"].iloc[-2]),
+            "day_high": max(price, float(frame["High"].iloc[-1])),
+            "day_low": min(price, float(frame["Low"].iloc[-1])),
+            "volume": float(frame["Volume"].iloc[-1]),
+        }
+
+
+def record(symbols, period="10y", fixture_dir=FIXTURE_DIR):
+    """Download histories and info from Yahoo Finance into fixture files"""
+    import yfinance as yf
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    for symbol in symbols:
+        ticker = yf.Ticker(symbol)
+        history = ticker.history(period=period)
+        if history.empty:
+            print(f"{symbol}: no data, skipped")
+            continue
+        history.to_csv(history_path(symbol, fixture_dir))
+        with open(info_path(symbol, fixture_dir), "w") as f:
+            json.dump(ticker.info, f, indent=2, default=str)
+        print(f"{symbol}: {len(history)} bars recorded {datetime.now():%Y-%m-%d}")
+
+
+def freeze(symbols, years=3, fixture_dir=FIXTURE_DIR):
+    """Write synthetic histories as fixture files, without network access"""
+    os.makedirs(fixture_dir, exist_ok=True)
+    for symbol in symbols:
+        history = synthetic_history(symbol, years)
+        history.to_csv(history_path(symbol, fixture_dir), float_format="%.6f",
+                       compression={"method": "gzip", "mtime": 0})
+        with open(info_path(symbol, fixture_dir), "w") as f:
+            json.dump({"longName": f"{symbol} (synthetic)", "currency": "USD", "exchange": "FIXTURE"}, f, indent=2)
+        print(f"{symbol}: {len(history)} synthetic bars frozen")
+
+
+def fixture_symbols(fixture_dir=FIXTURE_DIR):
+    """Symbols that have a history fixture"""
+    suffix = ".csv.gz"
+    return sorted(name[:-len(suffix)] for name in os.listdir(fixture_dir) if name.endswith(suffix))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record yfinance fixtures for the benchmarks")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--period", default="10y")
+    parser.add_argument("--synthetic", action="store_true", help="Freeze synthetic histories instead (no network)")
+    parser.add_argument("--years", type=int, default=3, help="Length of the frozen synthetic histories")
+    args = parser.parse_args()
+    symbols = [symbol.upper() for symbol in args.symbols]
+    if args.synthetic:
+        freeze(symbols, args.years)
+    else:
+        record(symbols, args.period)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,23 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
 
-from app.routes import stock, predict
-
+# Before the app imports: their modules read their configuration at import time
 load_dotenv()
 
+from app.models.inference import inference_engine
+from app.models.registry import model_registry
+from app.routes import stock, predict, models, scheduler, live, screener
+from app.utils.executors import pool_stats, shutdown_pools
+from app.utils.info_store import get_info_store
+from app.utils.metrics import CallbackMetric, MetricsMiddleware, render
+from app.utils.profiler import get_profile
+from app.utils.result_cache import prediction_cache
+from app.utils.shared_store import get_shared_history
+from app.utils.singleflight import coalescer
+
 app = FastAPI(
     title="Stock Price Prediction API",
     description="FastAPI backend for stock price prediction using LSTM",
@@ -22,9 +33,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and error counters (and opt-in profiling) for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Existing counters, read at scrape time
+CallbackMetric(
+    "pool_tasks", "Execution pool tasks by state", "gauge", ("pool", "state"),
+    lambda: {(pool, state): stats[state] for pool, stats in pool_stats().items() for state in ("running", "queued")},
+)
+CallbackMetric(
+    "singleflight_calls_total", "Coalesced route calls by outcome", "counter", ("route", "outcome"),
+    lambda: {
+        (route, outcome): counts[outcome]
+        for route, counts in coalescer.stats()["routes"].items() for outcome in ("executions", "coalesced")
+    },
+)
+CallbackMetric(
+    "inference_batches_total", "Micro-batched model calls", "counter", (),
+    lambda: {(): inference_engine.batches},
+)
+CallbackMetric(
+    "inference_batched_requests_total", "Forecasts served through micro-batches", "counter", (),
+    lambda: {(): inference_engine.batched_requests},
+)
+CallbackMetric(
+    "live_connections", "Live quote feeds and subscribed connections", "gauge", ("kind",),
+    lambda: {(kind,): live.live_hub.stats()[kind] for kind in ("feeds", "subscribers")},
+)
+CallbackMetric(
+    "result_cache_bytes", "Bytes held by the in-memory prediction cache", "gauge", (),
+    lambda: {(): prediction_cache.stats()["bytes"]},
+)
+
 # Include routers
 app.include_router(stock.router, prefix="/api/stock", tags=["Stock Data"])
 app.include_router(predict.router, prefix="/api/predict", tags=["Predictions"])
+app.include_router(models.router, prefix="/api/models", tags=["Models"])
+app.include_router(scheduler.router, prefix="/api/scheduler", tags=["Scheduler"])
+app.include_router(live.router, prefix="/api/live", tags=["Live"])
+app.include_router(screener.router, prefix="/api/screener", tags=["Screener"])
+
+@app.on_event("startup")
+async def startup():
+    # Load and warm the LSTM once so requests never pay for it
+    await inference_engine.start()
+    # Pre-compute the watchlist after each close (or on an interval)
+    scheduler.watchlist_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await scheduler.watchlist_scheduler.stop()
+    await live.live_hub.close()
+    await inference_engine.stop()
+    await model_registry.close()
+    await get_info_store().close()
+    shutdown_pools()
 
 @app.get("/")
 async def root():
@@ -37,3 +100,32 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/stats")
+async def stats():
+    """Request coalescing, execution pool, inference batching, model registry, caches, scheduler, live feed and screener counters"""
+    return {
+        "singleflight": coalescer.stats(),
+        "pools": pool_stats(),
+        "inference": inference_engine.stats(),
+        "models": model_registry.stats(),
+        "prediction_cache": prediction_cache.stats(),
+        "shared_history": get_shared_history().stats(),
+        "info_store": get_info_store().stats(),
+        "scheduler": scheduler.watchlist_scheduler.stats(),
+        "live": live.live_hub.stats(),
+        "screener": screener.universe.stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Latency histograms and counters in the Prometheus text format"""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/profiles/{profile_id}", response_class=PlainTextResponse)
+async def profile(profile_id: str):
+    """Collapsed stacks of a request profiled with the X-Profile header"""
+    collapsed = get_profile(profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=404, detail=f"No profile: {profile_id}")
+    return PlainTextResponse(collapsed)
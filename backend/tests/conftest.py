@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the backend as the API does, from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.history_store import MARKET_TZ, HistoryStore, last_market_close, period_start
+
+
+def bars(end, count):
+    index = pd.bdate_range(end=end, periods=count, tz=MARKET_TZ, name="Date")
+    close = np.linspace(100, 100 + count, count)
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1e6}, index=index)
+
+
+class FakeFetcher:
+    """Per-symbol fetcher serving fixed frames; unknown symbols come back empty like Yahoo's"""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.calls = []
+
+    def fetch(self, symbol, period=None, start=None, interval="1d"):
+        self.calls.append((symbol, period, start))
+        frame = self.frames.get(symbol, pd.DataFrame())
+        if frame.empty:
+            return frame
+        since = start if start is not None else period_start(period)
+        return frame[frame.index.date >= pd.Timestamp(since).date()]
+
+
+@pytest.fixture
+def setup(tmp_path):
+    today = pd.Timestamp(last_market_close().date())
+    fetcher = FakeFetcher({"AAPL": bars(today - pd.offsets.BDay(1), 300)})
+    return HistoryStore(path=str(tmp_path / "history.db"), fetcher=fetcher), fetcher, today
+
+
+def expire(store, symbol):
+    with store.connect() as conn:
+        conn.execute("UPDATE meta SET refreshed_at = 0 WHERE symbol = ?", (symbol,))
+
+
+def test_stale_copy_fetches_only_new_bars(setup):
+    store, fetcher, today = setup
+    first = store.get_history("aapl", period="1y")
+    assert fetcher.calls == [("AAPL", "1y", None)]
+
+    # Fresh copy: served without going upstream
+    store.get_history("AAPL", period="1y")
+    assert len(fetcher.calls) == 1
+
+    # A new session closes; once stale only bars from the last stored date on are requested
+    fetcher.frames["AAPL"] = bars(today, 301)
+    expire(store, "AAPL")
+    second = store.get_history("AAPL", period="1y")
+    assert fetcher.calls[1] == ("AAPL", None, str(first.index[-1].date()))
+    assert len(second) == len(first) + 1
+    assert second.index[-1] == today
+    assert store.meta("AAPL")["last_date"] == str(today.date())
+
+
+def test_longer_period_downloads_again(setup):
+    store, fetcher, _ = setup
+    store.get_history("AAPL", period="6mo")
+    store.get_history("AAPL", period="1y")
+    assert [call[1] for call in fetcher.calls] == ["6mo", "1y"]
+
+
+def test_unknown_symbol_is_negatively_cached(setup):
+    store, fetcher, _ = setup
+    assert store.get_history("NOPE", period="1y").empty
+    assert store.meta("NOPE")["last_date"] == ""
+
+    # Until the entry goes stale no request reaches upstream, one by one or in bulk
+    assert store.get_history("NOPE", period="1y").empty
+    assert store.get_histories(["NOPE"], period="1y")["NOPE"].empty
+    assert fetcher.calls == [("NOPE", "1y", None)]
+
+    # Then the full period is tried again, and bars that appeared are picked up
+    fetcher.frames["NOPE"] = bars(pd.Timestamp(last_market_close().date()), 50)
+    expire(store, "NOPE")
+    assert len(store.get_history("NOPE", period="1y")) == 50
+    assert fetcher.calls[-1] == ("NOPE", "1y", None)
+
+
+def test_empty_incremental_fetch_keeps_stored_range(setup):
+    store, fetcher, _ = setup
+    store.get_history("AAPL", period="1y")
+    before = store.meta("AAPL")
+    fetcher.frames["AAPL"] = pd.DataFrame()  # Nothing new upstream
+
+    expire(store, "AAPL")
+    store.get_history("AAPL", period="1y")
+    after = store.meta("AAPL")
+    assert (after["covered_from"], after["last_date"]) == (before["covered_from"], before["last_date"])
+    assert after["refreshed_at"] > 0
+
+
+def test_negative_entry_covers_longer_periods(setup):
+    store, fetcher, _ = setup
+    store.get_history("NOPE", period="1y")
+    store.get_history("NOPE", period="5y")
+    assert store.meta("NOPE")["covered_from"] == period_start("5y").isoformat()
+
+    # Both periods are now answered from the negative entry
+    store.get_history("NOPE", period="5y")
+    store.get_history("NOPE", period="1y")
+    assert [call[1] for call in fetcher.calls] == ["1y", "5y"]
+
+
+def test_unsupported_period_is_rejected(setup):
+    store, _, _ = setup
+    with pytest.raises(ValueError):
+        store.get_history("AAPL", period="7y")
@@ -0,0 +1,95 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.history_store import HistoryStore
+from app.utils.indicator_state import IndicatorCache, IndicatorState
+from app.utils.indicators import INDICATORS, compute_indicators
+
+
+def prices(count=400, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, count)))
+    closes[150:160] = closes[149]  # A flat stretch: zero returns and no gains or losses
+    return closes
+
+
+def keys_for(count):
+    return np.array([str(day.date()) for day in pd.bdate_range("2020-01-01", periods=count)])
+
+
+def history(closes):
+    index = pd.DatetimeIndex(pd.to_datetime(keys_for(len(closes))), name="Date")
+    return pd.DataFrame({"Close": closes}, index=index)
+
+
+def assert_matches(rows, closes):
+    expected = compute_indicators(closes)
+    for name in INDICATORS:
+        actual = np.array([row[name] for row in rows])
+        np.testing.assert_allclose(actual, expected[name], rtol=1e-7, atol=1e-9, equal_nan=True, err_msg=name)
+
+
+def test_bar_by_bar_matches_vectorized():
+    closes = prices()
+    state = IndicatorState()
+    rows = [state.update(key, close) for key, close in zip(keys_for(len(closes)), closes)]
+    assert_matches(rows, closes)
+
+
+def test_revised_last_bar_matches_vectorized():
+    closes = prices()
+    keys = keys_for(len(closes))
+    state = IndicatorState()
+    rows = []
+    for key, close in zip(keys, closes):
+        # Intraday revisions of each bar before its final close
+        state.update(key, close * 1.03)
+        state.update(key, close * 0.98)
+        rows.append(state.update(key, close))
+    assert_matches(rows, closes)
+
+
+def test_from_history_continues_like_a_full_replay():
+    closes = prices()
+    keys = keys_for(len(closes))
+    state = IndicatorState.from_history(keys[:300], closes[:300])
+    rows = [state.update(key, close) for key, close in zip(keys[300:], closes[300:])]
+    expected = compute_indicators(closes)
+    for name in INDICATORS:
+        np.testing.assert_allclose([row[name] for row in rows], expected[name][300:], rtol=1e-7, equal_nan=True)
+
+
+def test_serialized_state_continues_identically():
+    closes = prices()
+    keys = keys_for(len(closes))
+    state = IndicatorState.from_history(keys[:250], closes[:250])
+    restored = IndicatorState.from_dict(json.loads(json.dumps(state.to_dict())))
+    for key, close in zip(keys[250:], closes[250:]):
+        assert state.update(key, close) == pytest.approx(restored.update(key, close), nan_ok=True)
+
+
+def test_cache_reloaded_from_sqlite_stays_consistent(tmp_path):
+    closes = prices()
+    store = HistoryStore(path=str(tmp_path / "history.db"))
+
+    # Cold start on the first 300 bars, persisted to SQLite
+    IndicatorCache(store).get("TEST", history(closes[:300]))
+
+    # A new process: state and series come back from the database, then new bars arrive
+    cache = IndicatorCache(store)
+    partial = closes.copy()
+    partial[320] *= 1.05  # Today's bar, still moving
+    cache.get("TEST", history(partial[:321]))
+    values = cache.get("TEST", history(closes))
+
+    expected = compute_indicators(closes)
+    for name in INDICATORS:
+        np.testing.assert_allclose(values[name], expected[name], rtol=1e-7, equal_nan=True, err_msg=name)
+
+    # Reloading again serves exactly what was persisted
+    reloaded = IndicatorCache(store).get("TEST", history(closes))
+    for name in INDICATORS:
+        np.testing.assert_allclose(reloaded[name], values[name], rtol=1e-12, equal_nan=True, err_msg=name)
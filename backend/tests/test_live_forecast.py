@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.routes import live, predict
+from app.routes.predict import prediction_seed
+from app.utils.history_store import frame_keys
+from app.utils.indicator_state import IndicatorState
+from app.utils.indicators import compute_indicators
+from app.utils.result_cache import ResultCache
+
+
+class InlinePool:
+    async def run(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+
+def history():
+    index = pd.bdate_range(end="2026-01-02", periods=300, name="Date")
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(3).normal(0, 0.02, len(index))))
+    frame = pd.DataFrame({"Close": close, "Volume": 1e6}, index=index)
+    for name, values in compute_indicators(close, predict.PREDICT_INDICATORS).items():
+        frame[name] = values
+    return frame
+
+
+class FakeSharedHistory:
+    def get_history_ref(self, symbol, period="1y", interval="1d", columns=()):
+        frame = history()
+        return frame, frame
+
+
+def test_seed_ignores_the_bar_format():
+    key = "2026-01-02"
+    assert prediction_seed("AAPL", key) == prediction_seed("AAPL", pd.Timestamp(key).isoformat())
+    assert prediction_seed("AAPL", key) == prediction_seed("AAPL", pd.Timestamp(key))
+    assert prediction_seed("AAPL", key) != prediction_seed("MSFT", key)
+
+
+def test_live_forecast_matches_the_prediction_route(monkeypatch):
+    async def engine_for(symbol):
+        return None
+
+    for module in (live, predict):
+        monkeypatch.setattr(module, "engine_for", engine_for)
+    monkeypatch.setattr(predict, "get_shared_history", lambda: FakeSharedHistory())
+    monkeypatch.setattr(predict, "io_pool", InlinePool())
+    monkeypatch.setattr(predict, "cpu_pool", InlinePool())
+    monkeypatch.setattr(predict, "prediction_cache", ResultCache(path=""))
+
+    hist = history()
+    keys = frame_keys(hist.index)
+    closes = hist["Close"].to_numpy(dtype=np.float64, copy=True)
+    state = live.LiveState(str(keys[-1]), closes, IndicatorState.from_history(keys, closes))
+    forecast = asyncio.run(live.live_forecast("AAPL", state))
+
+    request = predict.PredictionRequest(symbol="AAPL", days=live.LIVE_FORECAST_DAYS)
+    expected = json.loads(asyncio.run(predict.run_prediction(request)).body)
+    # Same noise; only the scaling arithmetic differs, in the last bits
+    assert forecast["predictions"] == pytest.approx(expected["predictions"], rel=1e-12)
+    assert forecast["forecast_dates"] == expected["forecast_dates"]
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from app.models.numpy_lstm import NumpyLSTMModel
+from benchmarks.bench_numpy_lstm import ML_MODEL_DIR, SEQUENCE_LENGTH, build_models
+
+sys.path.insert(0, os.path.abspath(ML_MODEL_DIR))
+from export_model import export_numpy  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def models():
+    return build_models()
+
+
+@pytest.mark.parametrize("name", ["recursive", "direct-dense", "direct-seq2seq"])
+def test_numpy_export_matches_keras(models, name, tmp_path):
+    model = models[name]
+    x = np.random.default_rng(0).random((16, SEQUENCE_LENGTH, 1), dtype=np.float32)
+
+    numpy_model = NumpyLSTMModel.load(export_numpy(model, str(tmp_path / f"{name}.npz")))
+    expected = model(x, training=False).numpy()
+    actual = numpy_model(x).reshape(expected.shape)
+
+    assert np.allclose(actual, expected, rtol=1e-4, atol=1e-5)
@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.routes import predict
+from app.utils.indicators import compute_indicators
+from app.utils.result_cache import ResultCache
+
+
+def history(bars=300):
+    index = pd.bdate_range(end="2026-01-02", periods=bars, name="Date")
+    return pd.DataFrame({"Close": np.linspace(100, 130, bars), "Volume": 1e6}, index=index)
+
+
+class FakeStore:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.calls = []
+
+    def get_histories(self, symbols, period="1y", interval="1d"):
+        self.calls.append(list(symbols))
+        if self.failing & set(symbols):
+            raise RuntimeError("upstream down")
+        return {symbol: history(30 if symbol == "SHORT" else 300) for symbol in symbols if symbol != "NONE"}
+
+
+class InlinePool:
+    async def run(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+
+class FakeSharedHistory:
+    def get_history_ref(self, symbol, period="1y", interval="1d", columns=()):
+        frame = history()
+        for name, values in compute_indicators(frame["Close"].to_numpy(), columns).items():
+            frame[name] = values
+        return frame, frame  # The render step takes a frame as well as a reference
+
+
+def run_batch(monkeypatch, store, symbols, fail_forecast=(), fail_engine=(), horizons=(5, 10), fake_forecast=True):
+    async def engine_for(symbol):
+        if symbol in fail_engine:
+            raise RuntimeError("model did not load")
+        return None
+
+    async def forecast_group(engine, series, days, symbols, last_bars):
+        if set(fail_forecast) & set(symbols):
+            raise RuntimeError("model failed")
+        return [np.full(days, values[-1]) for values in series]
+
+    monkeypatch.setattr(predict, "get_history_store", lambda: store)
+    monkeypatch.setattr(predict, "engine_for", engine_for)
+    if fake_forecast:
+        monkeypatch.setattr(predict, "forecast_group", forecast_group)
+    monkeypatch.setattr(predict, "cpu_pool", InlinePool())
+    monkeypatch.setattr(predict, "BATCH_CHUNK_SIZE", 2)
+
+    async def collect():
+        response = await predict.predict_batch(predict.BatchPredictionRequest(symbols=symbols, horizons=list(horizons)))
+        chunks = [chunk async for chunk in response.body_iterator]
+        return chunks, [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+
+    return asyncio.run(collect())
+
+
+def test_batch_streams_one_line_per_symbol(monkeypatch):
+    chunks, lines = run_batch(monkeypatch, FakeStore(), ["AAA", "BBB", "CCC", "SHORT", "NONE"])
+    results = {line["symbol"]: line for line in lines}
+    assert sorted(results) == ["AAA", "BBB", "CCC", "NONE", "SHORT"]
+    assert len(lines) == 5
+    assert set(results["AAA"]["forecasts"]) == {"5", "10"}
+    assert len(results["AAA"]["forecasts"]["10"]["predictions"]) == 10
+    assert "error" in results["SHORT"] and "error" in results["NONE"]
+    # Chunks of two are sent separately rather than as one buffered body
+    assert len(chunks) >= 3
+
+
+def test_batch_reports_fetch_failure_per_chunk(monkeypatch):
+    store = FakeStore(failing={"BBB"})
+    _, lines = run_batch(monkeypatch, store, ["AAA", "BBB", "CCC", "DDD"])
+    results = {line["symbol"]: line for line in lines}
+    assert results["AAA"]["error"] == results["BBB"]["error"] == "upstream down"
+    assert "forecasts" in results["CCC"] and "forecasts" in results["DDD"]
+
+
+def test_batch_reports_forecast_failure_per_group(monkeypatch):
+    _, lines = run_batch(monkeypatch, FakeStore(), ["AAA", "BBB", "CCC"], fail_forecast={"CCC"})
+    results = {line["symbol"]: line for line in lines}
+    assert results["CCC"]["error"] == "model failed"
+    assert "forecasts" in results["AAA"] and "forecasts" in results["BBB"]
+
+
+def test_batch_rejects_bad_horizons():
+    with pytest.raises(predict.HTTPException):
+        asyncio.run(predict.predict_batch(predict.BatchPredictionRequest(symbols=["AAA"], horizons=[1])))
+
+
+def test_unexpected_failure_still_answers_every_symbol(monkeypatch):
+    _, lines = run_batch(monkeypatch, FakeStore(), ["AAA", "BBB", "CCC", "SHORT"], fail_engine={"BBB"})
+    results = {line["symbol"]: line for line in lines}
+    assert sorted(results) == ["AAA", "BBB", "CCC", "SHORT"] and len(lines) == 4
+    assert results["AAA"]["error"] == results["BBB"]["error"] == "model did not load"
+    assert "forecasts" in results["CCC"]
+    assert results["SHORT"]["error"].startswith("Not enough history")
+
+
+def test_batch_matches_single_symbol_route(monkeypatch):
+    _, lines = run_batch(monkeypatch, FakeStore(), ["AAA", "BBB"], horizons=(5, 30), fake_forecast=False)
+    monkeypatch.setattr(predict, "get_shared_history", lambda: FakeSharedHistory())
+    monkeypatch.setattr(predict, "io_pool", InlinePool())
+    monkeypatch.setattr(predict, "prediction_cache", ResultCache(path=""))
+
+    for line in lines:
+        for days in (5, 30):
+            single = asyncio.run(predict.run_prediction(predict.PredictionRequest(symbol=line["symbol"], days=days)))
+            expected = json.loads(single.body)
+            assert line["forecasts"][str(days)]["predictions"] == pytest.approx(expected["predictions"], rel=1e-12)
+            assert line["forecasts"][str(days)]["forecast_dates"] == expected["forecast_dates"]
+    # Per-symbol seeds: the same history gets the same noise only for the same symbol
+    assert lines[0]["forecasts"]["30"]["predictions"] != lines[1]["forecasts"]["30"]["predictions"]
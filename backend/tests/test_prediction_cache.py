@@ -0,0 +1,74 @@
+import asyncio
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.routes import predict
+from app.utils.indicators import compute_indicators
+from app.utils.result_cache import ResultCache
+
+
+def history(last_close=130.0, bars=300):
+    index = pd.bdate_range(end="2026-01-02", periods=bars, name="Date")
+    close = np.linspace(100, 130, bars)
+    close[-1] = last_close
+    frame = pd.DataFrame({"Close": close, "Volume": 1e6}, index=index)
+    for name, values in compute_indicators(close, predict.PREDICT_INDICATORS).items():
+        frame[name] = values
+    return frame
+
+
+class InlinePool:
+    async def run(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+
+class FakeSharedHistory:
+    def __init__(self):
+        self.last_close = 130.0
+
+    def get_history_ref(self, symbol, period="1y", interval="1d", columns=()):
+        frame = history(self.last_close)
+        return frame, frame  # The render step takes a frame as well as a reference
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    async def engine_for(symbol):
+        return None
+
+    shared = FakeSharedHistory()
+    monkeypatch.setattr(predict, "get_shared_history", lambda: shared)
+    monkeypatch.setattr(predict, "engine_for", engine_for)
+    monkeypatch.setattr(predict, "io_pool", InlinePool())
+    monkeypatch.setattr(predict, "cpu_pool", InlinePool())
+    monkeypatch.setattr(predict, "prediction_cache", ResultCache(path=""))
+    return shared
+
+
+def predict_once(symbol="AAPL"):
+    return asyncio.run(predict.run_prediction(predict.PredictionRequest(symbol=symbol, days=10)))
+
+
+def test_same_bar_is_served_from_cache(shared):
+    first, second = predict_once(), predict_once()
+    assert (first.cache_status, second.cache_status) == ("MISS", "HIT")
+    assert first.etag == second.etag and first.body == second.body
+
+
+def test_moving_session_bar_invalidates(shared):
+    first = predict_once()
+    shared.last_close = 131.5  # Same date, the close moved intraday
+    second = predict_once()
+    assert second.cache_status == "MISS"
+    assert second.etag != first.etag and second.body != first.body
+
+
+def test_activating_a_model_invalidates(shared, monkeypatch):
+    monkeypatch.setenv("MODEL_VERSION", "pinned")
+    monkeypatch.setattr(predict.model_registry, "current_version", lambda: "v1")
+    first = predict_once()
+    monkeypatch.setattr(predict.model_registry, "current_version", lambda: "v2")
+    second = predict_once()
+    assert second.cache_status == "MISS" and second.etag != first.etag
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from app.utils import metrics, profiler
+
+
+def test_metric_requires_samples():
+    class Incomplete(metrics.Metric):
+        kind = "gauge"
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "never registered")
+
+
+def test_profiled_request_records_profile(monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILER_ENABLED", True)
+    monkeypatch.setattr(profiler, "_profiles", profiler.OrderedDict())
+    sent = []
+
+    async def app(scope, receive, send):
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    async def send(message):
+        sent.append(message)
+
+    async def main():
+        scope = {"type": "http", "headers": [(b"x-profile", b"1")]}
+        await profiler.profile_request(app, scope, None, send)
+
+    asyncio.run(main())
+
+    headers = dict(sent[0]["headers"])
+    profile_id = headers[b"x-profile-id"].decode()
+    assert profiler.get_profile(profile_id) is not None
+    assert not profiler._active.locked()
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import registry
+from app.routes import models
+
+
+def make_version(root, name):
+    path = os.path.join(root, "versions", name)
+    os.makedirs(path)
+    open(os.path.join(path, registry.NUMPY_MODEL_FILE), "wb").close()
+    return path
+
+
+def current(root):
+    with open(os.path.join(root, "CURRENT")) as f:
+        return f.read().strip()
+
+
+def test_set_current_points_at_published_version(tmp_path):
+    make_version(tmp_path, "v1")
+    registry.set_current(str(tmp_path), "v1")
+    assert current(tmp_path) == "v1"
+
+
+@pytest.mark.parametrize("version", ["..", "../..", "../outside", "v1/../v1", ".hidden", "", "a/b"])
+def test_set_current_rejects_paths_outside_versions(tmp_path, version):
+    make_version(tmp_path, "v1")
+    os.makedirs(tmp_path / "versions" / ".hidden")
+    os.makedirs(tmp_path / "versions" / "a" / "b")
+    with pytest.raises(ValueError):
+        registry.set_current(str(tmp_path), version)
+    assert not os.path.exists(tmp_path / "CURRENT")
+
+
+def test_set_current_rejects_unpublished_version(tmp_path):
+    make_version(tmp_path, "v1")
+    with pytest.raises(ValueError):
+        registry.set_current(str(tmp_path), "v2")
+
+
+def test_admin_routes_refused_without_configured_token(monkeypatch):
+    monkeypatch.setattr(models, "MODEL_ADMIN_TOKEN", "")
+    with pytest.raises(HTTPException) as error:
+        models.require_admin(None)
+    assert error.value.status_code == 403
+    with pytest.raises(HTTPException):
+        models.require_admin("")
+
+
+def test_admin_routes_check_token(monkeypatch):
+    monkeypatch.setattr(models, "MODEL_ADMIN_TOKEN", "secret")
+    models.require_admin("secret")
+    for token in (None, "", "wrong"):
+        with pytest.raises(HTTPException) as error:
+            models.require_admin(token)
+        assert error.value.status_code == 403
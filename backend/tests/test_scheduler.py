@@ -0,0 +1,123 @@
+import asyncio
+
+from app.utils.scheduler import Scheduler
+
+
+def make_scheduler(symbols, delay=0.05):
+    runs = []
+
+    async def job(symbol):
+        runs.append(symbol)
+        await asyncio.sleep(delay)
+
+    return Scheduler(job, symbols, concurrency=2, jitter=0, timeout=5), runs
+
+
+def test_run_covers_requested_symbols():
+    scheduler, runs = make_scheduler(["aapl", "msft", "nvda"])
+
+    async def main():
+        await scheduler.trigger(["MSFT"])
+        await scheduler.trigger()
+
+    asyncio.run(main())
+    assert runs == ["MSFT", "AAPL", "MSFT", "NVDA"]
+    assert scheduler.last_run["symbols"] == 3 and scheduler.last_run["ok"] == 3
+    assert {status["state"] for status in scheduler.jobs.values()} == {"done"}
+
+
+def test_trigger_during_a_run_queues_the_missing_symbols():
+    scheduler, runs = make_scheduler(["AAPL", "MSFT", "NVDA", "TSLA"])
+
+    async def main():
+        first = scheduler.trigger(["AAPL"])
+        await asyncio.sleep(0.01)
+        joined = scheduler.trigger(["AAPL"])          # Covered by the run in progress
+        follow_up = scheduler.trigger(["AAPL", "MSFT"])
+        again = scheduler.trigger(["msft", "NVDA"])    # Joins the same follow-up
+        assert scheduler.queued == ["MSFT", "NVDA"]
+        assert scheduler.jobs["MSFT"]["state"] == "queued"
+        assert scheduler.stats()["queued"] == 2
+        await asyncio.gather(first, joined)
+        await asyncio.gather(follow_up, again)
+
+    asyncio.run(main())
+    assert runs == ["AAPL", "MSFT", "NVDA"]
+    assert scheduler.queued == [] and not scheduler.running
+    assert scheduler.last_run["symbols"] == 2 and scheduler.last_run["ok"] == 2
+
+
+def test_failed_job_does_not_stop_the_run():
+    async def job(symbol):
+        if symbol == "BAD":
+            raise RuntimeError("upstream down")
+
+    scheduler = Scheduler(job, ["BAD", "GOOD"], jitter=0)
+
+    async def main():
+        await scheduler.trigger()
+
+    asyncio.run(main())
+    assert scheduler.jobs["BAD"]["state"] == "failed" and "upstream down" in scheduler.jobs["BAD"]["error"]
+    assert scheduler.jobs["GOOD"]["state"] == "done"
+    assert (scheduler.last_run["ok"], scheduler.last_run["failed"]) == (1, 1)
+
+
+def test_stop_drops_the_queue():
+    scheduler, runs = make_scheduler(["AAPL", "MSFT"], delay=1)
+
+    async def main():
+        scheduler.trigger(["AAPL"])
+        scheduler.trigger(["MSFT"])
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    assert runs == ["AAPL"] and scheduler.queued == [] and not scheduler.running
+
+
+def test_follow_up_starts_before_any_new_trigger():
+    scheduler, runs = make_scheduler(["AAPL", "MSFT", "NVDA"], delay=0.02)
+
+    async def main():
+        first = scheduler.trigger(["AAPL"])
+        follow_up = scheduler.trigger(["MSFT"])
+        first_run = scheduler._run
+        await first
+        # The first run is over: its follow-up already took the scheduler's run slot
+        assert scheduler._run is not first_run and scheduler.running
+        joined = scheduler.trigger(["MSFT"])
+        queued = scheduler.trigger(["NVDA"])
+        await asyncio.gather(follow_up, joined, queued)
+
+    asyncio.run(main())
+    assert runs == ["AAPL", "MSFT", "NVDA"]
+
+
+def test_pending_follow_up_is_folded_into_a_new_run():
+    scheduler, runs = make_scheduler(["AAPL", "MSFT", "NVDA"], delay=0.02)
+
+    async def main():
+        # A run just finished with MSFT queued, and a trigger lands before its callback
+        scheduler.queued = ["MSFT"]
+        scheduler._follow_up = waiter = asyncio.get_running_loop().create_future()
+        await asyncio.gather(scheduler.trigger(["NVDA"]), waiter)
+
+    asyncio.run(main())
+    assert runs == ["MSFT", "NVDA"] and scheduler.last_run["symbols"] == 2
+    assert scheduler.queued == [] and scheduler._follow_up is None
+
+
+def test_only_one_worker_runs_the_schedule(tmp_path):
+    lock = str(tmp_path / "scheduler.lock")
+    leader, _ = make_scheduler(["AAPL"])
+    other, _ = make_scheduler(["AAPL"])
+    leader.lock_path = other.lock_path = lock
+    try:
+        assert leader._acquire() and leader.leader
+        assert not other._acquire() and not other.leader
+        leader._release()
+        assert other._acquire()
+    finally:
+        leader._release()
+        other._release()
@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.routes import predict, screener
+from app.utils import shared_store
+from app.utils.history_store import MARKET_TZ, HistoryStore, last_market_close, period_start
+from app.utils.indicator_state import IndicatorCache
+from app.utils.indicators import compute_indicators
+from app.utils.result_cache import ResultCache
+from app.utils.screener import FIELDS, PriceMatrix, load_universe, parse_condition, screen
+from app.utils.shared_store import SharedHistoryStore
+
+NAMES = {"close": None, "daily_return": "Daily_Return", "ma20": "MA20", "ma50": "MA50", "ma100": "MA100",
+         "ma200": "MA200", "bb_upper": "BB_upper", "bb_lower": "BB_lower", "rsi": "RSI", "volatility": "Volatility"}
+
+
+def long_frame(lengths, days=300, seed=0):
+    """(symbol, date, close) rows; each symbol's history ends on the last day and starts `length` days before"""
+    rng = np.random.default_rng(seed)
+    dates = [str(day.date()) for day in pd.bdate_range("2025-01-01", periods=days)]
+    rows, closes = [], {}
+    for symbol, length in lengths.items():
+        values = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, length)))
+        closes[symbol] = values
+        rows += [(symbol, date, close) for date, close in zip(dates[-length:], values)]
+    return pd.DataFrame(rows, columns=["symbol", "date", "close"]), closes
+
+
+def test_latest_indicators_match_per_symbol_engine():
+    frame, closes = long_frame({"AAA": 300, "BBB": 120, "CCC": 15})
+    matrix = PriceMatrix.from_closes(frame, 504)
+    assert list(matrix.symbols) == ["AAA", "BBB", "CCC"]
+    for row, symbol in enumerate(matrix.symbols):
+        expected = compute_indicators(closes[symbol].astype(np.float32).astype(np.float64))
+        for field in FIELDS:
+            want = closes[symbol][-1] if field == "close" else expected[NAMES[field]][-1]
+            np.testing.assert_allclose(matrix.fields[field][row], want, rtol=1e-4, equal_nan=True, err_msg=f"{symbol} {field}")
+
+
+def test_missing_days_carry_the_last_close():
+    frame, closes = long_frame({"AAA": 300, "BBB": 300})
+    frame = frame.drop(frame.index[-1])  # BBB has no bar for the last day
+    matrix = PriceMatrix.from_closes(frame, 504)
+    assert matrix.closes[1, -1] == np.float32(closes["BBB"][-2])
+    assert matrix.last_bars[1] == matrix.dates[-2]
+
+
+def test_screen_filters_sorts_and_limits():
+    fields = {"rsi": np.array([25.0, 40.0, 10.0, np.nan, 29.0]), "close": np.array([5.0, 4.0, 3.0, 2.0, 1.0]),
+              "ma20": np.array([6.0, 3.0, 4.0, 1.0, 0.5])}
+    conditions = [parse_condition("rsi<30", fields), parse_condition("close < ma20", fields)]
+    picked, matched = screen(fields, conditions)
+    assert picked.tolist() == [0, 2] and matched == 2
+
+    picked, matched = screen(fields, [], sort="-rsi", limit=3)
+    assert picked.tolist() == [1, 4, 0] and matched == 5
+    picked, _ = screen(fields, [], sort="rsi", limit=5)
+    assert picked.tolist() == [2, 0, 4, 1, 3]  # NaN last
+
+    picked, matched = screen(fields, [], rows=np.array([1, 3]))
+    assert picked.tolist() == [1, 3] and matched == 2
+
+
+@pytest.mark.parametrize("text", ["rsi", "rsi=30", "price<30", "rsi<abc"])
+def test_bad_conditions_are_rejected(text):
+    with pytest.raises(ValueError):
+        parse_condition(text, FIELDS)
+
+
+class InlinePool:
+    async def run(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+
+class WalkFetcher:
+    def fetch(self, symbol, period=None, start=None, interval="1d"):
+        index = pd.bdate_range(end=last_market_close().date(), periods=500, tz=MARKET_TZ, name="Date")
+        rng = np.random.default_rng(sum(map(ord, symbol)))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(index))))
+        frame = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1e6}, index=index)
+        return frame if start is None else frame[frame.index.date >= pd.Timestamp(start).date()]
+
+
+def test_forecast_fields_match_the_prediction_route(tmp_path, monkeypatch):
+    store = HistoryStore(path=str(tmp_path / "history.db"), fetcher=WalkFetcher())
+    shared = SharedHistoryStore(directory=str(tmp_path / "shared"), store=store)
+
+    async def engine_for(symbol):
+        return None
+
+    monkeypatch.setattr(shared_store, "get_indicator_cache", lambda: IndicatorCache(store))
+    monkeypatch.setattr(predict, "get_shared_history", lambda: shared)
+    monkeypatch.setattr(predict, "engine_for", engine_for)
+    monkeypatch.setattr(predict, "io_pool", InlinePool())
+    monkeypatch.setattr(predict, "cpu_pool", InlinePool())
+    monkeypatch.setattr(predict, "prediction_cache", ResultCache(path=""))
+
+    symbols = ["AAA", "BBB", "CCC"]
+    for symbol in symbols:
+        store.refresh(symbol, predict.HISTORY_PERIOD)
+    matrix, closes = load_universe(store, period_start(predict.HISTORY_PERIOD).isoformat())
+    asyncio.run(screener.add_forecasts(matrix, closes))
+
+    for row, symbol in enumerate(matrix.symbols):
+        request = predict.PredictionRequest(symbol=symbol, days=screener.SCREENER_FORECAST_DAYS)
+        metrics = json.loads(asyncio.run(predict.run_prediction(request)).body)["metrics"]
+        assert matrix.fields["predicted_price"][row] == pytest.approx(metrics["predicted_price"], rel=1e-12)
+        assert matrix.fields["forecast_change_percent"][row] == pytest.approx(metrics["change_percent"], rel=1e-9)
@@ -0,0 +1,46 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils import serialization
+from app.utils.serialization import dumps, frame_payload
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+def frame():
+    index = pd.DatetimeIndex(pd.to_datetime(["2026-01-02", "2026-01-05", "2026-01-06"]), name="Date")
+    return pd.DataFrame(
+        {"Close": [100.5, np.nan, 102.25], "Volume": [1e6, np.nan, 3e6], "MA20": [np.nan, np.nan, 101.0]},
+        index=index,
+    )
+
+
+def test_records_match_the_row_by_row_format(encoder):
+    payload = frame_payload(frame(), "records", {"Close": "close", "Volume": "volume", "MA20": "ma20"}, "date")
+    assert json.loads(dumps(payload)) == [
+        {"date": "2026-01-02T00:00:00", "close": 100.5, "volume": 1000000, "ma20": None},
+        {"date": "2026-01-05T00:00:00", "close": None, "volume": 0, "ma20": None},
+        {"date": "2026-01-06T00:00:00", "close": 102.25, "volume": 3000000, "ma20": 101.0},
+    ]
+
+
+def test_columnar_holds_the_same_values(encoder):
+    records = json.loads(dumps(frame_payload(frame(), "records", index_field="date")))
+    columns = json.loads(dumps(frame_payload(frame(), "columnar", index_field="date")))
+    assert list(columns) == ["date", "Close", "Volume", "MA20"]
+    assert [dict(zip(columns, row)) for row in zip(*columns.values())] == records
+
+
+def test_non_finite_scalars_become_null(encoder):
+    content = {"price": np.float64(1.5), "change": float("nan"), "values": np.array([1.0, np.nan])}
+    assert json.loads(dumps(content)) == {"price": 1.5, "change": None, "values": [1.0, None]}
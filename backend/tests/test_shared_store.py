@@ -0,0 +1,61 @@
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils import shared_store
+from app.utils.history_store import MARKET_TZ, HistoryStore, last_market_close
+from app.utils.indicator_state import IndicatorCache
+from app.utils.shared_store import SharedHistoryStore, SnapshotChanged
+
+COLUMNS = ("MA20", "RSI")
+
+
+class FakeFetcher:
+    def __init__(self, bars=300):
+        self.bars = bars
+
+    def fetch(self, symbol, period=None, start=None, interval="1d"):
+        index = pd.bdate_range(end=last_market_close().date(), periods=self.bars, tz=MARKET_TZ, name="Date")
+        close = np.linspace(100, 200, self.bars)
+        frame = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1e6}, index=index)
+        return frame if start is None else frame[frame.index.date >= pd.Timestamp(start).date()]
+
+
+@pytest.fixture
+def shared(tmp_path, monkeypatch):
+    store = HistoryStore(path=str(tmp_path / "history.db"), fetcher=FakeFetcher())
+    monkeypatch.setattr(shared_store, "get_indicator_cache", lambda: IndicatorCache(store))
+    return SharedHistoryStore(directory=str(tmp_path / "shared"), store=store)
+
+
+def test_ref_resolves_to_the_same_frame(shared):
+    frame, ref = shared.get_history_ref("aapl", "1y", "1d", COLUMNS)
+    pd.testing.assert_frame_equal(frame, shared.get_history("AAPL", "1y", "1d", COLUMNS))
+
+    # Only the reference crosses a process boundary: path, signature, slice
+    restored = pickle.loads(pickle.dumps(ref))
+    assert len(pickle.dumps(ref)) < 1000
+    pd.testing.assert_frame_equal(restored.frame(), frame)
+
+
+def test_worker_process_maps_the_file(shared):
+    frame, ref = shared.get_history_ref("AAPL", "1y", "1d", COLUMNS)
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pd.testing.assert_frame_equal(pool.submit(ref.frame).result(), frame)
+
+
+def test_replaced_snapshot_is_reported(shared):
+    _, ref = shared.get_history_ref("AAPL", "1y", "1d", COLUMNS)
+    shared.publish("AAPL", "1d")
+    with pytest.raises(SnapshotChanged):
+        ref.frame()
+
+
+def test_no_bars_gives_no_ref(shared):
+    shared.store.fetcher = FakeFetcher(bars=0)
+    frame, ref = shared.get_history_ref("NOPE", "1y", "1d", COLUMNS)
+    assert frame.empty and ref is None
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from app.utils.singleflight import SingleFlight
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    executions = []
+
+    async def compute():
+        executions.append(1)
+        await asyncio.sleep(0.01)
+        return {"price": 1.0}
+
+    async def main():
+        return await asyncio.gather(*[flight.do(("stock", "AAPL"), compute) for _ in range(5)])
+
+    results = run(main())
+    assert len(executions) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"in_flight": 0, "routes": {"stock": {"calls": 5, "executions": 1, "coalesced": 4}}}
+
+
+def test_distinct_keys_run_separately():
+    flight = SingleFlight()
+    executions = []
+
+    async def compute(symbol):
+        executions.append(symbol)
+        await asyncio.sleep(0.01)
+        return symbol
+
+    async def main():
+        return await asyncio.gather(
+            flight.do(("stock", "AAPL"), lambda: compute("AAPL")),
+            flight.do(("stock", "MSFT"), lambda: compute("MSFT")),
+        )
+
+    assert run(main()) == ["AAPL", "MSFT"]
+    assert sorted(executions) == ["AAPL", "MSFT"]
+
+
+def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+    executions = []
+
+    async def compute():
+        executions.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*[flight.do(("predict", "AAPL"), compute) for _ in range(3)], return_exceptions=True)
+
+    errors = run(main())
+    assert len(executions) == 1
+    assert all(isinstance(error, ValueError) and str(error) == "upstream down" for error in errors)
+
+
+def test_key_is_cleared_after_a_failure():
+    flight = SingleFlight()
+    attempts = []
+
+    async def compute():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ValueError("upstream down")
+        return "ok"
+
+    async def main():
+        with pytest.raises(ValueError):
+            await flight.do(("stock", "AAPL"), compute)
+        assert flight.stats()["in_flight"] == 0
+        return await flight.do(("stock", "AAPL"), compute)
+
+    assert run(main()) == "ok"
+    assert len(attempts) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do(("stock", "AAPL"), compute))
+        second = asyncio.ensure_future(flight.do(("stock", "AAPL"), compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert run(main()) == "done"
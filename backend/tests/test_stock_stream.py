@@ -0,0 +1,51 @@
+import asyncio
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.routes import stock
+from app.utils.history_store import MARKET_TZ, HistoryStore, last_market_close
+from app.utils.indicators import compute_indicators
+
+
+class WalkFetcher:
+    def fetch(self, symbol, period=None, start=None, interval="1d"):
+        index = pd.bdate_range(end=last_market_close().date(), periods=400, tz=MARKET_TZ, name="Date")
+        close = 100 * np.exp(np.cumsum(np.random.default_rng(1).normal(0, 0.02, len(index))))
+        frame = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1e6}, index=index)
+        return frame if start is None else frame[frame.index.date >= pd.Timestamp(start).date()]
+
+
+class PicklingPool:
+    """Runs inline, but only with arguments and results a worker process could receive"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def run(self, fn, *args, **kwargs):
+        self.calls += 1
+        fn, args, kwargs = pickle.loads(pickle.dumps((fn, args, kwargs)))
+        return pickle.loads(pickle.dumps(fn(*args, **kwargs)))
+
+
+def test_chunks_match_the_whole_series(tmp_path, monkeypatch):
+    store = HistoryStore(path=str(tmp_path / "history.db"), fetcher=WalkFetcher())
+    pool = PicklingPool()
+    monkeypatch.setattr(stock, "get_history_store", lambda: store)
+    monkeypatch.setattr(stock, "cpu_pool", pool)
+
+    async def collect():
+        response = await stock.stream_stock_data("TEST", period="2y", fmt="ndjson", chunk_size=64)
+        return [json.loads(line) for chunk in [chunk async for chunk in response.body_iterator]
+                for line in chunk.splitlines()]
+
+    rows = asyncio.run(collect())
+    closes = store.read("TEST", start="").loc[:, "Close"].to_numpy()
+    expected = compute_indicators(closes, stock.STOCK_INDICATORS)
+    assert len(rows) == len(closes) and pool.calls == -(-len(closes) // 64)
+    for name in stock.STOCK_INDICATORS:
+        actual = np.array([np.nan if row[name] is None else row[name] for row in rows])
+        np.testing.assert_allclose(actual, expected[name], rtol=1e-9, equal_nan=True, err_msg=name)
@@ -0,0 +1,285 @@
+"""
+Walk-forward (rolling-origin) backtesting of the forecasters
+
+Every trading day of a symbol's history (every --step days) is used as a
+forecast origin: the forecaster sees only the bars before it, predicts the
+next --horizon closes, and is scored against what actually happened. All
+origins of a symbol are forecast together as one [origins, window] batch,
+and symbols are spread over a process pool. Histories come from the
+backend's local history store, so a sweep never waits on Yahoo Finance
+(--refresh downloads missing or stale ones first, in bulk).
+
+Forecasters:
+    naive   last close carried forward (the baseline to beat)
+    simple  the API's moving-average fallback (backend/app/models/forecast.py)
+    lstm    a trained model, through the API's inference engine (--model-path)
+
+Reports RMSE, MAE (as a percentage of the origin price, so symbols pool
+together) and directional accuracy per horizon day, plus per-symbol price
+errors in the JSON output.
+
+Usage:
+    python backtest.py --universe sp500.txt --period 5y --horizon 60 --workers 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from dataset import backend_module, get_history_store, load_universe, write_json
+
+HORIZON = 60
+REPORT_HORIZONS = (1, 5, 10, 20, 30, 60)
+WINDOW = 60               # Bars each forecast sees (the API's window and SEQUENCE_LENGTH)
+SCALE_LOOKBACK = 504      # Bars the API min-max scales over (its 2y history)
+SYMBOLS_PER_TASK = 8      # Symbols per process pool task
+SEED = 0
+
+_engine = None  # Inference engine of this worker process, for the lstm forecaster
+
+def load_closes(symbol, period):
+    """Close prices of `symbol` from the local history store (no network)"""
+    store = get_history_store()
+    if store is None:
+        raise RuntimeError("The backend history store is not importable")
+    module = backend_module('app.utils.history_store')
+    start = module.period_start(period)
+    frame = store.read(symbol, start=start.isoformat() if start is not None else '')
+    return frame['Close'].to_numpy(dtype=np.float64)
+
+def walk_forward(closes, horizon=HORIZON, step=1, window=WINDOW, scale_lookback=SCALE_LOOKBACK):
+    """
+    Every origin's inputs and outcomes as stacked arrays
+
+    Origin t forecasts closes[t:t + horizon] from closes[:t]. Its scaling
+    range is the min/max of the `scale_lookback` bars before t, as the API
+    scales the history it fetched; nothing at or after t leaks in.
+
+    Returns:
+        dict of windows [origins, window] (scaled), lows and spans [origins]
+        to undo the scaling, last [origins] (the close before each origin)
+        and actual [origins, horizon]
+    """
+    first = max(window, 1)
+    origins = np.arange(first, len(closes) - horizon + 1, step)
+    if len(origins) == 0:
+        return None
+
+    # Rolling range up to (excluding) each origin
+    history = pd.Series(closes)
+    lows = history.rolling(scale_lookback, min_periods=1).min().to_numpy()[origins - 1]
+    highs = history.rolling(scale_lookback, min_periods=1).max().to_numpy()[origins - 1]
+    spans = highs - lows
+    spans[spans == 0] = 1.0
+
+    # Views over the one series; only the selected rows are materialized
+    windows = sliding_window_view(closes, window)[origins - window]
+    actual = sliding_window_view(closes, horizon)[origins]
+    return {
+        'origins': origins,
+        'windows': (windows - lows[:, None]) / spans[:, None],
+        'lows': lows,
+        'spans': spans,
+        'last': closes[origins - 1],
+        'actual': np.array(actual),
+    }
+
+def forecast_naive(batch, horizon):
+    return np.repeat(batch['last'][:, None], horizon, axis=1)
+
+def forecast_simple(batch, horizon):
+    forecast = backend_module('app.models.forecast')
+    scaled = forecast.simple_prediction_batch(batch['windows'], horizon, SEED)
+    return scaled * batch['spans'][:, None] + batch['lows'][:, None]
+
+def forecast_lstm(batch, horizon):
+    if _engine is None or not _engine.ready:
+        raise RuntimeError("No LSTM model loaded (see --model-path)")
+    windows = batch['windows'][:, -_engine.sequence_length:].astype(np.float32)
+    scaled = np.stack(_engine.predict_batch(list(windows), [horizon] * len(windows)))
+    return scaled * batch['spans'][:, None] + batch['lows'][:, None]
+
+# Name -> function(batch, horizon) returning predicted prices [origins, horizon]
+FORECASTERS = {
+    'naive': forecast_naive,
+    'simple': forecast_simple,
+    'lstm': forecast_lstm,
+}
+
+def score(predictions, batch):
+    """Per-horizon-day error sums for one symbol (summed so symbols can be pooled)"""
+    actual, last = batch['actual'], batch['last'][:, None]
+    errors = predictions - actual
+    pct_errors = errors / last * 100
+    # Direction is only scored where the forecast calls a move (never for naive)
+    moves = predictions != last
+    hits = (np.sign(predictions - last) == np.sign(actual - last)) & moves
+    return {
+        'count': len(actual),
+        'moves': np.sum(moves, axis=0),
+        'sq_pct': np.sum(pct_errors ** 2, axis=0),
+        'abs_pct': np.sum(np.abs(pct_errors), axis=0),
+        'sq': np.sum(errors ** 2, axis=0),
+        'abs': np.sum(np.abs(errors), axis=0),
+        'hits': np.sum(hits, axis=0),
+    }
+
+def _init_backtest_worker(model_path):
+    global _engine
+    if model_path:
+        inference = backend_module('app.models.inference')
+        _engine = inference.InferenceEngine(model_path)
+        _engine.load()
+
+def backtest_symbols(symbols, forecasters, horizon, step, period):
+    """Backtest a few symbols (runs in a worker process); returns {symbol: {forecaster: sums} or error}"""
+    results = {}
+    for symbol in symbols:
+        try:
+            batch = walk_forward(load_closes(symbol, period), horizon, step)
+            if batch is None:
+                results[symbol] = {'error': 'Not enough history'}
+                continue
+            results[symbol] = {
+                name: score(FORECASTERS[name](batch, horizon), batch) for name in forecasters
+            }
+        except Exception as e:
+            results[symbol] = {'error': str(e)}
+    return results
+
+def directional_accuracy(sums, day):
+    moves = sums['moves'][day - 1]
+    return float(sums['hits'][day - 1] / moves) if moves else None
+
+def summarize(sums, horizons):
+    """Metrics per reported horizon day from pooled error sums"""
+    count = sums['count']
+    return {
+        str(day): {
+            'rmse_pct': float(np.sqrt(sums['sq_pct'][day - 1] / count)),
+            'mae_pct': float(sums['abs_pct'][day - 1] / count),
+            'directional_accuracy': directional_accuracy(sums, day),
+            'forecasts': int(count),
+        }
+        for day in horizons
+    }
+
+def symbol_summary(sums, horizons):
+    """Per-symbol metrics in price units"""
+    count = sums['count']
+    return {
+        str(day): {
+            'rmse': float(np.sqrt(sums['sq'][day - 1] / count)),
+            'mae': float(sums['abs'][day - 1] / count),
+            'directional_accuracy': directional_accuracy(sums, day),
+        }
+        for day in horizons
+    }
+
+def run_backtest(symbols, forecasters=('naive', 'simple'), horizon=HORIZON, step=1, period='5y',
+                 workers=None, model_path=None, report_horizons=REPORT_HORIZONS):
+    """Backtest every symbol with every forecaster; returns the report dict"""
+    workers = workers or os.cpu_count() or 1
+    report_horizons = sorted({day for day in report_horizons if 1 <= day <= horizon} | {horizon})
+    tasks = [symbols[i:i + SYMBOLS_PER_TASK] for i in range(0, len(symbols), SYMBOLS_PER_TASK)]
+
+    per_symbol, errors = {}, {}
+    pooled = {name: None for name in forecasters}
+    started = time.time()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_backtest_worker,
+        initargs=(model_path if 'lstm' in forecasters else None,),
+    ) as executor:
+        futures = [executor.submit(backtest_symbols, task, forecasters, horizon, step, period) for task in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            for symbol, result in future.result().items():
+                if 'error' in result:
+                    errors[symbol] = result['error']
+                    continue
+                per_symbol[symbol] = {name: symbol_summary(sums, report_horizons) for name, sums in result.items()}
+                for name, sums in result.items():
+                    if pooled[name] is None:
+                        pooled[name] = {key: np.zeros_like(value) if key != 'count' else 0 for key, value in sums.items()}
+                    for key, value in sums.items():
+                        pooled[name][key] = pooled[name][key] + value
+            print(f"\r{done}/{len(tasks)} tasks, {len(per_symbol)} symbols scored", end='', flush=True)
+    print()
+
+    return {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'period': period,
+            'horizon': horizon,
+            'step': step,
+            'window': WINDOW,
+            'model_path': model_path if 'lstm' in forecasters else None,
+            'symbols': len(per_symbol),
+            'seconds': round(time.time() - started, 2),
+        },
+        'summary': {name: summarize(sums, report_horizons) for name, sums in pooled.items() if sums is not None},
+        'symbols': per_symbol,
+        'errors': errors,
+    }
+
+def refresh_histories(symbols, period):
+    """Download missing or stale histories into the local store, in bulk"""
+    store = get_history_store()
+    for i in range(0, len(symbols), 50):
+        store.get_histories(symbols[i:i + 50], period)
+
+def print_report(report):
+    print(f"\n{report['meta']['symbols']} symbols, {report['meta']['period']}, "
+          f"step {report['meta']['step']}, {report['meta']['seconds']}s")
+    print(f"{'forecaster':<10} {'day':>4} {'RMSE %':>8} {'MAE %':>8} {'direction':>10} {'forecasts':>10}")
+    for name, horizons in report['summary'].items():
+        for day, metrics in horizons.items():
+            direction = metrics['directional_accuracy']
+            direction = f"{direction:.1%}" if direction is not None else '-'
+            print(f"{name:<10} {day:>4} {metrics['rmse_pct']:>8.2f} {metrics['mae_pct']:>8.2f} "
+                  f"{direction:>10} {metrics['forecasts']:>10}")
+    if report['errors']:
+        print(f"{len(report['errors'])} symbols skipped (see 'errors' in the output)")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the forecasters")
+    parser.add_argument('--symbols', nargs='+', help="Symbols to backtest")
+    parser.add_argument('--universe', help="File with one symbol per line")
+    parser.add_argument('--period', default='5y', help="History period per symbol (default: %(default)s)")
+    parser.add_argument('--horizon', type=int, default=HORIZON, help="Days forecast from each origin")
+    parser.add_argument('--step', type=int, default=1, help="Trading days between origins")
+    parser.add_argument('--forecasters', nargs='+', choices=list(FORECASTERS), default=['naive', 'simple'])
+    parser.add_argument('--model-path', default='saved_models/lstm_model.h5', help="Model for the lstm forecaster")
+    parser.add_argument('--report-horizons', nargs='+', type=int, default=list(REPORT_HORIZONS))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--refresh', action='store_true', help="Download missing or stale histories first")
+    parser.add_argument('--output', default='backtest_results.json')
+    args = parser.parse_args(argv)
+    if not (args.symbols or args.universe):
+        parser.error("--symbols or --universe is required")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    symbols = load_universe(args.universe) if args.universe else list(dict.fromkeys(s.upper() for s in args.symbols))
+    if args.refresh:
+        refresh_histories(symbols, args.period)
+
+    report = run_backtest(
+        symbols, args.forecasters, args.horizon, args.step, args.period,
+        args.workers, os.path.abspath(args.model_path), args.report_horizons,
+    )
+    write_json(args.output, report)
+    print_report(report)
+    print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
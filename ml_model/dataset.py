@@ -0,0 +1,168 @@
+"""
+Symbol-sharded training dataset on disk
+
+Histories for a universe of symbols are fetched in parallel (through the
+backend's shared history cache when it is importable) and written as one
+min-max scaled float32 .npy per symbol, spread over shard directories so no
+single directory holds thousands of files. manifest.json records every
+finished symbol together with its scaling range, and is rewritten after each
+fetched chunk, so an interrupted build resumes where it stopped.
+"""
+
+import importlib
+import json
+import os
+import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import numpy as np
+import yfinance as yf
+from sklearn.preprocessing import MinMaxScaler
+
+DATASET_DIR = 'data/dataset'
+MANIFEST_NAME = 'manifest.json'
+NUM_SHARDS = 64
+FETCH_CHUNK = 50   # Symbols per bulk download
+MIN_ROWS = 250     # Shorter histories are skipped (too few training windows)
+
+def backend_module(name):
+    """
+    Import a module of the backend (e.g. the shared history store) so training
+    uses the same cache and registry as the API. Works both from the repo
+    checkout (../backend) and inside the backend container, where ml_model is
+    mounted under /app. Returns None when the backend isn't available.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    for candidate in (os.path.join(here, '..', 'backend'), os.path.join(here, '..')):
+        candidate = os.path.abspath(candidate)
+        if os.path.isdir(os.path.join(candidate, 'app', 'utils')):
+            if candidate not in sys.path:
+                sys.path.insert(0, candidate)
+            break
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+def get_history_store():
+    """Shared history store, or None when the backend isn't importable"""
+    module = backend_module('app.utils.history_store')
+    return module.get_history_store() if module is not None else None
+
+def scale_series(df):
+    """Min-max scale the close prices into a flat float32 array"""
+    data = df['Close'].values.reshape(-1, 1)
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    scaled = scaler.fit_transform(data).astype(np.float32).ravel()
+    return scaled, scaler
+
+def save_series(symbol, df, series_dir):
+    """Scale a symbol's close prices and store them as a .npy for memory mapping"""
+    os.makedirs(series_dir, exist_ok=True)
+    scaled, scaler = scale_series(df)
+    path = os.path.join(series_dir, f"{symbol.upper()}.npy")
+    np.save(path, scaled)
+    return path, scaler
+
+def scaler_from_range(low, high):
+    """Rebuild the MinMaxScaler recorded in the manifest for a symbol"""
+    return MinMaxScaler(feature_range=(0, 1)).fit(np.array([[low], [high]]))
+
+def load_universe(path):
+    """Read a universe file: one symbol per line, blank lines and # comments ignored"""
+    symbols = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                symbols.append(line.split()[0].upper())
+    return list(dict.fromkeys(symbols))
+
+def shard_for(symbol, num_shards=NUM_SHARDS):
+    """Stable shard directory name for a symbol"""
+    return f"shard-{zlib.crc32(symbol.upper().encode()) % num_shards:03d}"
+
+def write_json(path, data):
+    """Write JSON atomically, so a crash never leaves a truncated file behind"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path) as f:
+        return json.load(f)
+
+def read_manifest(dataset_dir=DATASET_DIR):
+    return read_json(
+        os.path.join(dataset_dir, MANIFEST_NAME),
+        {'period': None, 'created': None, 'symbols': {}, 'failed': {}},
+    )
+
+def fetch_histories(symbols, period):
+    """Fetch one chunk of symbols, in bulk through the history store when possible"""
+    store = get_history_store()
+    if store is not None:
+        return store.get_histories(symbols, period)
+    return {symbol: yf.Ticker(symbol).history(period=period) for symbol in symbols}
+
+def build_dataset(symbols, dataset_dir=DATASET_DIR, period='5y', workers=8, resume=True):
+    """
+    Fetch and write every symbol of the universe that isn't in the manifest yet
+
+    Chunks of FETCH_CHUNK symbols are fetched concurrently by `workers`
+    threads (the work is network-bound); each finished chunk is written and
+    recorded before the next one is picked up.
+
+    Returns:
+        The manifest: {'symbols': {symbol: entry}, 'failed': {symbol: reason}, ...}
+    """
+    os.makedirs(dataset_dir, exist_ok=True)
+    manifest_path = os.path.join(dataset_dir, MANIFEST_NAME)
+    manifest = read_manifest(dataset_dir) if resume else {'symbols': {}, 'failed': {}}
+    if manifest.get('period') not in (None, period):
+        print(f"Dataset was built for period {manifest['period']}, rebuilding for {period}")
+        manifest = {'symbols': {}, 'failed': {}}
+    manifest['period'] = period
+    manifest['created'] = manifest.get('created') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    todo = [symbol for symbol in symbols if symbol not in manifest['symbols']]
+    print(f"Dataset: {len(symbols) - len(todo)} symbols already stored, {len(todo)} to fetch")
+    chunks = [todo[i:i + FETCH_CHUNK] for i in range(0, len(todo), FETCH_CHUNK)]
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(fetch_histories, chunk, period): chunk for chunk in chunks}
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                frames = future.result()
+            except Exception as e:
+                for symbol in chunk:
+                    manifest['failed'][symbol] = str(e)
+                write_json(manifest_path, manifest)
+                continue
+
+            for symbol in chunk:
+                df = frames.get(symbol)
+                if df is None or len(df) < MIN_ROWS:
+                    manifest['failed'][symbol] = f"only {0 if df is None else len(df)} rows"
+                    continue
+                shard = shard_for(symbol)
+                _, scaler = save_series(symbol, df, os.path.join(dataset_dir, shard))
+                manifest['failed'].pop(symbol, None)
+                manifest['symbols'][symbol] = {
+                    'path': os.path.join(shard, f"{symbol}.npy"),
+                    'rows': len(df),
+                    'first_date': str(df.index[0])[:10],
+                    'last_date': str(df.index[-1])[:10],
+                    'min': float(scaler.data_min_[0]),
+                    'max': float(scaler.data_max_[0]),
+                }
+            write_json(manifest_path, manifest)
+            print(f"Dataset: {len(manifest['symbols'])} stored, {len(manifest['failed'])} failed")
+
+    return manifest
@@ -0,0 +1,83 @@
+"""
+Export trained Keras models for TensorFlow-free inference
+
+Writes the weights of a Sequential LSTM model to an .npz next to the .h5,
+with a JSON layer spec under the '__spec__' key. The backend runs these with
+a pure-NumPy forward pass (backend/app/models/numpy_lstm.py).
+
+Convert existing models:
+    python export_model.py saved_models/lstm_model.h5 [more.h5 ...]
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+SPEC_KEY = '__spec__'
+FORMAT_VERSION = 1
+
+def layer_spec(layer):
+    """(spec, weights) for one Keras layer, or None for layers that are no-ops at inference"""
+    kind = layer.__class__.__name__
+    config = layer.get_config()
+
+    if kind == 'TimeDistributed':
+        # A Dense layer applied per time step is just a Dense on the last axis
+        return layer_spec(layer.layer)
+    if kind in ('Dropout', 'InputLayer'):
+        return None
+    if kind == 'LSTM':
+        if config.get('go_backwards') or config.get('stateful'):
+            raise ValueError(f"Unsupported LSTM configuration in {layer.name}")
+        names = ['kernel', 'recurrent_kernel', 'bias'] if config.get('use_bias', True) else ['kernel', 'recurrent_kernel']
+        spec = {
+            'type': 'lstm',
+            'units': config['units'],
+            'return_sequences': config['return_sequences'],
+            'activation': config['activation'],
+            'recurrent_activation': config['recurrent_activation'],
+        }
+        return spec, names, layer.get_weights()
+    if kind == 'Dense':
+        names = ['kernel', 'bias'] if config.get('use_bias', True) else ['kernel']
+        return {'type': 'dense', 'activation': config['activation']}, names, layer.get_weights()
+    if kind == 'RepeatVector':
+        return {'type': 'repeat', 'n': config['n']}, [], []
+    if kind == 'Reshape':
+        return {'type': 'reshape', 'target_shape': list(config['target_shape'])}, [], []
+    raise ValueError(f"Unsupported layer for NumPy export: {kind}")
+
+def export_numpy(model, path):
+    """Write `model` as an .npz weight file plus layer spec; returns the path"""
+    layers, arrays = [], {}
+    for layer in model.layers:
+        exported = layer_spec(layer)
+        if exported is None:
+            continue
+        spec, names, weights = exported
+        index = len(layers)
+        spec['weights'] = names
+        for name, weight in zip(names, weights):
+            arrays[f"{index}/{name}"] = np.asarray(weight, dtype=np.float32)
+        layers.append(spec)
+
+    spec = {
+        'format_version': FORMAT_VERSION,
+        'input_shape': [int(d) for d in model.input_shape[1:]],
+        'layers': layers,
+    }
+    np.savez(path, **{SPEC_KEY: np.array(json.dumps(spec))}, **arrays)
+    return path if path.endswith('.npz') else f"{path}.npz"
+
+def export_file(model_path):
+    """Export an .h5 model file to the .npz next to it"""
+    from tensorflow import keras
+
+    model = keras.models.load_model(model_path, compile=False)
+    return export_numpy(model, os.path.splitext(model_path)[0] + '.npz')
+
+if __name__ == "__main__":
+    for model_path in sys.argv[1:] or ['saved_models/lstm_model.h5']:
+        print(f"Exported {export_file(model_path)}")
@@ -3,6 +3,7 @@ LSTM Model Training Script for Stock Price Prediction
 """
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 import yfinance as yf
 from sklearn.preprocessing import MinMaxScaler
@@ -10,74 +11,253 @@ from sklearn.model_selection import train_test_split
 import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense, Dropout
-from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
+from tensorflow.keras.layers import LSTM, Dense, Dropout, RepeatVector, Reshape, TimeDistributed
+from tensorflow.keras.callbacks import BackupAndRestore, EarlyStopping, ModelCheckpoint
 import matplotlib.pyplot as plt
+import argparse
+import json
+import multiprocessing
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
+from dataset import (
+    DATASET_DIR, backend_module, build_dataset, get_history_store, load_universe, read_json,
+    scale_series, scaler_from_range, write_json,
+)
+from export_model import export_numpy
+
 # Configuration
 SYMBOL = 'AAPL'  # Training on Apple stock
 PERIOD = '5y'    # 5 years of data
 SEQUENCE_LENGTH = 60  # Use 60 days to predict next day
+FORECAST_MODE = 'direct'  # 'direct': one forward pass emits every horizon day; 'recursive': next day only
+HORIZON = 60              # Days emitted per forward pass in direct mode (API accepts 5-60)
+ARCHITECTURE = 'dense'    # Direct-mode head: 'dense' (multi-output) or 'seq2seq' (encoder-decoder)
 EPOCHS = 50
 BATCH_SIZE = 32
+FAST_BATCH_SIZE = 256       # --fast default; the learning rate is scaled up from BATCH_SIZE's
+BASE_LEARNING_RATE = 0.001  # Adam's default, right for BATCH_SIZE
 TRAIN_TEST_SPLIT = 0.8
+SHUFFLE_CHUNKS = 256        # Batches-worth of windows shuffled together in the tf.data pipeline
 
 def fetch_data(symbol=SYMBOL, period=PERIOD):
-    """Fetch stock data from Yahoo Finance"""
+    """Fetch stock data through the shared history cache (Yahoo Finance on a miss)"""
     print(f"Fetching data for {symbol}...")
-    stock = yf.Ticker(symbol)
-    df = stock.history(period=period)
+    store = get_history_store()
+    if store is not None:
+        df = store.get_history(symbol, period)
+    else:
+        stock = yf.Ticker(symbol)
+        df = stock.history(period=period)
     print(f"Fetched {len(df)} data points")
     return df
 
-def prepare_data(df, sequence_length=SEQUENCE_LENGTH):
-    """Prepare data for LSTM training"""
+def make_windows(series, sequence_length=SEQUENCE_LENGTH, horizon=1):
+    """
+    Strided (zero-copy) training windows over a 1-D series
+    
+    X[k] is series[k:k+sequence_length] and y[k] the following `horizon`
+    values (a scalar when horizon == 1). Both are read-only views into
+    `series`, which may itself be a memory-mapped array.
+    """
+    count = len(series) - sequence_length - horizon + 1
+    if count <= 0:
+        empty = np.empty((0, sequence_length, 1), dtype=series.dtype)
+        return empty, np.empty((0,) if horizon == 1 else (0, horizon), dtype=series.dtype)
+    
+    # [samples, time steps, features] for the LSTM
+    X = sliding_window_view(series, sequence_length)[:count, :, None]
+    if horizon == 1:
+        y = series[sequence_length:sequence_length + count]
+    else:
+        y = sliding_window_view(series[sequence_length:], horizon)[:count]
+    return X, y
+
+def prepare_data(df, sequence_length=SEQUENCE_LENGTH, horizon=1):
+    """Prepare data for LSTM training (y holds the next `horizon` days per window)"""
     print("Preparing data...")
     
-    # Use only Close price
-    data = df['Close'].values.reshape(-1, 1)
-    
-    # Scale the data
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_data = scaler.fit_transform(data)
-    
-    # Create sequences
-    X, y = [], []
-    for i in range(sequence_length, len(scaled_data)):
-        X.append(scaled_data[i-sequence_length:i, 0])
-        y.append(scaled_data[i, 0])
+    # Use only Close price, scaled to float32
+    scaled_data, scaler = scale_series(df)
     
-    X, y = np.array(X), np.array(y)
-    
-    # Reshape X for LSTM [samples, time steps, features]
-    X = np.reshape(X, (X.shape[0], X.shape[1], 1))
+    # Create sequences as views instead of an N x sequence_length copy
+    X, y = make_windows(scaled_data, sequence_length, horizon)
     
     print(f"Data shape - X: {X.shape}, y: {y.shape}")
     
     return X, y, scaler
 
-def build_model(input_shape):
-    """Build LSTM model architecture"""
+def windowed_dataset(paths, sequence_length=SEQUENCE_LENGTH, horizon=1, batch_size=BATCH_SIZE,
+                     split=(0.0, 1.0), shuffle=True, seed=None):
+    """
+    tf.data pipeline producing training windows lazily from per-symbol .npy files
+    
+    Each file is opened memory-mapped and windowed with strided views; only
+    one shuffle buffer of batches is copied into RAM at a time, so peak memory
+    stays flat however many symbols (or years) the universe holds.
+    
+    Args:
+        paths: .npy files written by dataset.save_series
+        split: (start, end) fraction of each symbol's windows to use, in time
+               order, e.g. (0.0, 0.8) for training and (0.8, 1.0) for validation
+        shuffle: shuffle windows across symbols (per epoch)
+    """
+    paths = [str(p) for p in paths]
+    
+    def generate():
+        rng = np.random.default_rng(seed)
+        chunks = []
+        for file_index, path in enumerate(paths):
+            count = len(np.load(path, mmap_mode='r')) - sequence_length - horizon + 1
+            lo, hi = int(count * split[0]), int(count * split[1])
+            chunks.extend((file_index, start, min(start + batch_size, hi)) for start in range(lo, hi, batch_size))
+        if shuffle:
+            rng.shuffle(chunks)
+        
+        for group in range(0, len(chunks), SHUFFLE_CHUNKS):
+            # Gather a group of batches, shuffle windows across them, emit batches
+            series = {}
+            X_parts, y_parts = [], []
+            for file_index, start, stop in chunks[group:group + SHUFFLE_CHUNKS]:
+                if file_index not in series:
+                    series[file_index] = np.load(paths[file_index], mmap_mode='r')
+                X, y = make_windows(series[file_index], sequence_length, horizon)
+                X_parts.append(X[start:stop])
+                y_parts.append(y[start:stop])
+            X = np.concatenate(X_parts).astype(np.float32, copy=False)
+            y = np.concatenate(y_parts).astype(np.float32, copy=False)
+            order = rng.permutation(len(X)) if shuffle else np.arange(len(X))
+            for i in range(0, len(X), batch_size):
+                batch = order[i:i + batch_size]
+                yield X[batch], y[batch]
+    
+    y_shape = (None,) if horizon == 1 else (None, horizon)
+    dataset = tf.data.Dataset.from_generator(
+        generate,
+        output_signature=(
+            tf.TensorSpec(shape=(None, sequence_length, 1), dtype=tf.float32),
+            tf.TensorSpec(shape=y_shape, dtype=tf.float32),
+        ),
+    )
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+def array_dataset(X, y, batch_size=BATCH_SIZE, shuffle=True, seed=None):
+    """
+    Parallel, prefetching tf.data pipeline over in-memory windows
+    
+    The windows are copied once into float32 tensors; each batch is gathered
+    by index in parallel map calls (reshuffled every epoch), and batches are
+    prefetched so the model never waits on input.
+    """
+    X = tf.constant(np.asarray(X, dtype=np.float32))
+    y = tf.constant(np.asarray(y, dtype=np.float32))
+    dataset = tf.data.Dataset.range(len(X))
+    if shuffle:
+        dataset = dataset.shuffle(len(X), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size).map(
+        lambda index: (tf.gather(X, index), tf.gather(y, index)),
+        num_parallel_calls=tf.data.AUTOTUNE,
+        deterministic=not shuffle,
+    )
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+def scaled_learning_rate(batch_size, rule='sqrt'):
+    """
+    Learning rate for `batch_size`, scaled from BASE_LEARNING_RATE at BATCH_SIZE
+    
+    'linear' grows it with the batch size, 'sqrt' with its square root (the
+    safer choice for Adam), 'none' keeps the base rate.
+    """
+    ratio = batch_size / BATCH_SIZE
+    factor = {'linear': ratio, 'sqrt': np.sqrt(ratio), 'none': 1.0}[rule]
+    return BASE_LEARNING_RATE * float(factor)
+
+def configure_host(threads=None, precision='float32'):
+    """
+    TensorFlow thread pools sized to the host and the global dtype policy
+    
+    Must run before any model is built. Intra-op threads (one op's kernel)
+    get every core; two inter-op threads overlap independent ops without
+    oversubscribing. 'mixed_bfloat16' computes in bfloat16 with float32
+    weights, which pays off on CPUs with bfloat16 instructions.
+    """
+    threads = threads or os.cpu_count() or 1
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(min(2, threads))
+    keras.mixed_precision.set_global_policy(precision)
+    print(f"Using {threads} threads, {precision} precision")
+
+class Throughput(keras.callbacks.Callback):
+    """Training samples/sec of every epoch (validation excluded), logged as 'samples_per_sec'"""
+    
+    def __init__(self, samples):
+        super().__init__()
+        self.samples = samples
+        self.rates = []
+    
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+        self._end = None
+    
+    def on_train_batch_end(self, batch, logs=None):
+        self._end = time.perf_counter()
+    
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = (self._end or time.perf_counter()) - self._start
+        rate = self.samples / seconds if seconds > 0 else 0.0
+        self.rates.append(rate)
+        if logs is not None:
+            logs['samples_per_sec'] = rate
+        print(f"Epoch {epoch + 1}: {rate:,.0f} samples/sec ({seconds:.2f}s training)")
+    
+    def summary(self):
+        """Mean rate, leaving out the first epoch (graph tracing) when there are others"""
+        rates = self.rates[1:] or self.rates
+        return float(np.mean(rates)) if rates else None
+
+def build_model(input_shape, horizon=1, architecture=ARCHITECTURE, learning_rate=None):
+    """
+    Build LSTM model architecture
+    
+    With horizon > 1 the model forecasts every horizon day in one forward pass,
+    either through a multi-output dense head or a seq2seq decoder.
+    """
     print("Building model...")
     
-    model = Sequential([
-        LSTM(units=50, return_sequences=True, input_shape=input_shape),
-        Dropout(0.2),
-        
-        LSTM(units=50, return_sequences=True),
-        Dropout(0.2),
-        
-        LSTM(units=50, return_sequences=False),
-        Dropout(0.2),
-        
-        Dense(units=25),
-        Dense(units=1)
-    ])
+    if architecture == 'seq2seq' and horizon > 1:
+        model = Sequential([
+            # Encoder
+            LSTM(units=50, return_sequences=True, input_shape=input_shape),
+            Dropout(0.2),
+            LSTM(units=50, return_sequences=False),
+            Dropout(0.2),
+            
+            # Decoder: one output step per horizon day
+            RepeatVector(horizon),
+            LSTM(units=50, return_sequences=True),
+            Dropout(0.2),
+            TimeDistributed(Dense(units=1)),
+            Reshape((horizon,), dtype='float32')  # float32 outputs under mixed precision
+        ])
+    else:
+        model = Sequential([
+            LSTM(units=50, return_sequences=True, input_shape=input_shape),
+            Dropout(0.2),
+            
+            LSTM(units=50, return_sequences=True),
+            Dropout(0.2),
+            
+            LSTM(units=50, return_sequences=False),
+            Dropout(0.2),
+            
+            Dense(units=25),
+            Dense(units=horizon, dtype='float32')  # float32 outputs under mixed precision
+        ])
     
     model.compile(
-        optimizer='adam',
+        optimizer=keras.optimizers.Adam(learning_rate) if learning_rate else 'adam',
         loss='mean_squared_error',
         metrics=['mae']
     )
@@ -86,9 +266,21 @@ def build_model(input_shape):
     
     return model
 
-def train_model(model, X_train, y_train, X_test, y_test):
-    """Train the LSTM model"""
+def train_model(model, X_train, y_train, X_test, y_test, batch_size=BATCH_SIZE, fast=False,
+                backup_dir='saved_models/backup'):
+    """
+    Train the LSTM model
+    
+    In fast mode the windows go through a parallel, prefetching tf.data
+    pipeline, and the full training state (weights, optimizer and epoch) is
+    backed up to `backup_dir` after every epoch: rerunning an interrupted run
+    resumes it, and the backup is removed once training finishes.
+    
+    Returns:
+        (history, throughput): the Keras history and the samples/sec callback
+    """
     print("Training model...")
+    throughput = Throughput(len(X_train))
     
     # Callbacks
     early_stopping = EarlyStopping(
@@ -105,16 +297,25 @@ def train_model(model, X_train, y_train, X_test, y_test):
     )
     
     # Train
-    history = model.fit(
-        X_train, y_train,
-        batch_size=BATCH_SIZE,
-        epochs=EPOCHS,
-        validation_data=(X_test, y_test),
-        callbacks=[early_stopping, checkpoint],
-        verbose=1
-    )
-    
-    return history
+    if fast:
+        history = model.fit(
+            array_dataset(X_train, y_train, batch_size),
+            epochs=EPOCHS,
+            validation_data=array_dataset(X_test, y_test, batch_size, shuffle=False),
+            callbacks=[throughput, BackupAndRestore(backup_dir), early_stopping, checkpoint],
+            verbose=1
+        )
+    else:
+        history = model.fit(
+            X_train, y_train,
+            batch_size=batch_size,
+            epochs=EPOCHS,
+            validation_data=(X_test, y_test),
+            callbacks=[throughput, early_stopping, checkpoint],
+            verbose=1
+        )
+    
+    return history, throughput
 
 def plot_training_history(history):
     """Plot training metrics"""
@@ -150,9 +351,10 @@ def evaluate_model(model, X_test, y_test, scaler):
     
     predictions = model.predict(X_test)
     
-    # Inverse transform
-    predictions = scaler.inverse_transform(predictions)
-    y_test_actual = scaler.inverse_transform(y_test.reshape(-1, 1))
+    # Inverse transform (one column per horizon day)
+    horizon = predictions.shape[1]
+    predictions = scaler.inverse_transform(predictions.reshape(-1, 1)).reshape(-1, horizon)
+    y_test_actual = scaler.inverse_transform(y_test.reshape(-1, 1)).reshape(-1, horizon)
     
     # Calculate metrics
     mse = np.mean((predictions - y_test_actual) ** 2)
@@ -163,6 +365,15 @@ def evaluate_model(model, X_test, y_test, scaler):
     print(f"RMSE: ${rmse:.2f}")
     print(f"MAE: ${mae:.2f}")
     
+    if horizon > 1:
+        horizon_rmse = np.sqrt(np.mean((predictions - y_test_actual) ** 2, axis=0))
+        for day in sorted({1, 5, 30, horizon} & set(range(1, horizon + 1))):
+            print(f"RMSE (day {day}): ${horizon_rmse[day - 1]:.2f}")
+    
+    # Plot next-day predictions vs actual
+    predictions = predictions[:, :1]
+    y_test_actual = y_test_actual[:, :1]
+    
     # Plot predictions vs actual
     plt.figure(figsize=(12, 6))
     plt.plot(y_test_actual, label='Actual Price', color='blue')
@@ -176,8 +387,8 @@ def evaluate_model(model, X_test, y_test, scaler):
     
     return rmse, mae
 
-def main():
-    """Main training pipeline"""
+def train_single_symbol(batch_size=BATCH_SIZE, learning_rate=None, fast=False):
+    """Original single-symbol pipeline (SYMBOL, PERIOD)"""
     print("=" * 50)
     print("LSTM Stock Price Prediction - Training Script")
     print("=" * 50)
@@ -194,7 +405,8 @@ def main():
     print("Raw data saved to data/training_data.csv")
     
     # Prepare data
-    X, y, scaler = prepare_data(df)
+    horizon = HORIZON if FORECAST_MODE == 'direct' else 1
+    X, y, scaler = prepare_data(df, horizon=horizon)
     
     # Split data
     split_idx = int(len(X) * TRAIN_TEST_SPLIT)
@@ -205,10 +417,10 @@ def main():
     print(f"Testing samples: {len(X_test)}")
     
     # Build model
-    model = build_model(input_shape=(X_train.shape[1], 1))
+    model = build_model(input_shape=(X_train.shape[1], 1), horizon=horizon, learning_rate=learning_rate)
     
     # Train model
-    history = train_model(model, X_train, y_train, X_test, y_test)
+    history, throughput = train_model(model, X_train, y_train, X_test, y_test, batch_size, fast)
     
     # Plot training history
     plot_training_history(history)
@@ -219,6 +431,8 @@ def main():
     # Save final model
     model.save('saved_models/lstm_model.h5')
     print("\nModel saved to saved_models/lstm_model.h5")
+    export_numpy(model, 'saved_models/lstm_model.npz')
+    print("NumPy inference export saved to saved_models/lstm_model.npz")
     
     # Save scaler
     import joblib
@@ -230,14 +444,18 @@ def main():
         'symbol': SYMBOL,
         'training_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         'sequence_length': SEQUENCE_LENGTH,
+        'forecast_mode': FORECAST_MODE,
+        'horizon': horizon,
+        'architecture': ARCHITECTURE if horizon > 1 else 'dense',
         'epochs': EPOCHS,
         'rmse': float(rmse),
         'mae': float(mae),
         'train_samples': len(X_train),
-        'test_samples': len(X_test)
+        'test_samples': len(X_test),
+        'batch_size': batch_size,
+        'samples_per_sec': throughput.summary(),
     }
     
-    import json
     with open('saved_models/metadata.json', 'w') as f:
         json.dump(metadata, f, indent=2)
     print("Metadata saved to saved_models/metadata.json")
@@ -246,5 +464,284 @@ def main():
     print("Training completed successfully!")
     print("=" * 50)
 
+def model_metadata(trained_on, horizon, epochs, rmse, mae, train_samples, test_samples, **extra):
+    """metadata.json contents for a trained model, as read by the backend"""
+    metadata = {
+        'symbol': trained_on[0] if len(trained_on) == 1 else None,
+        'training_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'sequence_length': SEQUENCE_LENGTH,
+        'forecast_mode': FORECAST_MODE,
+        'horizon': horizon,
+        'architecture': ARCHITECTURE if horizon > 1 else 'dense',
+        'epochs': epochs,
+        'rmse': float(rmse),
+        'mae': float(mae),
+        'train_samples': int(train_samples),
+        'test_samples': int(test_samples),
+    }
+    metadata.update(extra)
+    return metadata
+
+def train_pooled(entries, dataset_dir, output_dir, epochs, progress, progress_path,
+                 batch_size=BATCH_SIZE, learning_rate=None, fast=False):
+    """
+    Train one model on every symbol of the dataset
+    
+    Each symbol is scaled on its own range, so the model is served without a
+    scaler and the backend min-max scales each request's history the same way.
+    The model is checkpointed after every epoch; a rerun continues from the
+    last finished epoch. In fast mode the full training state is also backed
+    up to pooled_backup/ (removed once training finishes), as in train_model.
+    """
+    horizon = HORIZON if FORECAST_MODE == 'direct' else 1
+    paths = [os.path.join(dataset_dir, entry['path']) for entry in entries.values()]
+    train_ds = windowed_dataset(paths, horizon=horizon, batch_size=batch_size, split=(0.0, TRAIN_TEST_SPLIT))
+    val_ds = windowed_dataset(
+        paths, horizon=horizon, batch_size=batch_size, split=(TRAIN_TEST_SPLIT, 1.0), shuffle=False
+    )
+    windows = [len(np.load(p, mmap_mode='r')) - SEQUENCE_LENGTH - horizon + 1 for p in paths]
+    train_samples = sum(int(count * TRAIN_TEST_SPLIT) for count in windows)
+    test_samples = sum(windows) - train_samples
+    
+    checkpoint_path = os.path.join(output_dir, 'pooled_checkpoint.keras')
+    state = progress.setdefault('pooled', {'epoch': 0, 'done': False})
+    if state['done']:
+        print("Pooled model already trained (use --restart to retrain)")
+        return
+    if state['epoch'] > 0 and os.path.exists(checkpoint_path):
+        print(f"Resuming pooled training after epoch {state['epoch']}")
+        model = keras.models.load_model(checkpoint_path)
+    else:
+        state['epoch'] = 0
+        model = build_model(input_shape=(SEQUENCE_LENGTH, 1), horizon=horizon, learning_rate=learning_rate)
+    
+    def record_epoch(epoch, logs):
+        model.save(checkpoint_path)
+        state['epoch'] = epoch + 1
+        state['val_loss'] = float(logs.get('val_loss', np.nan))
+        write_json(progress_path, progress)
+    
+    throughput = Throughput(train_samples)
+    callbacks = [
+        throughput,
+        EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True),
+        keras.callbacks.LambdaCallback(on_epoch_end=record_epoch),
+    ]
+    if fast:
+        callbacks.insert(1, BackupAndRestore(os.path.join(output_dir, 'pooled_backup')))
+    model.fit(
+        train_ds,
+        epochs=epochs,
+        initial_epoch=state['epoch'],
+        validation_data=val_ds,
+        callbacks=callbacks,
+        verbose=1
+    )
+    
+    # Errors are in scaled units: every symbol has its own price range
+    mse, mae = model.evaluate(val_ds, verbose=0)
+    model.save(os.path.join(output_dir, 'lstm_model.h5'))
+    export_numpy(model, os.path.join(output_dir, 'lstm_model.npz'))
+    
+    metadata = model_metadata(
+        list(entries), horizon, state['epoch'], np.sqrt(mse), mae, train_samples, test_samples,
+        symbols=list(entries), scaling='per-symbol-minmax', batch_size=batch_size,
+        samples_per_sec=throughput.summary(),
+    )
+    write_json(os.path.join(output_dir, 'metadata.json'), metadata)
+    
+    state['done'] = True
+    write_json(progress_path, progress)
+    print(f"Pooled model saved to {output_dir} (scaled RMSE {np.sqrt(mse):.4f})")
+
+def _init_training_worker(threads, precision='float32'):
+    # Several workers share the machine; keep each one's TensorFlow thread pools small
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    keras.mixed_precision.set_global_policy(precision)
+
+def train_symbol_model(symbol, series_path, low, high, output_dir, epochs, batch_size=BATCH_SIZE, learning_rate=None,
+                       fast=False):
+    """
+    Train and save one symbol's model (runs in a worker process)
+    
+    The output directory has the same layout as saved_models/, including the
+    symbol's own scaler, so the backend can serve it directly. In fast mode
+    the windows go through array_dataset and the training state is backed up
+    to the output directory's backup/ after every epoch, as in train_model.
+    """
+    horizon = HORIZON if FORECAST_MODE == 'direct' else 1
+    series = np.load(series_path, mmap_mode='r')
+    X, y = make_windows(series, horizon=horizon)
+    split_idx = int(len(X) * TRAIN_TEST_SPLIT)
+    X_train, X_test = X[:split_idx], X[split_idx:]
+    y_train, y_test = y[:split_idx], y[split_idx:]
+    
+    model = build_model(input_shape=(SEQUENCE_LENGTH, 1), horizon=horizon, learning_rate=learning_rate)
+    early_stopping = EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True)
+    if fast:
+        model.fit(
+            array_dataset(X_train, y_train, batch_size),
+            epochs=epochs,
+            validation_data=array_dataset(X_test, y_test, batch_size, shuffle=False),
+            callbacks=[BackupAndRestore(os.path.join(output_dir, 'backup')), early_stopping],
+            verbose=0
+        )
+    else:
+        model.fit(
+            X_train, y_train,
+            batch_size=batch_size,
+            epochs=epochs,
+            validation_data=(X_test, y_test),
+            callbacks=[early_stopping],
+            verbose=0
+        )
+    
+    scaler = scaler_from_range(low, high)
+    predictions = scaler.inverse_transform(model.predict(X_test, verbose=0).reshape(-1, 1))
+    actual = scaler.inverse_transform(np.asarray(y_test).reshape(-1, 1))
+    rmse = float(np.sqrt(np.mean((predictions - actual) ** 2)))
+    mae = float(np.mean(np.abs(predictions - actual)))
+    
+    import joblib
+    os.makedirs(output_dir, exist_ok=True)
+    model.save(os.path.join(output_dir, 'lstm_model.h5'))
+    export_numpy(model, os.path.join(output_dir, 'lstm_model.npz'))
+    joblib.dump(scaler, os.path.join(output_dir, 'scaler.pkl'))
+    write_json(
+        os.path.join(output_dir, 'metadata.json'),
+        model_metadata([symbol], horizon, epochs, rmse, mae, len(X_train), len(X_test)),
+    )
+    return {'rmse': rmse, 'mae': mae}
+
+def train_per_symbol(entries, dataset_dir, output_dir, epochs, workers, progress, progress_path,
+                     batch_size=BATCH_SIZE, learning_rate=None, fast=False):
+    """Train one model per symbol with a process pool, skipping symbols already done"""
+    completed = progress.setdefault('completed', {})
+    failed = progress.setdefault('failed', {})
+    todo = [symbol for symbol in entries if symbol not in completed]
+    print(f"Per-symbol training: {len(completed)} done, {len(todo)} to train with {workers} workers")
+    
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_training_worker,
+        initargs=(threads, keras.mixed_precision.global_policy().name),
+    ) as executor:
+        futures = {
+            executor.submit(
+                train_symbol_model,
+                symbol,
+                os.path.join(dataset_dir, entries[symbol]['path']),
+                entries[symbol]['min'],
+                entries[symbol]['max'],
+                os.path.join(output_dir, 'symbols', symbol),
+                epochs,
+                batch_size,
+                learning_rate,
+                fast,
+            ): symbol
+            for symbol in todo
+        }
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                completed[symbol] = future.result()
+                failed.pop(symbol, None)
+                print(f"{symbol}: RMSE ${completed[symbol]['rmse']:.2f} ({len(completed)}/{len(entries)})")
+            except Exception as e:
+                failed[symbol] = str(e)
+                print(f"{symbol}: failed ({e})")
+            # Recorded after every symbol so an interrupted run resumes here
+            write_json(progress_path, progress)
+
+def train_universe(args):
+    """Build (or resume) the sharded dataset, then train pooled or per-symbol models"""
+    if args.universe:
+        symbols = load_universe(args.universe)
+    else:
+        symbols = list(dict.fromkeys(symbol.upper() for symbol in args.symbols))
+    
+    manifest = build_dataset(
+        symbols, args.dataset_dir, period=args.period, workers=args.fetch_workers, resume=not args.restart
+    )
+    entries = {symbol: manifest['symbols'][symbol] for symbol in symbols if symbol in manifest['symbols']}
+    if not entries:
+        print("No usable histories, nothing to train")
+        return
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    progress_path = os.path.join(args.output_dir, 'progress.json')
+    progress = {} if args.restart else read_json(progress_path, {})
+    if progress.get('mode') not in (None, args.mode):
+        print(f"Saved progress is for {progress['mode']} training, starting over")
+        progress = {}
+    progress['mode'] = args.mode
+    
+    if args.mode == 'pooled':
+        train_pooled(
+            entries, args.dataset_dir, args.output_dir, args.epochs, progress, progress_path,
+            args.batch_size, args.learning_rate, args.fast,
+        )
+    else:
+        train_per_symbol(
+            entries, args.dataset_dir, args.output_dir, args.epochs, args.workers, progress, progress_path,
+            args.batch_size, args.learning_rate, args.fast,
+        )
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the LSTM stock forecaster")
+    parser.add_argument('--symbols', nargs='+', help="Symbols to train on")
+    parser.add_argument('--universe', help="File with one symbol per line")
+    parser.add_argument('--period', default=PERIOD, help="History period per symbol (default: %(default)s)")
+    parser.add_argument('--mode', choices=['pooled', 'per-symbol'], default='pooled',
+                        help="One model for all symbols, or one model per symbol")
+    parser.add_argument('--dataset-dir', default=DATASET_DIR, help="Sharded dataset location")
+    parser.add_argument('--output-dir', default='saved_models', help="Where models and progress are written")
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--fetch-workers', type=int, default=8, help="Parallel history downloads")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 1) // 2),
+                        help="Training processes in per-symbol mode")
+    parser.add_argument('--restart', action='store_true', help="Ignore saved progress and start over")
+    parser.add_argument('--publish', action='store_true', help="Copy the trained models into the model registry")
+    parser.add_argument('--activate', action='store_true', help="Serve the published version right away")
+    parser.add_argument('--fast', action='store_true',
+                        help="High-throughput mode: tf.data input, large batches, host-tuned threads, resumable")
+    parser.add_argument('--batch-size', type=int, help=f"Default: {BATCH_SIZE} ({FAST_BATCH_SIZE} with --fast)")
+    parser.add_argument('--lr-scaling', choices=['linear', 'sqrt', 'none'], default='sqrt',
+                        help="How the learning rate follows the batch size (default: %(default)s)")
+    parser.add_argument('--precision', choices=['float32', 'mixed_bfloat16', 'mixed_float16'], default='float32')
+    parser.add_argument('--threads', type=int, help="TensorFlow intra-op threads (default: every core with --fast)")
+    args = parser.parse_args(argv)
+    args.batch_size = args.batch_size or (FAST_BATCH_SIZE if args.fast else BATCH_SIZE)
+    args.learning_rate = scaled_learning_rate(args.batch_size, args.lr_scaling) if args.batch_size != BATCH_SIZE else None
+    return args
+
+def publish_models(output_dir, activate=False):
+    """Publish a training output directory as a new model registry version"""
+    registry = backend_module('app.models.registry')
+    if registry is None:
+        print("Backend not found, skipping publish")
+        return None
+    version = registry.publish(output_dir, activate=activate)
+    print(f"Published version {version}" + (" (active)" if activate else ""))
+    return version
+
+def main(argv=None):
+    """Main training pipeline"""
+    args = parse_args(argv)
+    if args.fast or args.threads or args.precision != 'float32':
+        configure_host(args.threads, args.precision)
+    if args.symbols or args.universe:
+        train_universe(args)
+        output_dir = args.output_dir
+    else:
+        train_single_symbol(args.batch_size, args.learning_rate, args.fast)
+        output_dir = 'saved_models'
+    
+    if args.publish:
+        publish_models(output_dir, activate=args.activate)
+
 if __name__ == "__main__":
     main()